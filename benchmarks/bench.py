@@ -0,0 +1,140 @@
+"""
+Offline benchmark of the Codewars and EGS cogs.
+
+Every command is driven through a fake Red context against recorded upstream
+responses, so results only depend on the cogs' own code.
+
+Usage::
+
+    python -m benchmarks.bench [--iterations 20] [--latency 0.05] [--cold] [--json results.json]
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List
+
+from .fakes import FakeBot, FakeContext, setup_red
+from .upstream import Upstream, USERNAME
+
+
+class Cogs:
+    """Both cogs wired to the same fake bot and recorded upstream."""
+
+    def __init__(self, bot: FakeBot, upstream: Upstream):
+        from codewars.main import Codewars
+        from egs.main import EGS
+
+        self.codewars = Codewars(bot)
+        self.egs = EGS(bot)
+        for cog in (self.codewars, self.egs):
+            cog.session = upstream.client()
+
+    def unload(self):
+        self.codewars.cog_unload()
+        self.egs.cog_unload()
+
+
+COMMANDS: Dict[str, Callable[[Cogs, FakeContext], Awaitable]] = {
+    "cw": lambda cogs, ctx: cogs.codewars._codewars.callback(cogs.codewars, ctx, USERNAME),
+    "cw completed 20": lambda cogs, ctx: cogs.codewars._completed.callback(cogs.codewars, ctx, USERNAME, 20),
+    "cw languages": lambda cogs, ctx: cogs.codewars._languages.callback(cogs.codewars, ctx, USERNAME),
+    "egs": lambda cogs, ctx: cogs.egs._egs.callback(cogs.egs, ctx),
+    "egs upcoming": lambda cogs, ctx: cogs.egs._upcoming.callback(cogs.egs, ctx),
+}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def bench_command(name: str, iterations: int, latency: float, cold: bool) -> dict:
+    upstream = Upstream(latency=latency)
+    bot = FakeBot()
+    cogs = Cogs(bot, upstream)
+    command = COMMANDS[name]
+
+    latencies = []
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    try:
+        for _ in range(iterations):
+            if cold:
+                cogs.unload()
+                cogs = Cogs(bot, upstream)
+            ctx = FakeContext(bot)
+            start = time.perf_counter()
+            await command(cogs, ctx)
+            latencies.append(time.perf_counter() - start)
+        cpu = time.process_time() - cpu_start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        cogs.unload()
+        # Let the session close and cancelled tasks unwind before the next command
+        await asyncio.sleep(0)
+
+    return {
+        "command": name,
+        "iterations": iterations,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "upstream_requests": upstream.requests / iterations,
+        "upstream_kib": upstream.bytes / iterations / 1024,
+        "upstream_hosts": {host: count / iterations for host, count in upstream.hosts.items()},
+        "discord_calls": bot.stats.total / iterations,
+        "cpu_ms": cpu / iterations * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def print_table(results: List[dict]):
+    columns = [
+        ("command", "command", "{}"),
+        ("p50 ms", "p50_ms", "{:.1f}"),
+        ("p90 ms", "p90_ms", "{:.1f}"),
+        ("p99 ms", "p99_ms", "{:.1f}"),
+        ("req/run", "upstream_requests", "{:.1f}"),
+        ("KiB/run", "upstream_kib", "{:.1f}"),
+        ("discord/run", "discord_calls", "{:.1f}"),
+        ("cpu ms/run", "cpu_ms", "{:.1f}"),
+        ("peak KiB", "peak_kib", "{:.0f}"),
+    ]
+    rows = [[title for title, _, _ in columns]]
+    for result in results:
+        rows.append([fmt.format(result[key]) for _, key, fmt in columns])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+async def main(argv=None) -> List[dict]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="runs per command")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated upstream round trip in seconds")
+    parser.add_argument("--cold", action="store_true", help="load fresh cogs before every run")
+    parser.add_argument("--only", nargs="+", choices=list(COMMANDS), help="commands to run")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    setup_red()
+    results = []
+    for name in args.only or COMMANDS:
+        results.append(await bench_command(name, args.iterations, args.latency, args.cold))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
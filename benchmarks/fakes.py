@@ -0,0 +1,247 @@
+"""
+Just enough of Red's bot, context and Discord objects to drive cog commands without a gateway.
+"""
+
+import random
+import asyncio
+import tempfile
+import itertools
+import contextlib
+from collections import deque
+
+import discord
+
+_ids = itertools.count(1000)
+
+# Controls of both cogs' menus, tried in this order when a simulated member turns a page
+PAGE_TURNS = (
+    "\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}",
+    "\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}",
+)
+
+
+def setup_red(data_path: str = None) -> str:
+    """
+    Points Red's data manager at a throwaway JSON store so `Config.get_conf` works.
+
+    Returns
+    -------
+    str
+        The data path in use
+    """
+    from redbot.core import data_manager
+
+    data_path = data_path or tempfile.mkdtemp(prefix="red_cogs_bench_")
+    data_manager.basic_config = dict(
+        data_manager.basic_config_default,
+        DATA_PATH=data_path,
+        STORAGE_TYPE="JSON",
+        STORAGE_DETAILS={},
+    )
+    return data_path
+
+
+class FakePermissions:
+    manage_messages = True
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = next(_ids)
+
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, name: str = "member"):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.colour = discord.Colour.blurple()
+        self.color = self.colour
+        self.bot = False
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+
+class FakeAttachment:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.url = f"https://cdn.discordapp.com/attachments/0/{next(_ids)}/{filename}"
+
+
+class FakeChannel:
+    def __init__(self, guild: FakeGuild, stats: "SendStats", bot: "FakeBot" = None, author: FakeMember = None):
+        self.id = next(_ids)
+        self.guild = guild
+        self.stats = stats
+        self.bot = bot
+        # Member who reacts to the menus sent here
+        self.author = author
+        self.first_sent_at = None
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def permissions_for(self, member):
+        return FakePermissions()
+
+    async def send(self, content=None, *, embed=None, file=None, files=None, **kwargs):
+        self.stats.record("send")
+        if self.first_sent_at is None:
+            self.first_sent_at = asyncio.get_running_loop().time()
+        files = files or ([file] if file else [])
+        message = FakeMessage(self, content=content, embed=embed,
+                              attachments=[FakeAttachment(f.filename) for f in files])
+        if self.bot is not None:
+            self.bot.messages.append(message)
+        return message
+
+    @contextlib.asynccontextmanager
+    async def typing(self):
+        yield
+
+
+class FakeState:
+    """The part of discord.py's connection state Red's predicates read"""
+
+    def __init__(self, self_id: int = None):
+        self.self_id = self_id
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, content=None, embed=None, attachments=()):
+        self.id = next(_ids)
+        self._state = FakeState(channel.bot.user.id if channel.bot is not None else None)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.attachments = list(attachments)
+        self.stats = channel.stats
+
+    async def edit(self, content=None, *, embed=None, **kwargs):
+        self.stats.record("edit")
+        if embed is not None:
+            self.embeds = [embed]
+        if content is not None:
+            self.content = content
+
+    async def add_reaction(self, emoji):
+        self.stats.record("add_reaction")
+
+    async def remove_reaction(self, emoji, member):
+        self.stats.record("remove_reaction")
+
+    async def clear_reactions(self):
+        self.stats.record("clear_reactions")
+
+    async def delete(self):
+        self.stats.record("delete")
+
+
+class FakeReaction:
+    def __init__(self, message: FakeMessage, emoji: str):
+        self.message = message
+        self.emoji = emoji
+
+    def __str__(self):
+        return self.emoji
+
+
+class SendStats:
+    """Counts the REST calls the cogs would make to Discord."""
+
+    def __init__(self):
+        self.calls = {}
+
+    def record(self, call: str):
+        self.calls[call] = self.calls.get(call, 0) + 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls.clear()
+
+
+class FakeBot:
+    """
+    A bot whose `wait_for` never sees a reaction, so menus time out right after the first page.
+
+    Parameters
+    ----------
+    menu_timeout: float
+        Seconds `wait_for` sleeps before timing out. The soak test uses this to keep menus open.
+    turn_chance: float
+        Chance that a member turns the page of an open menu instead of letting it time out.
+        The turn comes after a random part of `menu_timeout`.
+    """
+
+    def __init__(self, menu_timeout: float = 0.0, turn_chance: float = 0.0):
+        self.menu_timeout = menu_timeout
+        self.turn_chance = turn_chance
+        self.listeners = 0
+        self.stats = SendStats()
+        self.guild = FakeGuild()
+        self.user = FakeMember(self.guild, name="bot")
+        # Recently sent messages, searched for the menu a simulated reaction belongs to
+        self.messages = deque(maxlen=4096)
+
+    async def wait_for(self, event, *, check=None, timeout=None):
+        if timeout is None and event != "reaction_add":
+            # Red 3.5 menus also wait for reaction_remove without a timeout and cancel it
+            # once reaction_add is done, the reaction_add waiter alone drives the menu
+            await asyncio.get_running_loop().create_future()
+        wait = self.menu_timeout if timeout is None else min(self.menu_timeout, timeout)
+        turn = event == "reaction_add" and check is not None and random.random() < self.turn_chance
+        self.listeners += 1
+        try:
+            await asyncio.sleep(random.uniform(0, wait) if turn else wait)
+        finally:
+            self.listeners -= 1
+        if turn:
+            reaction = self.find_reaction(check)
+            if reaction is not None:
+                return reaction
+        raise asyncio.TimeoutError
+
+    def find_reaction(self, check):
+        """Returns the page turn of a recent message's author that the check accepts, if any"""
+        for message in reversed(self.messages):
+            author = message.channel.author
+            if author is None:
+                continue
+            for emoji in PAGE_TURNS:
+                reaction = FakeReaction(message, emoji)
+                if check(reaction, author):
+                    return reaction, author
+        return None
+
+    async def wait_until_red_ready(self):
+        return
+
+    async def use_buttons(self):
+        return False
+
+    def get_channel(self, channel_id):
+        return None
+
+
+class FakeContext:
+    def __init__(self, bot: FakeBot, guild: FakeGuild = None, author: FakeMember = None):
+        self.bot = bot
+        self.guild = guild or bot.guild
+        self.author = author or FakeMember(self.guild)
+        self.me = FakeMember(self.guild, name="bot")
+        self.channel = FakeChannel(self.guild, bot.stats, bot, self.author)
+        self.prefix = "[p]"
+        self.message = FakeMessage(self.channel, content="")
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    def typing(self):
+        return self.channel.typing()
@@ -0,0 +1,272 @@
+"""
+Soak test of the Codewars and EGS cogs.
+
+Hundreds of guilds send a mix of commands at a steady rate and turn the pages of the
+menus they open, all at once, against recorded upstream responses. Throughput, tail
+latency, event loop lag, memory and the size of the cogs' shared state are reported
+for every interval, so leaks and contention show up as trends over a long run.
+
+Usage::
+
+    python -m benchmarks.soak [--guilds 200] [--duration 60] [--rate 50] [--latency 0.05] [--json soak.json]
+"""
+
+import gc
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List
+
+from .bench import COMMANDS, Cogs, percentile
+from .fakes import FakeBot, FakeContext, FakeGuild, FakeMember, setup_red
+from .upstream import Upstream
+
+SOAK_COMMANDS: Dict[str, Callable[[Cogs, FakeContext], Awaitable]] = dict(
+    COMMANDS,
+    **{
+        "cw search": lambda cogs, ctx: cogs.codewars._search.callback(cogs.codewars, ctx, query="array"),
+        "egs list": lambda cogs, ctx: cogs.egs._singly.callback(cogs.egs, ctx),
+        "egs regions": lambda cogs, ctx: cogs.egs._regions.callback(cogs.egs, ctx, "TR", "US", "DE"),
+        "egs history": lambda cogs, ctx: cogs.egs._history.callback(cogs.egs, ctx),
+    },
+)
+
+# Relative frequency of each command, roughly what the bot sees in production
+MIX = {
+    "cw": 6,
+    "cw completed 20": 3,
+    "cw languages": 2,
+    "cw search": 1,
+    "egs": 6,
+    "egs upcoming": 2,
+    "egs list": 1,
+    "egs regions": 1,
+    "egs history": 1,
+}
+
+# Seconds between two samples of the event loop lag
+LAG_INTERVAL = 0.05
+
+
+def rss_kib() -> float:
+    """Resident memory of the process, 0 where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024
+
+
+class Window:
+    """What happened during one reporting interval."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.response = []
+        self.completed = 0
+        self.errors = Counter()
+        self.lag = []
+
+
+class Soak:
+    """
+    Drives the cogs with an open-loop stream of commands from simulated guilds.
+
+    Commands arrive at `rate` per second whether or not earlier ones finished, as they
+    would from Discord, so a slowdown shows up as growing latency and commands in flight.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.upstream = Upstream(latency=args.latency)
+        self.bot = FakeBot(menu_timeout=args.menu_timeout, turn_chance=args.turn_chance)
+        self.cogs = Cogs(self.bot, self.upstream)
+        self.guilds = [FakeGuild() for _ in range(args.guilds)]
+        self.members = {guild.id: [FakeMember(guild) for _ in range(args.members)] for guild in self.guilds}
+        self.commands = list(MIX)
+        self.weights = [MIX[name] for name in self.commands]
+        self.inflight = set()
+        self.window = Window()
+        self.started_at = time.perf_counter()
+        self.rows: List[dict] = []
+
+    async def run_command(self, name: str):
+        guild = random.choice(self.guilds)
+        ctx = FakeContext(self.bot, guild, random.choice(self.members[guild.id]))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await SOAK_COMMANDS[name](self.cogs, ctx)
+        except Exception as error:
+            self.window.errors[f"{name}: {type(error).__name__}"] += 1
+            return
+        # Time to the first message, the rest of the command is the menu staying open
+        if ctx.channel.first_sent_at is not None:
+            self.window.response.append(ctx.channel.first_sent_at - start)
+        self.window.completed += 1
+
+    async def arrivals(self):
+        deadline = time.perf_counter() + self.args.duration
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.expovariate(self.args.rate))
+            name = random.choices(self.commands, self.weights)[0]
+            task = asyncio.create_task(self.run_command(name))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def monitor_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.window.lag.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+    def state(self) -> Dict[str, int]:
+        """Sizes of the structures the cogs keep between commands, each should level off in a long run"""
+        codewars, egs = self.cogs.codewars, self.cogs.egs
+        return {
+            "cw_inflight": len(codewars.inflight),
+            "cw_refreshes": len(codewars.profile_refreshes),
+            "cw_profiles": len(codewars.profile_cache),
+            "cw_avatars": len(codewars.avatar_cache),
+            "cw_katas": len(codewars.kata_cache),
+            "cw_kata_index": len(codewars.kata_index),
+            "cw_renders": len(codewars.render_cache),
+            "cw_backend": len(codewars.backend._entries),
+            "egs_snapshots": len(egs.snapshots),
+            "egs_colors": len(egs.colors),
+            "egs_renders": len(egs.render_cache),
+            "egs_history": len(egs.history),
+            "egs_history_pending": len(egs.history._pending),
+            "egs_title_words": len(egs.history._titles),
+            "egs_months": len(egs.history._months),
+            "egs_archive_tasks": len(egs.archive_tasks),
+            "egs_backend": len(egs.backend._entries),
+        }
+
+    def report(self):
+        window, self.window = self.window, Window()
+        seconds = time.perf_counter() - window.started_at
+        row = {
+            "at_s": time.perf_counter() - self.started_at,
+            "commands_per_s": window.completed / seconds,
+            "p50_ms": percentile(window.response, 50) * 1000 if window.response else 0.0,
+            "p99_ms": percentile(window.response, 99) * 1000 if window.response else 0.0,
+            "max_ms": max(window.response, default=0.0) * 1000,
+            "errors": sum(window.errors.values()),
+            "error_types": dict(window.errors),
+            "lag_p99_ms": percentile(window.lag, 99) * 1000 if window.lag else 0.0,
+            "lag_max_ms": max(window.lag, default=0.0) * 1000,
+            "inflight": len(self.inflight),
+            "menus_open": self.bot.listeners,
+            "tasks": len(asyncio.all_tasks()),
+            "rss_kib": rss_kib(),
+            "gc_objects": len(gc.get_objects()),
+            # The fake bot's own buffer of sent messages, part of gc_objects until it is full
+            "fake_messages": len(self.bot.messages),
+            **self.state(),
+            "upstream_requests": self.upstream.requests,
+            "discord_calls": self.bot.stats.total,
+        }
+        self.rows.append(row)
+        print_row(row, header=len(self.rows) == 1)
+
+    async def run(self) -> List[dict]:
+        lag = asyncio.create_task(self.monitor_lag())
+        arrivals = asyncio.create_task(self.arrivals())
+        try:
+            while not arrivals.done():
+                await asyncio.wait({arrivals}, timeout=self.args.interval)
+                self.report()
+            # Let open menus time out so what they hold is released before the last sample
+            if self.inflight:
+                await asyncio.wait(self.inflight, timeout=self.args.menu_timeout + 10)
+            await asyncio.sleep(0)
+            self.report()
+        finally:
+            lag.cancel()
+            arrivals.cancel()
+            for task in self.inflight:
+                task.cancel()
+            self.cogs.unload()
+            await asyncio.sleep(0)
+        return self.rows
+
+
+COLUMNS = [
+    ("t s", "at_s", "{:.0f}"),
+    ("cmd/s", "commands_per_s", "{:.1f}"),
+    ("p50 ms", "p50_ms", "{:.1f}"),
+    ("p99 ms", "p99_ms", "{:.1f}"),
+    ("max ms", "max_ms", "{:.1f}"),
+    ("errors", "errors", "{}"),
+    ("lag p99", "lag_p99_ms", "{:.1f}"),
+    ("lag max", "lag_max_ms", "{:.1f}"),
+    ("inflight", "inflight", "{}"),
+    ("menus", "menus_open", "{}"),
+    ("tasks", "tasks", "{}"),
+    ("RSS KiB", "rss_kib", "{:.0f}"),
+    ("objects", "gc_objects", "{}"),
+    ("cw rend", "cw_renders", "{}"),
+    ("egs snap", "egs_snapshots", "{}"),
+    ("egs rend", "egs_renders", "{}"),
+    ("history", "egs_history", "{}"),
+    ("archive", "egs_archive_tasks", "{}"),
+]
+WIDTHS = [max(len(title), 8) for title, _, _ in COLUMNS]
+
+
+def print_row(row: dict, header: bool = False):
+    if header:
+        print("  ".join(title.ljust(width) for (title, _, _), width in zip(COLUMNS, WIDTHS)))
+    print("  ".join(fmt.format(row[key]).ljust(width) for (_, key, fmt), width in zip(COLUMNS, WIDTHS)), flush=True)
+
+
+def print_summary(rows: List[dict]):
+    """Prints how memory and state moved from the first interval to the last, the signs of a leak"""
+    if len(rows) < 2:
+        return
+    first, last = rows[0], rows[-1]
+    print()
+    state = [key for key in first if key.startswith(("cw_", "egs_"))]
+    for key in ("rss_kib", "gc_objects", "tasks", *state):
+        print(f"{key}: {first[key]:.0f} -> {last[key]:.0f} ({last[key] - first[key]:+.0f})")
+    errors = Counter()
+    for row in rows:
+        errors.update(row["error_types"])
+    for error, count in errors.most_common():
+        print(f"{count} x {error}")
+
+
+async def main(argv=None) -> List[dict]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=200, help="simulated guilds")
+    parser.add_argument("--members", type=int, default=5, help="members sending commands per guild")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds commands keep arriving")
+    parser.add_argument("--rate", type=float, default=50.0, help="commands per second across all guilds")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated upstream round trip in seconds")
+    parser.add_argument("--menu-timeout", type=float, default=10.0, help="seconds a menu stays open without a turn")
+    parser.add_argument("--turn-chance", type=float, default=0.3, help="chance a member turns the page of a menu")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between two reports")
+    parser.add_argument("--seed", type=int, help="seed of the random workload, for comparable runs")
+    parser.add_argument("--json", help="also write the reports to this file")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    setup_red()
+    rows = await Soak(args).run()
+    print_summary(rows)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(rows, file, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
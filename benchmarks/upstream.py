@@ -0,0 +1,82 @@
+"""
+Recorded Codewars and Epic Games Store responses served through an `httpx.MockTransport`.
+"""
+
+import re
+import json
+import asyncio
+from pathlib import Path
+
+import httpx
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+USERNAME = "bench_user"
+
+
+def load_fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+class Upstream:
+    """
+    Routes requests of both cogs to the recorded fixtures and counts what went over the wire.
+
+    Parameters
+    ----------
+    latency: float
+        Seconds every response is delayed by, to imitate a real network round trip
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.user = load_fixture("codewars_user.json")
+        self.completed = load_fixture("codewars_completed.json")
+        self.katas = {kata_id: json.dumps(kata).encode()
+                      for kata_id, kata in json.loads(load_fixture("codewars_katas.json")).items()}
+        self.profile = load_fixture("codewars_profile.html")
+        self.feed = load_fixture("egs_feed.json")
+        self.cover = load_fixture("egs_cover.png")
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.bytes = 0
+        self.hosts = {}
+
+    def route(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        path = url.path
+        if url.host == "www.codewars.com":
+            if re.fullmatch(r"/api/v1/users/[^/]+/code-challenges/completed", path):
+                return httpx.Response(200, content=self.completed, headers={"content-type": "application/json"})
+            match = re.fullmatch(r"/api/v1/code-challenges/([^/]+)", path)
+            if match:
+                kata = self.katas.get(match.group(1))
+                if kata is None:
+                    return httpx.Response(404, json={"success": False, "reason": "not found"})
+                return httpx.Response(200, content=kata, headers={"content-type": "application/json"})
+            match = re.fullmatch(r"/api/v1/users/([^/]+)", path)
+            if match:
+                if match.group(1) != USERNAME:
+                    return httpx.Response(404, json={"success": False, "reason": "not found"})
+                return httpx.Response(200, content=self.user, headers={"content-type": "application/json"})
+            if re.fullmatch(r"/users/[^/]+", path):
+                return httpx.Response(200, content=self.profile, headers={"content-type": "text/html"})
+        elif url.host == "store-site-backend-static.ak.epicgames.com" and path == "/freeGamesPromotions":
+            return httpx.Response(200, content=self.feed, headers={"content-type": "application/json"})
+        elif url.host == "cdn1.epicgames.com":
+            return httpx.Response(200, content=self.cover, headers={"content-type": "image/png"})
+        return httpx.Response(404)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = self.route(request)
+        self.requests += 1
+        self.bytes += len(response.content)
+        self.hosts[request.url.host] = self.hosts.get(request.url.host, 0) + 1
+        return response
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
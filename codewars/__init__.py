@@ -1,5 +1,12 @@
+import inspect
+
 from .main import Codewars
 
 
 async def setup(bot):
-    bot.add_cog(Codewars(bot))
+    cog = Codewars(bot)
+    # add_cog is a coroutine since discord.py 2
+    result = bot.add_cog(cog)
+    if inspect.isawaitable(result):
+        await result
+    await cog.initialize()
@@ -0,0 +1,180 @@
+import io
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import discord
+
+# Used for languages without a bundled image, and until bundled images are uploaded
+LANGUAGE_IMAGES = {
+    "c": "https://i.imgur.com/IgMT4VW.png",
+    "clojure": "https://i.imgur.com/SsEWBmW.png",
+    "coffeescript": "https://i.imgur.com/rEWxYhv.png",
+    "cpp": "https://i.imgur.com/O5BcX33.png",
+    "csharp": "https://i.imgur.com/IdlAR1B.png",
+    "go": "https://i.imgur.com/JCA1E0Q.png",
+    "groovy": "https://i.imgur.com/BoWWCFx.png",
+    "haskell": "https://i.imgur.com/MRXo1U0.png",
+    "java": "https://i.imgur.com/HbzHc9Z.png",
+    "javascript": "https://i.imgur.com/8DFw5s9.png",
+    "kotlin": "https://i.imgur.com/Kbdj3tB.png",
+    "lua": "https://i.imgur.com/1gvQNMh.png",
+    "ocaml": "https://i.imgur.com/coYXRb6.png",
+    "php": "https://i.imgur.com/PHxL185.png",
+    "powershell": "https://i.imgur.com/fHIAYGk.png",
+    "python": "https://i.imgur.com/DCBz8dd.png",
+    "r": "https://i.imgur.com/FQS2tdC.png",
+    "ruby": "https://i.imgur.com/W0bXkco.png",
+    "rust": "https://i.imgur.com/BExi1sJ.png",
+    "scala": "https://i.imgur.com/S9tRrcr.png",
+    "swift": "https://i.imgur.com/3xCT5PY.png",
+    "typescript": "https://i.imgur.com/dUsR3e4.png",
+}
+
+# Discord allows up to 10 attachments per message
+ATTACHMENTS_PER_MESSAGE = 10
+# Seconds before their expiry that uploaded urls are renewed, so the pages of an open menu keep working
+RENEW_MARGIN = 60 * 60
+
+
+def url_expired(url: str, margin: float = 0) -> bool:
+    """Checks if a Discord CDN url has passed its signed expiry
+
+    Args:
+        url (str): Attachment url, optionally signed with an `ex` query parameter
+        margin (float): Seconds before the expiry the url already counts as expired
+
+    Returns:
+        bool: True if the url can no longer be used
+    """
+    expires = parse_qs(urlparse(url).query).get("ex")
+    if not expires:
+        return False
+    return int(expires[0], 16) <= time.time() + margin
+
+
+class LanguageAssets:
+    """Bundled language icons, read from disk once and kept in memory.
+
+    Every send gets its own `discord.File` view over the cached bytes. Once the icons are uploaded to
+    a channel, the CDN urls Discord gives back are used instead so pages don't need an attachment at all.
+    Discord signs those urls for about a day, `renew` gets them signed again from the uploaded messages.
+    """
+
+    def __init__(self, path: Optional[Path], urls: Optional[Dict[str, str]] = None,
+                 messages: Optional[List[int]] = None):
+        self.path = path
+        self.urls: Dict[str, str] = dict(urls or {})
+        # IDs of the messages the images were uploaded with
+        self.messages: List[int] = list(messages or [])
+        self._images: Dict[str, bytes] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._upload_lock = asyncio.Lock()
+
+    def _read(self) -> Dict[str, bytes]:
+        if self.path is None or not self.path.is_dir():
+            return {}
+        return {image.stem: image.read_bytes() for image in self.path.glob("*.png")}
+
+    async def load(self):
+        """Reads bundled images into memory, only the first call touches the disk"""
+        if self._loaded:
+            return
+        async with self._lock:
+            if not self._loaded:
+                self._images = await asyncio.get_running_loop().run_in_executor(None, self._read)
+                self._loaded = True
+
+    @property
+    def languages(self) -> List[str]:
+        return sorted(self._images)
+
+    def expiring(self) -> List[str]:
+        """Returns the bundled languages whose uploaded url is missing or about to expire"""
+        return [language for language in self.languages
+                if language not in self.urls or url_expired(self.urls[language], RENEW_MARGIN)]
+
+    def file(self, language: str) -> Optional[discord.File]:
+        """Returns a new attachment of a bundled image
+
+        Args:
+            language (str): Codewars language id
+
+        Returns:
+            Optional[discord.File]: Attachment named `<language>.png`, None if the image isn't bundled
+        """
+        image = self._images.get(language)
+        if image is None:
+            return None
+        return discord.File(io.BytesIO(image), filename=f"{language}.png")
+
+    def url(self, language: str) -> Optional[str]:
+        """Returns the best url to show a language icon with
+
+        Args:
+            language (str): Codewars language id
+
+        Returns:
+            Optional[str]: Uploaded CDN url if still valid, otherwise the fallback url
+        """
+        # Urls are renewed ahead of their expiry, the fallback is for images that were never uploaded
+        url = self.urls.get(language)
+        if url and not url_expired(url):
+            return url
+        return LANGUAGE_IMAGES.get(language)
+
+    def _remember(self, message: discord.Message):
+        for attachment in message.attachments:
+            self.urls[Path(attachment.filename).stem] = attachment.url
+
+    async def _upload(self, channel: discord.abc.Messageable):
+        messages = []
+        languages = self.languages
+        for start in range(0, len(languages), ATTACHMENTS_PER_MESSAGE):
+            batch = languages[start:start + ATTACHMENTS_PER_MESSAGE]
+            message = await channel.send(files=[self.file(language) for language in batch])
+            self._remember(message)
+            messages.append(message.id)
+        self.messages = messages
+
+    async def upload(self, channel: discord.abc.Messageable) -> Dict[str, str]:
+        """Uploads every bundled image once and remembers the CDN urls
+
+        Args:
+            channel (discord.abc.Messageable): Channel to keep the uploaded images in
+
+        Returns:
+            Dict[str, str]: Language to CDN url mapping
+        """
+        await self.load()
+        async with self._upload_lock:
+            await self._upload(channel)
+        return self.urls
+
+    async def renew(self, channel: discord.abc.Messageable) -> Dict[str, str]:
+        """Renews the urls that are missing or about to expire. The uploaded messages are fetched again,
+        which gives freshly signed urls, and the images are uploaded again if that doesn't cover them all.
+
+        Args:
+            channel (discord.abc.Messageable): Channel the images were uploaded to
+
+        Returns:
+            Dict[str, str]: Language to CDN url mapping
+        """
+        await self.load()
+        async with self._upload_lock:
+            # Another caller may have renewed them while this one waited
+            if not self.expiring():
+                return self.urls
+            for message_id in self.messages:
+                try:
+                    self._remember(await channel.fetch_message(message_id))
+                except discord.NotFound:
+                    # Deleted, its images are uploaded again below
+                    continue
+            if self.expiring():
+                await self._upload(channel)
+        return self.urls
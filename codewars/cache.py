@@ -0,0 +1,472 @@
+import zlib
+import time
+import json
+import uuid
+import asyncio
+import logging
+import contextlib
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import discord
+
+# Header of cache snapshot files, the version is bumped whenever the layout of the snapshot changes
+SNAPSHOT_MAGIC = b"RCCACHE"
+SNAPSHOT_VERSION = 1
+# Seconds between two attempts to take a lock held by another process
+LOCK_POLL_INTERVAL = 0.05
+# Seconds a Redis command may take before the backend is treated as failing
+BACKEND_TIMEOUT = 2.0
+# Seconds between two warnings about a failing backend
+BACKEND_WARNING_INTERVAL = 60
+
+log = logging.getLogger("red.codewars.cache")
+_warned_at = 0.0
+
+
+def _backend_failed(action: str):
+    """Logs a failing backend call, with its traceback at most once per BACKEND_WARNING_INTERVAL"""
+    global _warned_at
+    now = time.monotonic()
+    if now - _warned_at >= BACKEND_WARNING_INTERVAL:
+        _warned_at = now
+        log.warning("The cache backend failed to %s, going on without it", action, exc_info=True)
+    else:
+        log.debug("The cache backend failed to %s", action, exc_info=True)
+
+
+def data_version(data) -> int:
+    """Returns a stable version number for JSON-like data
+
+    Args:
+        data: Data an embed is rendered from
+
+    Returns:
+        int: Checksum of the data, changes whenever the data changes
+    """
+    return zlib.crc32(json.dumps(data, sort_keys=True, default=str).encode())
+
+
+class RenderCache:
+    """Serialized embeds keyed by the rendered entity and the version of the data they were rendered from.
+
+    An entry rendered from an older version of the data is treated as a miss and replaced on the next set.
+    Least recently used entries are evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[discord.Embed]:
+        """Returns a fresh copy of the cached embed, or None if it is missing or outdated
+
+        Args:
+            key (Hashable): Rendered entity, e.g. `("profile", username)`
+            version (Hashable): Version of the data the caller is about to render
+
+        Returns:
+            Optional[discord.Embed]: Embed that is safe to modify
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return discord.Embed.from_dict(entry[1])
+
+    def set(self, key: Hashable, version: Hashable, embed: discord.Embed):
+        """Stores an embed, replacing any older version of the same entity
+
+        Args:
+            key (Hashable): Rendered entity
+            version (Hashable): Version of the data the embed was rendered from
+            embed (discord.Embed): Rendered embed
+        """
+        self._entries[key] = (version, embed.to_dict())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drops the cached embed of an entity
+
+        Args:
+            key (Hashable): Rendered entity
+        """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class TTLCache:
+    """Values that expire `ttl` seconds after they were stored.
+
+    Least recently used entries are evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        """Returns the value of a key if it hasn't expired yet
+
+        Args:
+            key (Hashable): Cache key
+            default: Returned if the key is missing or expired
+
+        Returns:
+            Cached value or default
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None):
+        """Stores a value
+
+        Args:
+            key (Hashable): Cache key
+            value: Value to store
+            ttl (Optional[float]): Seconds to keep the value, defaults to the cache's ttl
+        """
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._entries.clear()
+
+    def dump(self) -> list:
+        """Returns the entries that haven't expired, with their expiry as wall clock time
+
+        Returns:
+            list: `[key, value, expires_at]` entries, oldest first
+        """
+        monotonic, now = time.monotonic(), time.time()
+        return [[key, value, now + expires_at - monotonic]
+                for key, (value, expires_at) in self._entries.items() if expires_at > monotonic]
+
+    def load(self, entries: list) -> int:
+        """Restores dumped entries. Expired entries and keys that are already cached are skipped.
+
+        Args:
+            entries (list): Entries returned by `dump`, possibly after a JSON round trip
+
+        Returns:
+            int: Number of restored entries
+        """
+        monotonic, now = time.monotonic(), time.time()
+        restored = 0
+        for key, value, expires_at in entries:
+            # JSON turns tuple keys into lists
+            if isinstance(key, list):
+                key = tuple(key)
+            if expires_at <= now or key in self._entries:
+                continue
+            self._entries[key] = (value, monotonic + expires_at - now)
+            self._entries.move_to_end(key, last=False)
+            restored += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return restored
+
+
+def save_snapshot(path: Path, caches: Dict[str, TTLCache]):
+    """Writes the caches to a compressed, versioned snapshot file
+
+    Args:
+        path (Path): Snapshot file
+        caches (Dict[str, TTLCache]): Caches by name
+    """
+    payload = {"saved_at": time.time(), "caches": {name: cache.dump() for name, cache in caches.items()}}
+    data = zlib.compress(json.dumps(payload, separators=(",", ":"), default=str).encode())
+    temporary = path.with_suffix(".tmp")
+    temporary.write_bytes(SNAPSHOT_MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big") + data)
+    temporary.replace(path)
+
+
+def read_snapshot(path: Path) -> Optional[dict]:
+    """Reads a snapshot file written by `save_snapshot`
+
+    Args:
+        path (Path): Snapshot file
+
+    Returns:
+        Optional[dict]: Dumped entries by cache name, None if the file is missing, corrupt or of another version
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    header = len(SNAPSHOT_MAGIC)
+    if data[:header] != SNAPSHOT_MAGIC or int.from_bytes(data[header:header + 2], "big") != SNAPSHOT_VERSION:
+        return None
+    try:
+        return json.loads(zlib.decompress(data[header + 2:]))["caches"]
+    except (zlib.error, ValueError, KeyError):
+        return None
+
+
+def restore_snapshot(snapshot: Optional[dict], caches: Dict[str, TTLCache]) -> int:
+    """Loads the entries of a snapshot into the caches
+
+    Args:
+        snapshot (Optional[dict]): Result of `read_snapshot`
+        caches (Dict[str, TTLCache]): Caches by name, entries of unknown caches are ignored
+
+    Returns:
+        int: Number of restored entries
+    """
+    if not snapshot:
+        return 0
+    return sum(caches[name].load(entries) for name, entries in snapshot.items() if name in caches)
+
+
+class MemoryBackend:
+    """Cache backend private to this process, the default.
+
+    Backends hold the state bot processes can share: entries, locks that let a single process
+    produce an entry at a time, and rate limit windows. Keys are strings and values JSON-like.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._entries = TTLCache(ttl=60, maxsize=maxsize)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._windows: Dict[str, tuple] = {}
+
+    async def get(self, key: str):
+        return self._entries.get(key)
+
+    async def set(self, key: str, value, ttl: float):
+        self._entries.set(key, value, ttl=ttl)
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: str, timeout: float = 10.0):
+        """Holds the lock of a key, waiting at most `timeout` seconds for it.
+        The block runs without the lock if it can't be acquired in time.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        acquired = False
+        try:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(lock.acquire(), timeout)
+                acquired = True
+            yield
+        finally:
+            if acquired:
+                lock.release()
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def take_token(self, bucket: str, limit: int, per: float = 1.0) -> float:
+        """Takes one of the `limit` tokens a bucket has every `per` seconds
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until the bucket refills
+        """
+        window = int(time.time() / per)
+        start, used = self._windows.get(bucket, (window, 0))
+        if start != window:
+            used = 0
+        if used < limit:
+            self._windows[bucket] = (window, used + 1)
+            return 0.0
+        return (window + 1) * per - time.time()
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Cache backend shared by every bot process connected to the same Redis server.
+
+    Needs the optional `redis` package. Values are stored as JSON under `namespace`.
+    """
+
+    def __init__(self, client, namespace: str):
+        self.client = client
+        self.namespace = namespace
+
+    @classmethod
+    async def from_url(cls, url: str, namespace: str) -> "RedisBackend":
+        """Connects to a Redis server
+
+        Args:
+            url (str): Server url, e.g. "redis://localhost:6379/0"
+            namespace (str): Prefix of every key
+
+        Raises:
+            ImportError: The `redis` package is not installed
+            redis.exceptions.ConnectionError: The server can't be reached
+
+        Returns:
+            RedisBackend: Connected backend
+        """
+        import redis.asyncio
+
+        # Without timeouts a stuck server would hang every request waiting on the backend
+        client = redis.asyncio.from_url(url, socket_timeout=BACKEND_TIMEOUT, socket_connect_timeout=BACKEND_TIMEOUT)
+        await client.ping()
+        return cls(client, namespace)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str):
+        value = await self.client.get(self._key(key))
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value, ttl: float):
+        await self.client.set(self._key(key), json.dumps(value, separators=(",", ":"), default=str),
+                              px=max(1, int(ttl * 1000)))
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: str, timeout: float = 10.0):
+        """Holds the lock of a key across processes, waiting at most `timeout` seconds for it.
+        The lock expires after `timeout` seconds in case its holder dies. The block runs
+        without the lock if it can't be acquired in time or the server fails.
+        """
+        from redis.exceptions import WatchError
+
+        name = self._key(f"lock:{key}")
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        acquired = False
+        while True:
+            try:
+                acquired = bool(await self.client.set(name, token, nx=True, px=int(timeout * 1000)))
+            except Exception:
+                _backend_failed("take a lock")
+                break
+            if acquired or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if acquired:
+                # Only delete our own lock, it may have expired and been taken by another process
+                try:
+                    async with self.client.pipeline() as pipe:
+                        with contextlib.suppress(WatchError):
+                            await pipe.watch(name)
+                            if await pipe.get(name) == token.encode():
+                                pipe.multi()
+                                pipe.delete(name)
+                                await pipe.execute()
+                except Exception:
+                    # It expires on its own
+                    _backend_failed("release a lock")
+
+    async def take_token(self, bucket: str, limit: int, per: float = 1.0) -> float:
+        """Takes one of the `limit` tokens a bucket has every `per` seconds, across processes
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until the bucket refills
+        """
+        window = int(time.time() / per)
+        key = self._key(f"rate:{bucket}:{window}")
+        # One transaction, a process dying between the two commands would leave a key that never expires
+        async with self.client.pipeline(transaction=True) as pipe:
+            used, _ = await pipe.incr(key).pexpire(key, max(1, int(per * 2000))).execute()
+        if used <= limit:
+            return 0.0
+        return (window + 1) * per - time.time()
+
+    async def close(self):
+        # redis-py 5 renamed close to aclose
+        await getattr(self.client, "aclose", self.client.close)()
+
+
+async def wait_for_token(backend, fallback: MemoryBackend, bucket: str, limit: int, per: float = 1.0) -> int:
+    """Waits until a token of a rate limit bucket is taken. While the backend fails, tokens are
+    taken from `fallback`, a limiter private to the process, so an outage of the backend neither
+    fails nor unthrottles the requests it limits.
+
+    Args:
+        backend (MemoryBackend or RedisBackend): Cache backend
+        fallback (MemoryBackend): Limiter used while the backend fails
+        bucket (str): Rate limit bucket
+        limit (int): Tokens per `per` seconds
+        per (float): Seconds of a rate limit window
+
+    Returns:
+        int: Number of times it had to wait for a token
+    """
+    waits = 0
+    while True:
+        try:
+            wait = await backend.take_token(bucket, limit, per)
+        except Exception:
+            _backend_failed("take a rate limit token")
+            wait = await fallback.take_token(bucket, limit, per)
+        if not wait:
+            return waits
+        waits += 1
+        await asyncio.sleep(wait)
+
+
+async def single_flight(backend, key: str, ttl: float, produce: Callable[[], Awaitable[Any]],
+                        accept: Optional[Callable[[Any], bool]] = None):
+    """Returns the entry of a key from the backend, or produces and stores it. Only one
+    process produces an entry at a time, the others wait for it and read it from the backend.
+    While the backend fails, entries are produced without it.
+
+    Args:
+        backend (MemoryBackend or RedisBackend): Cache backend
+        key (str): Entry key
+        ttl (float): Seconds the produced entry is kept
+        produce (Callable[[], Awaitable[Any]]): Coroutine function producing the entry, None is not stored
+        accept (Optional[Callable[[Any], bool]]): Tells if a stored entry can be used, e.g. if it's young enough
+
+    Returns:
+        The stored or produced entry
+    """
+    def usable(value) -> bool:
+        return value is not None and (accept is None or accept(value))
+
+    async def get():
+        try:
+            return await backend.get(key)
+        except Exception:
+            _backend_failed("read an entry")
+
+    value = await get()
+    if usable(value):
+        return value
+    async with backend.lock(key):
+        value = await get()
+        if usable(value):
+            return value
+        value = await produce()
+        if value is not None:
+            try:
+                await backend.set(key, value, ttl)
+            except Exception:
+                _backend_failed("store an entry")
+        return value
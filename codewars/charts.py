@@ -0,0 +1,57 @@
+import io
+import importlib.util
+from typing import Dict
+
+# Colors of Codewars ranks, brighter than the embed colors so bars stand out on a dark background
+RANK_COLORS = {"white": "#e6e6e6", "yellow": "#ecb613", "blue": "#3c7ebb", "purple": "#866cc7",
+               "black": "#555555", "red": "#bb432c"}
+CHART_BACKGROUND = "#303136"
+CHART_FOREGROUND = "#dcddde"
+
+
+def charts_available() -> bool:
+    """Whether matplotlib is installed, checked without importing it"""
+    return importlib.util.find_spec("matplotlib") is not None
+
+
+def render_language_chart(username: str, languages: Dict[str, dict]) -> bytes:
+    """Draws a bar chart of the score of each language, colored and labeled by rank.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Args:
+        username (str): Codewars username, used in the title
+        languages (Dict[str, dict]): `ranks.languages` of the user's profile
+
+    Returns:
+        bytes: PNG image
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    ranked = sorted(languages.items(), key=lambda item: item[1].get("score", 0))
+    names = [language.capitalize() for language, _ in ranked]
+    scores = [stats.get("score", 0) for _, stats in ranked]
+
+    figure = Figure(figsize=(8, 1.2 + 0.45 * len(ranked)), dpi=100, facecolor=CHART_BACKGROUND)
+    axes = figure.add_subplot()
+    axes.set_facecolor(CHART_BACKGROUND)
+    bars = axes.barh(names, scores, color=[RANK_COLORS.get(stats.get("color"), RANK_COLORS["white"])
+                                           for _, stats in ranked])
+    axes.bar_label(bars, labels=[stats.get("name", "") for _, stats in ranked], padding=4,
+                   color=CHART_FOREGROUND, fontsize=9)
+    axes.set_title(f"Language scores of {username}", color=CHART_FOREGROUND)
+    axes.set_xlabel("Score", color=CHART_FOREGROUND)
+    axes.tick_params(colors=CHART_FOREGROUND)
+    # Room for the rank label of the longest bar
+    axes.set_xlim(0, max(scores, default=0) * 1.15 or 1)
+    for side in ("top", "right"):
+        axes.spines[side].set_visible(False)
+    for side in ("bottom", "left"):
+        axes.spines[side].set_color(CHART_FOREGROUND)
+    figure.tight_layout()
+
+    image = io.BytesIO()
+    figure.savefig(image, format="png", facecolor=CHART_BACKGROUND)
+    return image.getvalue()
@@ -8,18 +8,151 @@
 import asyncio
 import contextlib
 import functools
-from typing import Iterable, List, Union
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple, Union
 
 import discord
 from redbot.core import commands
 from redbot.core.utils.predicates import ReactionPredicate
 
+try:
+    # Message components need discord.py 2
+    from discord import ui
+except ImportError:
+    ui = None
+
+log = logging.getLogger("red.codewars.dict_menu")
+
 _ReactableEmoji = Union[str, discord.Emoji]
+_Page = Union[str, discord.Embed]
+
+# Seconds to wait for more page turns before editing the message, turns within it cost one edit
+EDIT_DEBOUNCE = 0.3
+
+# Page edits made by menus and page edits saved by coalescing page turns, since the module was loaded
+menu_stats: Counter = Counter()
+
+# Discord's limits of a single embed
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_CHARS = 6000
+
+
+def pack_fields(
+    fields: List[Tuple],
+    reserved: int = 0,
+    max_fields: int = EMBED_MAX_FIELDS,
+    max_chars: int = EMBED_MAX_CHARS,
+) -> List[List[Tuple]]:
+    """
+    Packs embed fields into as few pages as possible, in order.
+
+    A page is closed when the next field would take it over the field count
+    or the character limit of an embed, measured from the fields themselves.
+
+    Parameters
+    ----------
+    fields: List[Tuple]
+        ``(name, value, ...)`` tuples, items after the value are kept as is
+    reserved: int
+        The characters every page already uses outside of the fields,
+        e.g. ``len(embed)`` of an embed with only the author and footer set
+    max_fields: int
+        The number of fields a page may hold
+    max_chars: int
+        The number of characters a page may hold
+
+    Returns
+    -------
+    List[List[Tuple]]
+        The fields of every page
+    """
+    pages: List[List[Tuple]] = []
+    page: List[Tuple] = []
+    size = reserved
+    for field in fields:
+        field_size = len(str(field[0])) + len(str(field[1]))
+        if page and (len(page) == max_fields or size + field_size > max_chars):
+            pages.append(page)
+            page, size = [], reserved
+        page.append(field)
+        size += field_size
+    if page:
+        pages.append(page)
+    return pages
+
+
+class PageSource:
+    """
+    Pages of a menu that are rendered only when they are about to be shown.
+
+    Rendered pages are kept for the lifetime of the menu, and the pages right after
+    the one being shown are rendered in the background so turning to them is instant.
+
+    Parameters
+    ----------
+    page_count: int
+        The number of pages in the menu
+    render: Callable[[int], Awaitable[Union[str, discord.Embed]]]
+        A coroutine function that renders the page at the given index
+    prefetch: int
+        The number of following pages to render in the background. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        page_count: int,
+        render: Callable[[int], Awaitable[_Page]],
+        prefetch: int = 1,
+    ):
+        self.page_count = page_count
+        self.render = render
+        self.prefetch = prefetch
+        self._pages: Dict[int, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def _schedule(self, index: int) -> asyncio.Task:
+        task = self._pages.get(index)
+        if task is None:
+            task = self._pages[index] = asyncio.create_task(self.render(index))
+        return task
+
+    async def get_page(self, index: int) -> _Page:
+        """Returns the page at the given index, rendering it if needed"""
+        task = self._schedule(index)
+        for offset in range(1, self.prefetch + 1):
+            if index + offset < self.page_count:
+                self._schedule(index + offset)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            # Let the next visit try again instead of caching the failure
+            self._pages.pop(index, None)
+            raise
+
+    def close(self):
+        """Cancels pages that are still being rendered"""
+        for task in self._pages.values():
+            task.cancel()
+
+
+async def _get_page(page_content: Union[List[_Page], PageSource], page_number: int) -> _Page:
+    if isinstance(page_content, PageSource):
+        return await page_content.get_page(page_number)
+    return page_content[page_number]
+
+
+def _page_kwargs(page: _Page) -> dict:
+    if isinstance(page, discord.Embed):
+        return {"embed": page, "content": None}
+    return {"content": page, "embed": None}
 
 
 async def dict_menu(
     ctx: commands.Context,
-    page_content: Union[List[str], List[discord.Embed]],
+    page_content: Union[List[str], List[discord.Embed], PageSource],
     controls: dict,
     embed_per_page: int = 5,
     page_number: int = 0,
@@ -33,13 +166,15 @@ async def dict_menu(
     ----------
     ctx: commands.Context
         The command context
-    page_content: `list`
-        The content of the page of the menu.
+    page_content: `list` or `PageSource`
+        The pages of the menu, one item per page. A `PageSource` is shown one
+        page at a time and rendered on demand.
     controls: dict
         A mapping of emoji to the function which handles the action for the
         emoji.
     embed_per_page: int
-        The number of embeds per page. Defaults to 5.
+        Unused, kept for the controls' signature. Pack fields into pages
+        with `pack_fields` instead.
     page_number: int
         The current page number of the menu
     timeout: float
@@ -58,21 +193,11 @@ async def dict_menu(
         if not asyncio.iscoroutinefunction(maybe_coro):
             raise RuntimeError("Function must be a coroutine")
 
-    dict_page_content: dict = {}
-    total_page_number: int = 0
+    total_page_number: int = len(page_content)
+    if page_number >= total_page_number:
+        page_number = 0
 
-    if len(page_content) <= embed_per_page:
-        dict_page_content.update({total_page_number: page_content})
-    else:
-        # Divide the page content into pages using the embed_per_page parameter
-        for item in range(0, len(page_content), embed_per_page):
-            dict_page_content.update({total_page_number: page_content[item:item + embed_per_page]})
-            total_page_number += 1
-
-    if page_number < total_page_number:
-        current_page = dict_page_content[page_number][0]
-    else:
-        current_page = dict_page_content[0][-1]
+    current_page = await _get_page(page_content, page_number)
 
     if not message:
         if isinstance(current_page, discord.Embed):
@@ -80,6 +205,7 @@ async def dict_menu(
         else:
             message = await ctx.send(current_page)
         # Don't wait for reactions to be added (GH-1797)
+        # Reactions stay on the message, so they are only added once
         # noinspection PyAsyncCall
         start_adding_reactions(message, controls.keys())
     else:
@@ -88,11 +214,10 @@ async def dict_menu(
                 await message.edit(embed=current_page)
             else:
                 await message.edit(content=current_page)
+            menu_stats["edits"] += 1
         except discord.NotFound:
             return
 
-    start_adding_reactions(message, controls.keys())
-
     try:
         react, user = await ctx.bot.wait_for(
             "reaction_add",
@@ -100,6 +225,8 @@ async def dict_menu(
             timeout=timeout,
         )
     except asyncio.TimeoutError:
+        if isinstance(page_content, PageSource):
+            page_content.close()
         if not ctx.me:
             return
         try:
@@ -131,6 +258,44 @@ async def dict_menu(
         )
 
 
+async def _coalesce_turns(
+    ctx: commands.Context,
+    controls: dict,
+    message: discord.Message,
+    page_number: int,
+    total_page_number: int,
+):
+    """
+    Applies the page turns that follow within `EDIT_DEBOUNCE` of each other,
+    so only the page the user stops at is shown.
+
+    Returns
+    -------
+    Tuple[int, Optional[str]]
+        The page to show and the emoji of a control other than a page turn
+        that ended the window, if any. That control is run from the new page
+        without showing it first.
+    """
+    turns = {emoji: 1 if func is next_page else -1
+             for emoji, func in controls.items() if func in (next_page, prev_page)}
+    while True:
+        try:
+            react, user = await ctx.bot.wait_for(
+                "reaction_add",
+                check=ReactionPredicate.with_emojis(tuple(controls.keys()), message, ctx.author),
+                timeout=EDIT_DEBOUNCE,
+            )
+        except asyncio.TimeoutError:
+            return page_number, None
+        if react.emoji not in turns:
+            return page_number, react.emoji
+        if message.channel.permissions_for(ctx.me).manage_messages:
+            with contextlib.suppress(discord.NotFound):
+                await message.remove_reaction(react.emoji, ctx.author)
+        page_number = (page_number + turns[react.emoji]) % total_page_number
+        menu_stats["edits_saved"] += 1
+
+
 async def next_page(
     ctx: commands.Context,
     page_content: list,
@@ -151,6 +316,10 @@ async def next_page(
         page_number = 0  # Loop around to the first item
     else:
         page_number += 1
+    page_number, pending = await _coalesce_turns(ctx, controls, message, page_number, total_page_number)
+    if pending is not None:
+        return await controls[pending](ctx, page_content, controls, embed_per_page, page_number, timeout,
+                                       message, pending, total_page_number)
     return await dict_menu(ctx,
                            page_content=page_content,
                            controls=controls,
@@ -181,6 +350,10 @@ async def prev_page(
         page_number = total_page_number - 1  # Loop around to the last item
     else:
         page_number -= 1
+    page_number, pending = await _coalesce_turns(ctx, controls, message, page_number, total_page_number)
+    if pending is not None:
+        return await controls[pending](ctx, page_content, controls, embed_per_page, page_number, timeout,
+                                       message, pending, total_page_number)
     return await dict_menu(ctx,
                            page_content=page_content,
                            controls=controls,
@@ -202,6 +375,8 @@ async def close_menu(
     emoji: str,
     total_page_number: int,
 ):
+    if isinstance(page_content, PageSource):
+        page_content.close()
     with contextlib.suppress(discord.NotFound):
         await message.delete()
 
@@ -248,3 +423,126 @@ DICT_CONTROLS = {
     "\N{CROSS MARK}": close_menu,
     "\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}": next_page,
 }
+
+
+if ui is not None:
+
+    class _ButtonMenu(ui.View):
+        """The buttons of a menu, every press is answered with a single interaction response."""
+
+        def __init__(self, ctx: commands.Context, page_content, page_number: int, timeout: float):
+            super().__init__(timeout=timeout)
+            self.ctx = ctx
+            self.page_content = page_content
+            self.page_number = page_number
+            self.message = None
+
+        async def interaction_check(self, interaction: discord.Interaction) -> bool:
+            return interaction.user.id == self.ctx.author.id
+
+        async def _turn(self, interaction: discord.Interaction, step: int):
+            page_number = (self.page_number + step) % len(self.page_content)
+            try:
+                page = await _get_page(self.page_content, page_number)
+            except Exception:
+                # An unanswered interaction shows the user "This interaction failed" with no reason
+                log.exception("Failed to render page %d of a menu", page_number + 1)
+                await interaction.response.send_message("This page could not be loaded, try again.", ephemeral=True)
+                return
+            self.page_number = page_number
+            await interaction.response.edit_message(**_page_kwargs(page), view=self)
+
+        @ui.button(emoji="\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}", style=discord.ButtonStyle.secondary)
+        async def previous(self, interaction: discord.Interaction, button: ui.Button):
+            await self._turn(interaction, -1)
+
+        @ui.button(emoji="\N{CROSS MARK}", style=discord.ButtonStyle.secondary)
+        async def close(self, interaction: discord.Interaction, button: ui.Button):
+            self._close()
+            await interaction.response.defer()
+            with contextlib.suppress(discord.NotFound):
+                await interaction.message.delete()
+
+        @ui.button(emoji="\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}", style=discord.ButtonStyle.secondary)
+        async def next(self, interaction: discord.Interaction, button: ui.Button):
+            await self._turn(interaction, 1)
+
+        def _close(self):
+            self.stop()
+            if isinstance(self.page_content, PageSource):
+                self.page_content.close()
+
+        async def on_timeout(self):
+            self._close()
+            if self.message is not None:
+                with contextlib.suppress(discord.HTTPException):
+                    await self.message.edit(view=None)
+
+
+async def button_menu(
+    ctx: commands.Context,
+    page_content: Union[List[str], List[discord.Embed], PageSource],
+    page_number: int = 0,
+    timeout: float = 30.0,
+):
+    """
+    A button-based menu, with the controls of `DICT_CONTROLS`.
+
+    Unlike reactions, buttons need no calls to set up or clean up and every
+    page turn is answered with one interaction response that edits the message.
+
+    Parameters
+    ----------
+    ctx: commands.Context
+        The command context
+    page_content: `list` or `PageSource`
+        The pages of the menu, one item per page
+    page_number: int
+        The page shown first
+    timeout: float
+        The time (in seconds) the buttons stay after the last press
+
+    Raises
+    ------
+    RuntimeError
+        If message components are not available in this version of discord.py
+    """
+    if ui is None:
+        raise RuntimeError("Message components need discord.py 2")
+    if page_number >= len(page_content):
+        page_number = 0
+    page = await _get_page(page_content, page_number)
+    view = _ButtonMenu(ctx, page_content, page_number, timeout)
+    view.message = await ctx.send(**_page_kwargs(page), view=view)
+    await view.wait()
+
+
+async def open_menu(
+    ctx: commands.Context,
+    page_content: Union[List[str], List[discord.Embed], PageSource],
+    controls: dict,
+    buttons: bool = False,
+    page_number: int = 0,
+    timeout: float = 30.0,
+):
+    """
+    Opens a menu with buttons when asked for and supported, with reactions otherwise.
+
+    Parameters
+    ----------
+    ctx: commands.Context
+        The command context
+    page_content: `list` or `PageSource`
+        The pages of the menu, one item per page
+    controls: dict
+        The reaction controls, used when the menu falls back to reactions
+    buttons: bool
+        Whether to use buttons, usually the guild's choice
+    page_number: int
+        The page shown first
+    timeout: float
+        The time (in seconds) to wait for a reaction or button press
+    """
+    if buttons and ui is not None:
+        return await button_menu(ctx, page_content, page_number=page_number, timeout=timeout)
+    return await dict_menu(ctx, page_content, controls, page_number=page_number, timeout=timeout)
@@ -0,0 +1,57 @@
+class CodewarsError(Exception):
+    """Base class of errors returned by Codewars"""
+
+
+class CodewarsBadRequest(CodewarsError):
+    """400 - The request was malformed"""
+
+
+class CodewarsUnauthorized(CodewarsError):
+    """401 - The request needs authentication"""
+
+
+class CodewarsForbidden(CodewarsError):
+    """403 - The request is not allowed"""
+
+
+class CodewarsNotFound(CodewarsError):
+    """404 - The requested resource doesn't exist"""
+
+
+class CodewarsUnavailable(CodewarsError):
+    """5xx - Codewars is failing or can't be reached"""
+
+
+class UserNotFound(CodewarsNotFound):
+    """The Codewars user doesn't exist"""
+
+
+class KataNotFound(CodewarsNotFound):
+    """The kata doesn't exist"""
+
+
+class AvatarNotFound(CodewarsNotFound):
+    """The user's profile page has no avatar"""
+
+
+STATUS_ERRORS = {
+    400: CodewarsBadRequest,
+    401: CodewarsUnauthorized,
+    403: CodewarsForbidden,
+    404: CodewarsNotFound,
+}
+
+
+def error_for_status(status_code: int, message: str) -> CodewarsError:
+    """Returns the error matching a HTTP status code
+
+    Args:
+        status_code (int): HTTP status code of the response
+        message (str): Error message
+
+    Returns:
+        CodewarsError: Error to raise
+    """
+    if status_code >= 500:
+        return CodewarsUnavailable(message)
+    return STATUS_ERRORS.get(status_code, CodewarsError)(message)
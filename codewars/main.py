@@ -1,14 +1,87 @@
+import io
 import time
-import httpx
+import contextlib
+import asyncio
+import logging
 import discord
 import datetime
-from lxml import html
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Optional
 from redbot.core import Config, commands
-from redbot.core.data_manager import bundled_data_path
-from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
+from redbot.core.data_manager import bundled_data_path, cog_data_path
+from redbot.core.utils.chat_formatting import box, pagify
 from redbot.core.utils.predicates import ReactionPredicate
-from .errors import CodewarsBadRequest, CodewarsUnauthorized, CodewarsForbidden, CodewarsNotFound
-from .dict_menu import dict_menu, DICT_CONTROLS
+from .cache import (RenderCache, TTLCache, MemoryBackend, RedisBackend, data_version,
+                    single_flight, wait_for_token, read_snapshot, restore_snapshot,
+                    save_snapshot)
+from .metrics import Metrics
+from .watchdog import LoopWatchdog
+from .breaker import CircuitBreaker, CircuitOpenError
+from .dict_menu import open_menu, pack_fields, menu_stats, DICT_CONTROLS, PageSource, ui
+from .errors import (CodewarsError, CodewarsBadRequest, CodewarsUnauthorized, CodewarsForbidden, CodewarsNotFound,
+                     CodewarsUnavailable, UserNotFound, KataNotFound, AvatarNotFound, error_for_status)
+from .assets import LanguageAssets
+from .search import KataIndex
+from .watcher import CompletionWatcher, new_completions
+from .charts import charts_available, render_language_chart
+
+# httpx, lxml and matplotlib are imported on first use so loading the cog stays fast
+if TYPE_CHECKING:
+    import httpx
+
+log = logging.getLogger("red.codewars")
+
+# Seconds between two writes of the metrics file
+METRICS_DUMP_INTERVAL = 60
+# Requests to Codewars that may be in flight at the same time
+HTTP_CONCURRENCY = 8
+# Requests per second to Codewars, shared by every bot process using the same cache backend
+HTTP_RATE = 10
+# Seconds kata metadata is reused before it is fetched again
+KATA_TTL = 60 * 60
+# Seconds a profile is served without refreshing it
+PROFILE_FRESH = 60
+# Seconds a profile may be served from the cache while it is refreshed in the background,
+# older profiles are fetched before answering
+PROFILE_MAX_STALENESS = 15 * 60
+# Seconds a profile is kept to be served, marked as stale, while Codewars is unavailable
+PROFILE_STALE_IF_ERROR = 6 * 60 * 60
+# Seconds an avatar url is reused before the profile page is scraped again
+AVATAR_TTL = 24 * 60 * 60
+# Seconds a user, kata or avatar that doesn't exist is remembered as missing
+NEGATIVE_TTL = 5 * 60
+# Seconds to wait after the bot is ready before warming up
+WARMUP_DELAY = 5
+# Katas listed by a search
+SEARCH_RESULTS = 10
+# Users that can be compared at once, one inline field and one table column each
+MAX_COMPARE_USERS = 5
+# Footer of embeds rendered from data kept while Codewars is unavailable
+STALE_FOOTER = "\N{WARNING SIGN} Cached, Codewars is unavailable · © Codewars"
+# Seconds between two checks of the completed katas of a user who just solved one
+WATCH_MIN_INTERVAL = 2 * 60
+# Seconds between two checks of the completed katas of an idle user
+WATCH_MAX_INTERVAL = 60 * 60
+# Checks of completed katas per second, a share of HTTP_RATE so commands aren't slowed down
+WATCH_RATE = 2
+# Users checked at the same time
+WATCH_BATCH = 10
+# Seconds between two reads of the registered users and announcement channels
+WATCH_SYNC_INTERVAL = 5 * 60
+# Completions announced per user and check, the rest are skipped
+MAX_ANNOUNCED_COMPLETIONS = 5
+# Processes drawing charts, matplotlib holds the GIL so charts are drawn outside the bot's process
+CHART_WORKERS = 1
+# Seconds a drawn chart is kept, charts are keyed by the data they show so they are never outdated
+CHART_TTL = 60 * 60
+# Drawn charts kept at once
+CHART_CACHE_SIZE = 64
+# Seconds before renewing the uploaded language images is tried again after it failed
+ASSET_RENEW_RETRY = 10 * 60
+# Profile values that get an already sent profile embed updated when they change
+PROFILE_KEY_NUMBERS = ("overall_rank", "overall_score", "totalCompleted", "leaderboardPosition", "honor")
 
 
 class Codewars(commands.Cog):
@@ -28,8 +101,330 @@ class Codewars(commands.Cog):
 
         # Config
         default_user = {"username": ""}
+        # menu_backend: "reactions" or "buttons"
+        # announce_channel: channel new completions of the guild's members are posted to
+        default_guild = {"menu_backend": "reactions", "announce_channel": None}
+        # CDN urls of uploaded language images
+        # asset_channel, asset_messages: where the language images were uploaded, to renew their urls from
+        # metrics_dump: None, "prometheus" or "json"
+        # watchdog_threshold: seconds of loop lag reported as a stall
+        # warmup: open connections and load heavy modules in the background after loading
+        # cache_backend: None for memory or the url of a Redis server shared by the bot's processes
+        # completion_marks: username -> completedAt of the last completion seen by the watcher
+        default_global = {"asset_urls": {}, "asset_channel": None, "asset_messages": [], "metrics_dump": None, "watchdog": False, "watchdog_threshold": 0.1,
+                          "warmup": True, "cache_backend": None, "completion_marks": {}}
         self.config = Config.get_conf(self, identifier="0xC0D3W4R8")
         self.config.register_user(**default_user)
+        self.config.register_guild(**default_guild)
+        self.config.register_global(**default_global)
+
+        self._session = None
+        self.warmup_task = None
+        self.cache_task = None
+        self.http_semaphore = asyncio.Semaphore(HTTP_CONCURRENCY)
+        # Entries, locks and rate limits shared with the bot's other processes
+        self.backend = MemoryBackend()
+        # Rate limits of this process alone, used while the shared backend fails
+        self.rate_fallback = MemoryBackend()
+        # url -> task of the request in flight, concurrent callers share it
+        self.inflight = dict()
+        self.kata_cache = TTLCache(ttl=KATA_TTL)
+        # Searchable katas, outlives the cache so every kata seen stays searchable
+        self.kata_index = KataIndex()
+        # username -> (user_info, fetched_at), fetched_at is wall clock time so it survives restarts
+        self.profile_cache = TTLCache(ttl=PROFILE_STALE_IF_ERROR)
+        # username -> task refreshing the cached profile
+        self.profile_refreshes = dict()
+        self.avatar_cache = TTLCache(ttl=AVATAR_TTL)
+        # (kind, key) of lookups that returned 404, repeated lookups fail without a request
+        self.missing = TTLCache(ttl=NEGATIVE_TTL)
+        self.metrics = Metrics("codewars")
+        self.watchdog = LoopWatchdog(self.metrics, log)
+        # span of the requests -> breaker of the upstream they go to
+        self.breakers = {span: CircuitBreaker(name, self.metrics, log)
+                         for span, name in (("http.codewars_api", "codewars_api"),
+                                            ("http.codewars_html", "codewars_html"))}
+        self.render_cache = RenderCache()
+        self._chart_pool = None
+        # (username, data version) -> PNG bytes
+        self.chart_cache = TTLCache(ttl=CHART_TTL, maxsize=CHART_CACHE_SIZE)
+        # (username, data version) -> task drawing the chart
+        self.chart_renders = dict()
+        try:
+            assets_path = bundled_data_path(self)
+        except FileNotFoundError:
+            assets_path = None
+        self.language_assets = LanguageAssets(assets_path)
+        self.assets_renew_after = 0.0
+        self.watcher = CompletionWatcher(WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL)
+        # username -> announcement channels of the guilds the user is in
+        self.watched = dict()
+        # Set when registered users or announcement channels change
+        self.watch_changed = asyncio.Event()
+        self.metrics_task = asyncio.create_task(self.dump_metrics_loop())
+        self.watch_task = asyncio.create_task(self.watch_loop())
+
+    @property
+    def session(self) -> "httpx.AsyncClient":
+        """HTTP client shared by all requests, created on first use"""
+        if self._session is None:
+            import httpx
+            self._session = httpx.AsyncClient(timeout=30.0)
+        return self._session
+
+    @session.setter
+    def session(self, session: "httpx.AsyncClient"):
+        self._session = session
+
+    @property
+    def chart_pool(self) -> ProcessPoolExecutor:
+        """Worker processes drawing charts, started on first use"""
+        if self._chart_pool is None:
+            self._chart_pool = ProcessPoolExecutor(max_workers=CHART_WORKERS)
+        return self._chart_pool
+
+    @property
+    def persistent_caches(self):
+        """Caches saved to the cog's data folder on unload and restored on load"""
+        return {"kata": self.kata_cache, "profile": self.profile_cache, "avatar": self.avatar_cache,
+                "missing": self.missing}
+
+    async def initialize(self):
+        self.cache_task = asyncio.create_task(self.load_caches())
+        backend_url = await self.config.cache_backend()
+        if backend_url:
+            try:
+                await self.set_backend(backend_url)
+            except Exception:
+                log.exception("Could not connect to the cache backend, caching in memory")
+        if await self.config.watchdog():
+            self.watchdog.threshold = await self.config.watchdog_threshold()
+            self.watchdog.start()
+        if await self.config.warmup():
+            self.warmup_task = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self):
+        """Pays the cold costs of the first command in the background: imports the parsing
+        modules off the event loop, opens a pooled connection to Codewars and loads the language assets.
+        """
+        await self.bot.wait_until_red_ready()
+        await asyncio.sleep(WARMUP_DELAY)
+        with self.metrics.span("warmup"):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, __import__, "lxml.html")
+            try:
+                await self.session.head("https://www.codewars.com/api/v1/")
+            except Exception:
+                log.debug("Could not open a connection to Codewars while warming up", exc_info=True)
+            await self.get_language_assets()
+
+    async def load_caches(self):
+        """Restores the caches saved by the previous instance of the cog. The file is read and
+        decompressed off the event loop, entries cached in the meantime are kept.
+        """
+        with self.metrics.span("cache.load"):
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, read_snapshot, cog_data_path(self) / "cache.bin")
+            restored = restore_snapshot(snapshot, self.persistent_caches)
+            for _, kata_info, _ in (snapshot or {}).get("kata", []):
+                self.kata_index.add(kata_info)
+        self.metrics.incr("cache.restored", restored)
+
+    async def set_backend(self, url: Optional[str]):
+        """Switches the cache backend
+
+        Args:
+            url (Optional[str]): Redis server url, None for memory
+        """
+        backend = await RedisBackend.from_url(url, "red-cogs:codewars") if url else MemoryBackend()
+        previous, self.backend = self.backend, backend
+        await previous.close()
+
+    def save_caches(self):
+        # Saving before the snapshot is restored would throw the previous one away
+        if self.cache_task is None or not self.cache_task.done():
+            return
+        try:
+            with self.metrics.span("cache.save"):
+                save_snapshot(cog_data_path(self) / "cache.bin", self.persistent_caches)
+        except OSError:
+            log.exception("Could not save the caches")
+
+    def cog_unload(self):
+        self.save_caches()
+        if self.cache_task is not None:
+            self.cache_task.cancel()
+        for task in self.profile_refreshes.values():
+            task.cancel()
+        for task in self.chart_renders.values():
+            task.cancel()
+        if self._chart_pool is not None:
+            self._chart_pool.shutdown(wait=False)
+        if self.warmup_task is not None:
+            self.warmup_task.cancel()
+        self.watchdog.stop()
+        self.metrics_task.cancel()
+        self.watch_task.cancel()
+        asyncio.create_task(self.backend.close())
+        if self._session is not None:
+            asyncio.create_task(self._session.aclose())
+
+    async def cog_before_invoke(self, ctx):
+        ctx.codewars_invoked_at = time.perf_counter()
+        self.watchdog.enter(ctx)
+
+    async def cog_after_invoke(self, ctx):
+        self.watchdog.exit(ctx)
+        invoked_at = getattr(ctx, "codewars_invoked_at", None)
+        if invoked_at is not None:
+            self.metrics.observe(f"command.{ctx.command.qualified_name}",
+                                 time.perf_counter() - invoked_at, error=ctx.command_failed)
+
+    def collect_metrics(self):
+        """Copies the counters kept outside of the cog's metrics into them"""
+        for name, value in menu_stats.items():
+            self.metrics.counters[f"menu.{name}"] = value
+
+    def write_metrics(self, fmt: str):
+        """Writes the metrics to the cog's data path
+
+        Args:
+            fmt (str): "prometheus" or "json"
+
+        Returns:
+            Path: Written file
+        """
+        self.collect_metrics()
+        if fmt == "prometheus":
+            path = cog_data_path(self) / "metrics.prom"
+            path.write_text(self.metrics.to_prometheus())
+        else:
+            path = cog_data_path(self) / "metrics.json"
+            path.write_text(self.metrics.to_json())
+        return path
+
+    async def dump_metrics_loop(self):
+        while True:
+            await asyncio.sleep(METRICS_DUMP_INTERVAL)
+            fmt = await self.config.metrics_dump()
+            if not fmt:
+                continue
+            try:
+                self.write_metrics(fmt)
+            except OSError:
+                # A full disk or a removed data folder shouldn't stop the next dumps
+                log.exception("Failed to write the metrics")
+
+    async def menu(self, ctx, pages):
+        """Opens a menu with the backend chosen by the guild, reactions in DMs"""
+        buttons = ctx.guild is not None and await self.config.guild(ctx.guild).menu_backend() == "buttons"
+        await open_menu(ctx, pages, DICT_CONTROLS, buttons=buttons)
+
+    async def get_language_assets(self) -> LanguageAssets:
+        """Returns the language assets with bundled images loaded, uploaded urls restored and renewed
+        before they expire
+
+        Returns:
+            LanguageAssets: Language assets
+        """
+        assets = self.language_assets
+        if not assets.urls:
+            assets.urls.update(await self.config.asset_urls())
+            assets.messages = await self.config.asset_messages()
+        await assets.load()
+        if assets.expiring() and time.monotonic() >= self.assets_renew_after:
+            await self.renew_language_assets()
+        return assets
+
+    async def renew_language_assets(self):
+        """Renews the urls of the uploaded language images in the channel they were uploaded to.
+        Until the images are uploaded, or while renewing fails, the fallback urls are used."""
+        channel_id = await self.config.asset_channel()
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            return
+        try:
+            with self.metrics.span("assets.renew"):
+                urls = await self.language_assets.renew(channel)
+        except discord.HTTPException:
+            self.assets_renew_after = time.monotonic() + ASSET_RENEW_RETRY
+            log.warning("Could not renew the language images in channel %s", channel_id, exc_info=True)
+            return
+        await self.config.asset_urls.set(urls)
+        await self.config.asset_messages.set(self.language_assets.messages)
+
+    async def fetch(self, url: str, span: str) -> "httpx.Response":
+        """Sends a GET request to Codewars. Identical requests in flight are sent only once
+        and the number of concurrent requests is bounded by HTTP_CONCURRENCY.
+        Requests to an upstream that keeps failing are refused by its circuit breaker.
+
+        Args:
+            url (str): Url to get
+            span (str): Metrics span the request is timed under, also picks the breaker
+
+        Raises:
+            CodewarsUnavailable: Codewars can't be reached or its circuit is open
+
+        Returns:
+            httpx.Response: Response of the request
+        """
+        task = self.inflight.get(url)
+        if task is None:
+            task = self.inflight[url] = asyncio.create_task(self._fetch(url, span))
+            task.add_done_callback(lambda done: self.inflight.pop(url, None) if self.inflight.get(url) is done else None)
+        else:
+            self.metrics.incr("http.coalesced")
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, span: str) -> "httpx.Response":
+        import httpx
+        breaker = self.breakers[span]
+        # Refused requests fail before queueing for the semaphore
+        try:
+            breaker.check()
+        except CircuitOpenError as error:
+            raise CodewarsUnavailable(f"Error, Codewars is unavailable. Retrying in {error.retry_after:.0f} seconds.")
+        # Outside of the breaker's outcome, a failing cache backend isn't a failing Codewars.
+        # Only cancellation gets out of it, tokens come from this process while the backend fails
+        try:
+            waits = await wait_for_token(self.backend, self.rate_fallback, "codewars", HTTP_RATE)
+        except BaseException:
+            breaker.release()
+            raise
+        if waits:
+            self.metrics.incr("http.rate_limited", waits)
+        try:
+            async with self.http_semaphore:
+                with self.metrics.span(span):
+                    response = await self.session.get(url)
+        except httpx.TransportError as error:
+            breaker.record(False)
+            raise CodewarsUnavailable("Error, could not reach Codewars.") from error
+        except Exception:
+            breaker.record(False)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(response.status_code < 500)
+        return response
+
+    def is_missing(self, kind: str, key: str) -> bool:
+        """Checks if a lookup recently returned 404
+
+        Args:
+            kind (str): "user", "kata" or "avatar"
+            key (str): Username or kata ID
+
+        Returns:
+            bool: True if the lookup should fail without a request
+        """
+        missing = self.missing.get((kind, key.lower()), False)
+        self.metrics.cache(f"missing_{kind}", missing)
+        return missing
+
+    def set_missing(self, kind: str, key: str):
+        self.missing.set((kind, key.lower()), True)
 
     async def format_color(self, color: str) -> int:
         """Formats a color string to a hex value
@@ -45,60 +440,150 @@ class Codewars(commands.Cog):
         return colors.get(color, 0xFFFFFF)
 
     async def get_user_avatar(self, user):
+        cached = self.avatar_cache.get(user.lower())
+        self.metrics.cache("avatar", cached is not None)
+        if cached is not None:
+            return cached
+        if self.is_missing("avatar", user):
+            raise AvatarNotFound("Error, user has no avatar.")
         url = f"https://www.codewars.com/users/{user}"
         xpath = "//div[1]/div[1]/main/div[3]/section/div/figure/a/img/@src"
-        request = httpx.get(url).content
-        tree = html.fromstring(request)
-        return tree.xpath(xpath)[0]
+        response = await self.fetch(url, "http.codewars_html")
+        if response.status_code == 404:
+            self.set_missing("avatar", user)
+            raise AvatarNotFound("Error, user not found.")
+        if response.status_code != 200:
+            # An error page says nothing about the avatar, so it isn't recorded as missing
+            raise CodewarsUnavailable(f"Error, Codewars responded with {response.status_code}.")
+        from lxml import html
+        with self.metrics.span("parse.avatar"):
+            tree = html.fromstring(response.content)
+            avatars = tree.xpath(xpath)
+        if not avatars:
+            self.set_missing("avatar", user)
+            raise AvatarNotFound("Error, user has no avatar.")
+        avatar = avatars[0]
+        self.avatar_cache.set(user.lower(), avatar)
+        return avatar
 
     async def get_kata(self, id: str) -> dict:
-        url = f"https://www.codewars.com/api/v1/code-challenges/{id}"
+        cached = self.kata_cache.get(id)
+        self.metrics.cache("kata", cached is not None)
+        if cached is not None:
+            return {"kata_info": cached, "message": "success"}
+        not_found = {
+            "message": "Error, kata not found. Please make sure you have the correct kata ID or slug."
+        }
+        if self.is_missing("kata", id):
+            return not_found
         try:
-            request = httpx.get(url)
-            response = request.json()
-            kata_info = {
-                "id": response["id"],
-                "name": response["name"],
-                "slug": response["slug"],
-                "url": response["url"],
-                "category": response["category"],
-                "description": response["description"],
-                "tags": response["tags"],
-                "languages": response["languages"],
-                "rank_name": response["rank"]["name"],
-                "rank_color": response["rank"]["color"],
-                "created_by_username": response["createdBy"]["username"],
-                "created_by_url": response["createdBy"]["url"],
-                "total_attempts": response["totalAttempts"],
-                "total_completed": response["totalCompleted"],
-                "total_stars": response["totalStars"],
-                "vote_score": response["voteScore"],
-                "published_at": response["publishedAt"],
-                "approved_at": response["approvedAt"],
-            }
+            # Other bot processes sharing the cache backend may have fetched it already
+            kata_info = await single_flight(self.backend, f"kata:{id}", KATA_TTL, lambda: self.request_kata(id))
+        except KeyError:
+            return not_found
+        if kata_info is None:
+            self.set_missing("kata", id)
+            return not_found
 
-            kata_info["rank_color"] = await self.format_color(kata_info["rank_color"])
+        # Katas can be looked up by both id and slug
+        for key in {id, kata_info["id"], kata_info["slug"]}:
+            self.kata_cache.set(key, kata_info)
+        self.kata_index.add(kata_info)
 
-            if kata_info["approved_at"] is None:
-                kata_info["approved_at"] = "Unknown"
-            else:
-                kata_info["approved_by_url"] = response["approvedBy"]["url"]
-                kata_info["approved_by_username"] = response["approvedBy"]["username"]
+        result = {
+            "kata_info": kata_info,
+            "message": "success"
+        }
+        return result
 
-            result = {
-                "kata_info": kata_info,
-                "message": "success"
-            }
-            return result
-        except KeyError:
-            result = {
-                "message": "Error, kata not found. Please make sure you have the correct kata ID or slug."
-            }
-            return result
+    async def request_kata(self, id: str) -> Optional[dict]:
+        """Fetches a kata from Codewars
+
+        Args:
+            id (str): Kata ID or slug
+
+        Returns:
+            Optional[dict]: Kata, None if it doesn't exist
+        """
+        url = f"https://www.codewars.com/api/v1/code-challenges/{id}"
+        request = await self.fetch(url, "http.codewars_api")
+        if request.status_code == 404:
+            return None
+        if request.status_code != 200:
+            raise error_for_status(request.status_code, f"Error, Codewars responded with {request.status_code}.")
+        response = request.json()
+        kata_info = {
+            "id": response["id"],
+            "name": response["name"],
+            "slug": response["slug"],
+            "url": response["url"],
+            "category": response["category"],
+            "description": response["description"],
+            "tags": response["tags"],
+            "languages": response["languages"],
+            "rank_name": response["rank"]["name"],
+            "rank_color": response["rank"]["color"],
+            "created_by_username": response["createdBy"]["username"],
+            "created_by_url": response["createdBy"]["url"],
+            "total_attempts": response["totalAttempts"],
+            "total_completed": response["totalCompleted"],
+            "total_stars": response["totalStars"],
+            "vote_score": response["voteScore"],
+            "published_at": response["publishedAt"],
+            "approved_at": response["approvedAt"],
+        }
+
+        kata_info["rank_color"] = await self.format_color(kata_info["rank_color"])
+
+        if kata_info["approved_at"] is None:
+            kata_info["approved_at"] = "Unknown"
+        else:
+            kata_info["approved_by_url"] = response["approvedBy"]["url"]
+            kata_info["approved_by_username"] = response["approvedBy"]["username"]
+        return kata_info
+
+    async def get_katas(self, ids: list) -> dict:
+        """Looks up several katas at once. Cached katas are served from the cache
+        and only the missing ones are fetched, concurrently.
+
+        Args:
+            ids (list): Kata IDs or slugs
+
+        Returns:
+            dict: Result of `get_kata` for every id
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        results = await asyncio.gather(*(self.get_kata(id=id) for id in unique_ids), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, CodewarsError):
+                raise result
+        # Katas that couldn't be fetched, e.g. while Codewars is unavailable, get an error message like missing ones
+        return {id: {"message": str(result)} if isinstance(result, CodewarsError) else result
+                for id, result in zip(unique_ids, results)}
 
     async def get_user(self, user):
+        if self.is_missing("user", user):
+            raise UserNotFound("Error, user not found.")
+        # Other bot processes sharing the cache backend may have fetched it already
+        profile = await single_flight(self.backend, f"user:{user.lower()}", PROFILE_FRESH,
+                                      lambda: self.request_user(user))
+        self.profile_cache.set(user.lower(), (profile["user_info"], profile["fetched_at"]))
+        return profile["user_info"]
+
+    async def request_user(self, user: str) -> dict:
+        """Fetches a user's profile from Codewars
+
+        Args:
+            user (str): Codewars username
+
+        Raises:
+            UserNotFound: The user doesn't exist
+
+        Returns:
+            dict: Profile as `user_info` and the time it was fetched at as `fetched_at`
+        """
         url = f"https://www.codewars.com/api/v1/users/{user}"
-        request = httpx.get(url)
+        request = await self.fetch(url, "http.codewars_api")
         if request.status_code == 200:
             response = request.json()
             user_info = {
@@ -116,25 +601,300 @@ class Codewars(commands.Cog):
             }
 
             user_info["overall_colour"] = await self.format_color(user_info["overall_colour"])
-
-            return user_info
+            return {"user_info": user_info, "fetched_at": time.time()}
+        elif request.status_code == 404:
+            self.set_missing("user", user)
+            raise UserNotFound("Error, user not found.")
         else:
-            raise Exception("Error, user not found.")
+            raise error_for_status(request.status_code, f"Error, Codewars responded with {request.status_code}.")
+
+    async def get_profile(self, user: str):
+        """Returns a user's profile, stale-while-revalidate.
+
+        A profile younger than PROFILE_FRESH is served as is. An older one is served right away
+        while a background task refreshes it, unless it is older than PROFILE_MAX_STALENESS,
+        in which case it is fetched before returning.
+        While Codewars is unavailable, a profile younger than PROFILE_STALE_IF_ERROR is served
+        with `stale` set so renderers can mark it.
+
+        Args:
+            user (str): Codewars username
+
+        Returns:
+            Tuple[dict, Optional[asyncio.Task]]: Profile and the task refreshing it, if one was started
+        """
+        key = user.lower()
+        cached = self.profile_cache.get(key)
+        self.metrics.cache("profile", cached is not None)
+        if cached is not None:
+            user_info, fetched_at = cached
+            age = time.time() - fetched_at
+            if age < PROFILE_FRESH:
+                return user_info, None
+            if self.breakers["http.codewars_api"].is_open:
+                self.metrics.incr("profile.served_stale")
+                return dict(user_info, stale=True), None
+            if age < PROFILE_MAX_STALENESS:
+                return user_info, self.refresh_profile(user)
+        try:
+            return await self.get_user(user=user), None
+        except CodewarsUnavailable:
+            if cached is None:
+                raise
+            self.metrics.incr("profile.served_stale")
+            return dict(cached[0], stale=True), None
+
+    async def get_profiles(self, users: list) -> dict:
+        """Looks up several profiles and their avatars at once. Lookups go through the caches
+        and `fetch`, so they share its concurrency limit and requests in flight.
+
+        Args:
+            users (list): Codewars usernames
+
+        Returns:
+            dict: (profile, avatar url or None) for every user, or the exception its lookup raised
+        """
+        async def get_avatar(user: str):
+            with contextlib.suppress(AvatarNotFound, CodewarsUnavailable):
+                return await self.get_user_avatar(user=user)
+
+        async def lookup(user: str):
+            # A refresh started here only updates the cache
+            (user_info, _), avatar = await asyncio.gather(self.get_profile(user), get_avatar(user))
+            return user_info, avatar
+
+        unique_users = list({user.lower(): user for user in users}.values())
+        results = await asyncio.gather(*(lookup(user) for user in unique_users), return_exceptions=True)
+        return dict(zip(unique_users, results))
+
+    def refresh_profile(self, user: str) -> asyncio.Task:
+        """Refreshes a cached profile in the background, at most once at a time per user
+
+        Args:
+            user (str): Codewars username
+
+        Returns:
+            asyncio.Task: Task resolving to the fresh profile
+        """
+        key = user.lower()
+        task = self.profile_refreshes.get(key)
+        if task is None:
+            task = self.profile_refreshes[key] = asyncio.create_task(self.get_user(user=user))
+            task.add_done_callback(lambda done: self.forget_task(
+                self.profile_refreshes, key, done, f"refresh the profile of {user}"))
+        return task
+
+    def forget_task(self, tasks: dict, key, done: asyncio.Task, action: str):
+        """Drops a finished background task and logs its failure, nobody may be waiting for it
+
+        Args:
+            tasks (dict): Tasks in progress the task is kept in
+            key: Key of the task in `tasks`
+            done (asyncio.Task): Finished task
+            action (str): What the task did, for the log
+        """
+        tasks.pop(key, None)
+        if done.cancelled():
+            return
+        error = done.exception()
+        if isinstance(error, CodewarsError):
+            log.debug("Could not %s: %s", action, error)
+        elif error is not None:
+            log.error("Failed to %s", action, exc_info=error)
+
+    def update_on_refresh(self, message: discord.Message, refresh: asyncio.Task, user: str,
+                          old_info: dict, render, keys):
+        """Edits a message sent from a stale profile once the refresh finishes, if any of `keys` changed
+
+        Args:
+            message (discord.Message): Message sent from the stale profile
+            refresh (asyncio.Task): Task refreshing the profile
+            user (str): Codewars username
+            old_info (dict): Stale profile the message was rendered from
+            render: Coroutine function rendering an embed from a username and a profile
+            keys: Profile keys worth an edit
+        """
+        async def update():
+            try:
+                new_info = await refresh
+                if all(old_info[key] == new_info[key] for key in keys):
+                    return
+                embed = await render(user, new_info)
+                with self.metrics.span("discord.edit"):
+                    await message.edit(embed=embed)
+            except (asyncio.CancelledError, discord.NotFound, CodewarsUnavailable):
+                pass
+            except Exception:
+                log.exception("Failed to refresh the profile of %s", user)
+
+        asyncio.create_task(update())
 
     async def get_latest_completed(self, user: str, page: int = 0, limit: int = 10) -> list:
+        if limit > 20:
+            raise CodewarsBadRequest("Limit must be less than 20.")
+        if self.is_missing("user", user):
+            raise UserNotFound("Error, user not found.")
         url = f"https://www.codewars.com/api/v1/users/{user}/code-challenges/completed?page={page}"
-        request = httpx.get(url)
-        if limit <= 20:
-            if request.status_code == 200:
-                response = request.json()
-                if response["totalItems"] < 1:
-                    raise CodewarsNotFound("No completed katas found.")
-                else:
-                    return response["data"][:limit]
+        request = await self.fetch(url, "http.codewars_api")
+        if request.status_code == 200:
+            response = request.json()
+            if response["totalItems"] < 1:
+                raise CodewarsNotFound("No completed katas found.")
             else:
-                raise Exception("Error, user not found.")
+                return response["data"][:limit]
+        elif request.status_code == 404:
+            self.set_missing("user", user)
+            raise UserNotFound("Error, user not found.")
         else:
-            raise Exception("Limit must be less than 20.")
+            raise error_for_status(request.status_code, f"Error, Codewars responded with {request.status_code}.")
+
+    async def watch_loop(self):
+        """Checks the completed katas of watched users as their checks come due and announces new ones"""
+        await self.bot.wait_until_red_ready()
+        self.watcher.marks = await self.config.completion_marks()
+        synced_at = None
+        while True:
+            try:
+                now = time.monotonic()
+                if synced_at is None or self.watch_changed.is_set() or now - synced_at >= WATCH_SYNC_INTERVAL:
+                    self.watch_changed.clear()
+                    await self.sync_watched()
+                    synced_at = now
+                users = self.watcher.pop_due(now, WATCH_BATCH)
+                if users:
+                    await asyncio.gather(*(self.check_completions(user) for user in users))
+                    continue
+                timeout = synced_at + WATCH_SYNC_INTERVAL - now
+                due = self.watcher.next_due()
+                if due is not None:
+                    timeout = min(timeout, due - now)
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.watch_changed.wait(), max(timeout, 0))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Failed to check completed katas")
+                await asyncio.sleep(WATCH_MIN_INTERVAL)
+
+    async def sync_watched(self):
+        """Watches the registered users who are in a guild with an announcement channel and forgets
+        the completion marks of everyone else"""
+        channels = list()
+        for guild_id, guild_data in (await self.config.all_guilds()).items():
+            channel = self.bot.get_channel(guild_data["announce_channel"]) if guild_data["announce_channel"] else None
+            if channel is not None:
+                channels.append(channel)
+        watched = dict()
+        if channels:
+            for user_id, user_data in (await self.config.all_users()).items():
+                if not user_data.get("username"):
+                    continue
+                for channel in channels:
+                    if channel.guild.get_member(user_id) is not None:
+                        watched.setdefault(user_data["username"], []).append(channel)
+        self.watched = watched
+        # Marks of users no longer watched would only pile up, a user watched again starts from a new mark
+        unwatched = [user for user in self.watcher.marks if user not in watched]
+        self.watcher.sync(watched, time.monotonic())
+        if unwatched:
+            async with self.config.completion_marks() as marks:
+                for user in unwatched:
+                    marks.pop(user, None)
+
+    async def check_completions(self, user: str):
+        """Announces the completions of a user since the last check. Only the head of the completed
+        katas is requested and it is read up to the last completion seen.
+
+        Args:
+            user (str): Codewars username
+        """
+        active = False
+        try:
+            await wait_for_token(self.backend, self.rate_fallback, "codewars_watch", WATCH_RATE)
+            self.metrics.incr("watch.checks")
+            try:
+                completed = await self.get_latest_completed(user=user, limit=20)
+            except UserNotFound:
+                raise
+            except CodewarsNotFound:
+                completed = []
+            mark = self.watcher.marks.get(user)
+            new = new_completions(completed, mark)
+            if (mark is None or new) and user in self.watched:
+                # Only the newest completion is kept per user, and only while they are watched.
+                # A user first seen without completions gets the first one they solve announced
+                self.watcher.marks[user] = completed[0]["completedAt"] if completed else ""
+                async with self.config.completion_marks() as marks:
+                    marks[user] = self.watcher.marks[user]
+            if new:
+                active = True
+                self.metrics.incr("watch.completions", len(new))
+                await self.announce_completions(user, new[:MAX_ANNOUNCED_COMPLETIONS])
+        except CodewarsError as error:
+            log.debug("Could not check the completed katas of %s: %s", user, error)
+        except Exception:
+            log.exception("Failed to check the completed katas of %s", user)
+        finally:
+            self.watcher.schedule(user, active, time.monotonic())
+
+    async def announce_completions(self, user: str, completions: list):
+        """Posts completions to the announcement channels of the guilds the user is in
+
+        Args:
+            user (str): Codewars username
+            completions (list): Completed katas, newest first
+        """
+        for kata in reversed(completions):
+            embed = discord.Embed(
+                title=kata.get("name", "Unknown"),
+                url=f"https://www.codewars.com/kata/{kata['id']}",
+                description=f"Solved in **{', '.join(kata.get('completedLanguages', []))}**",
+                colour=0xFFFFFF)
+            embed.set_author(name=f"{user} completed a kata", url=f"https://www.codewars.com/users/{user}",
+                             icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+            embed.set_footer(text="© Codewars")
+            embed.timestamp = datetime.datetime.strptime(kata["completedAt"], "%Y-%m-%dT%H:%M:%S.%fZ")
+            for channel in self.watched.get(user, []):
+                try:
+                    with self.metrics.span("discord.announce"):
+                        await channel.send(embed=embed)
+                except discord.HTTPException:
+                    log.warning("Could not announce a completion in channel %s", channel.id)
+
+    async def get_chart(self, user: str, languages: dict) -> bytes:
+        """Returns the language chart of a user, drawn in a worker process once per version of the data.
+        Concurrent requests for the same chart share one drawing.
+
+        Args:
+            user (str): Codewars username
+            languages (dict): `ranks.languages` of the user's profile
+
+        Returns:
+            bytes: PNG image
+        """
+        key = (user.lower(), data_version(languages))
+        png = self.chart_cache.get(key)
+        self.metrics.cache("chart", png is not None)
+        if png is not None:
+            return png
+        task = self.chart_renders.get(key)
+        if task is None:
+            task = self.chart_renders[key] = asyncio.create_task(self.render_chart(key, user, languages))
+            task.add_done_callback(lambda done: self.forget_task(
+                self.chart_renders, key, done, f"draw the chart of {user}"))
+        return await asyncio.shield(task)
+
+    async def render_chart(self, key: tuple, user: str, languages: dict) -> bytes:
+        loop = asyncio.get_running_loop()
+        with self.metrics.span("render.chart"):
+            try:
+                png = await loop.run_in_executor(self.chart_pool, render_language_chart, user, languages)
+            except BrokenProcessPool:
+                # A worker died, e.g. killed for its memory, the next chart starts a new pool
+                self._chart_pool = None
+                raise
+        self.chart_cache.set(key, png)
+        return png
 
     async def iso_to_unix(self, iso: str) -> int:
         """Converts ISO 8601 time to unix (epoch) time
@@ -175,65 +935,244 @@ class Codewars(commands.Cog):
         description = description.replace("<br>", "\n")
         return description
 
+    async def render_profile(self, user: str, userInfo: dict) -> discord.Embed:
+        """Returns the profile embed of a user, rendered once per version of the profile
+
+        Args:
+            user (str): Codewars username
+            userInfo (dict): Profile of the user
+
+        Returns:
+            discord.Embed: Profile embed
+        """
+        key = ("profile", user.lower())
+        version = data_version(userInfo)
+        data = self.render_cache.get(key, version)
+        self.metrics.cache("render", data is not None)
+        if data is None:
+            data = discord.Embed(colour=userInfo["overall_colour"])
+            data.set_author(
+                name=f"Codewars Stats of {userInfo['username']}",
+                url=f"https://www.codewars.com/users/{userInfo['username']}",
+                icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+            if userInfo["name"]:
+                data.description = userInfo["name"]
+            avatar = None
+            with contextlib.suppress(AvatarNotFound, CodewarsUnavailable):
+                avatar = await self.get_user_avatar(user=user)
+                data.set_thumbnail(url=avatar)
+            data.add_field(name="Overall Rank", value=userInfo["overall_rank"], inline=True)
+            data.add_field(name="Overall Score", value=userInfo["overall_score"], inline=True)
+            data.add_field(name="Total Completed", value=userInfo["totalCompleted"], inline=True)
+            data.add_field(name="Leaderboard Position", value=userInfo["leaderboardPosition"], inline=True)
+            data.add_field(name="Honor", value=userInfo["honor"], inline=True)
+            data.add_field(name="Clan", value=userInfo["clan"], inline=True)
+            data.set_footer(text=STALE_FOOTER if userInfo.get("stale") else "© Codewars")
+            # Without its avatar the embed is only sent once, the next render tries the avatar again
+            if avatar is not None:
+                self.render_cache.set(key, version, data)
+        data.timestamp = datetime.datetime.utcnow()
+        return data
+
+    async def render_skills(self, user: str, userInfo: dict) -> discord.Embed:
+        """Returns the skills embed of a user, rendered once per version of the profile
+
+        Args:
+            user (str): Codewars username
+            userInfo (dict): Profile of the user
+
+        Returns:
+            discord.Embed: Skills embed
+        """
+        key = ("skills", user.lower())
+        version = data_version(userInfo)
+        data = self.render_cache.get(key, version)
+        self.metrics.cache("render", data is not None)
+        if data is None:
+            data = discord.Embed(colour=userInfo["overall_colour"])
+            data.set_author(
+                name=f"Codewars Skills of {userInfo['username']}",
+                url=f"https://www.codewars.com/users/{userInfo['username']}",
+                icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+            avatar = None
+            with contextlib.suppress(AvatarNotFound, CodewarsUnavailable):
+                avatar = await self.get_user_avatar(user=user)
+                data.set_thumbnail(url=avatar)
+            data.add_field(name="Skills", value=userInfo["skills"])
+            data.set_footer(text=STALE_FOOTER if userInfo.get("stale") else "© Codewars")
+            # Without its avatar the embed is only sent once, the next render tries the avatar again
+            if avatar is not None:
+                self.render_cache.set(key, version, data)
+        data.timestamp = datetime.datetime.utcnow()
+        return data
+
+    async def render_kata(self, id: str) -> discord.Embed:
+        """Returns the embed of a kata, rendered once per version of the kata
+
+        Args:
+            id (str): Kata ID or slug
+
+        Returns:
+            discord.Embed: Kata embed
+        """
+        result = await self.get_kata(id=id)
+        kataInfo = result.get("kata_info", {})
+        if not kataInfo:
+            raise KataNotFound(result["message"])
+        key = ("kata", kataInfo["id"])
+        version = data_version(kataInfo)
+        embed = self.render_cache.get(key, version)
+        self.metrics.cache("render", embed is not None)
+        if embed is None:
+            embed = discord.Embed(colour=kataInfo.get("rank_color", 0xFFFFFF))
+            embed.set_author(
+                name=kataInfo.get("name", "Unknown").title(),
+                url=f"https://www.codewars.com/kata/{kataInfo.get('id', 'Unknown')}",
+                icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+            embed.description = await self.format_description(description=kataInfo.get("description", "Unknown"))
+            # Row 1
+            embed.add_field(name="Rank", value=kataInfo.get("rank_name", "Unknown"))
+            embed.add_field(name="Category", value=kataInfo.get("category", "Unknown").capitalize())
+            embed.add_field(
+                name="Author",
+                value=f"[{kataInfo.get('created_by_username', 'Unknown')}]({kataInfo.get('created_by_url', 'Unknown')})")
+            # Row 2
+            embed.add_field(name="Attempts", value=kataInfo.get("total_attempts", "Unknown"))
+            embed.add_field(name="Completed", value=kataInfo.get("total_completed", "Unknown"))
+            embed.add_field(name="Stars", value=kataInfo.get("total_stars", "Unknown"))
+            # Row 3
+            embed.add_field(name="Score", value=kataInfo.get("vote_score", "Unknown"))
+            embed.add_field(name="Published At", value=f"<t:{await self.iso_to_unix(iso=kataInfo.get('published_at', 'Unknown'))}:f>")
+            if kataInfo["approved_at"] != "Unknown":
+                embed.add_field(name="Approved At", value=f"<t:{await self.iso_to_unix(iso=kataInfo.get('approved_at', 'Unknown'))}:f>")
+            else:
+                embed.add_field(name="Approved", value="❌")
+            # Footer
+            embed.set_footer(text="© Codewars")
+            self.render_cache.set(key, version, embed)
+        embed.timestamp = datetime.datetime.utcnow()
+        return embed
+
+    @staticmethod
+    def kata_comparison_field(id: str, result: dict) -> tuple:
+        """Returns the field of a kata in a comparison
+
+        Args:
+            id (str): Kata ID or slug
+            result (dict): Result of `get_kata`
+
+        Returns:
+            tuple: (name, value) of the field
+        """
+        kataInfo = result.get("kata_info")
+        if not kataInfo:
+            # Why it couldn't be fetched, e.g. it doesn't exist or Codewars is unavailable
+            return id, result.get("message") or "Kata not found."
+        return (
+            kataInfo["name"].title(),
+            f"""**{kataInfo['rank_name']}** · {kataInfo['category'].capitalize()} · {len(kataInfo['languages'])} languages
+            **Completed/Attempts:** {kataInfo['total_completed']} / {kataInfo['total_attempts']}
+            **Stars:** {kataInfo['total_stars']} · **Score:** {kataInfo['vote_score']}
+            [[Go To Kata]({kataInfo['url']})]""")
+
+    async def render_kata_comparison(self, fields: list, total: int) -> discord.Embed:
+        """Returns a compact embed comparing katas, one field per kata
+
+        Args:
+            fields (list): Fields of the katas on this page, from `kata_comparison_field`
+            total (int): Number of katas being compared
+
+        Returns:
+            discord.Embed: Comparison embed
+        """
+        embed = discord.Embed(colour=0xFFFFFF)
+        embed.set_author(
+            name=f"Comparing {total} Katas",
+            icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=False)
+        embed.set_footer(text="© Codewars")
+        embed.timestamp = datetime.datetime.utcnow()
+        return embed
+
+    async def render_user_comparison(self, profiles: dict) -> discord.Embed:
+        """Returns an embed comparing users side by side, with the score of every language
+        and its difference to the first user's
+
+        Args:
+            profiles (dict): Result of `get_profiles`
+
+        Returns:
+            discord.Embed: Comparison embed
+        """
+        found = [result for result in profiles.values() if not isinstance(result, BaseException)]
+        leader = max(found, key=lambda result: result[0]["overall_score"], default=None)
+        embed = discord.Embed(colour=leader[0]["overall_colour"] if leader else 0xFFFFFF)
+        embed.set_author(
+            name=f"Comparing {len(profiles)} Codewars Users",
+            icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+        if leader and leader[1]:
+            embed.set_thumbnail(url=leader[1])
+        for user, result in profiles.items():
+            if isinstance(result, BaseException):
+                embed.add_field(name=user, value=str(result) or "Could not get the profile.", inline=True)
+                continue
+            userInfo = result[0]
+            embed.add_field(
+                name=f"{userInfo['username']} (cached)" if userInfo.get("stale") else userInfo["username"],
+                value=f"""**{userInfo['overall_rank']}** · {userInfo['overall_score']} points
+                **Honor:** {userInfo['honor']}
+                **Completed:** {userInfo['totalCompleted']}
+                **Position:** {userInfo['leaderboardPosition']}
+                [[Profile](https://www.codewars.com/users/{userInfo['username']})]""",
+                inline=True)
+
+        if len(found) > 1:
+            infos = [userInfo for userInfo, _ in found]
+            languages = {language for userInfo in infos for language in userInfo["languages"]}
+            scores = {language: [userInfo["languages"].get(language, {}).get("score", 0) for userInfo in infos]
+                      for language in languages}
+            rows = [["language", *(userInfo["username"][:12] for userInfo in infos)]]
+            for language in sorted(languages, key=lambda language: (-max(scores[language]), language)):
+                reference, *others = scores[language]
+                rows.append([language, str(reference), *(f"{score} ({score - reference:+})" for score in others)])
+            widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+            lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+            # Keep the table inside the 1024 characters of a field
+            shown = lines[:1]
+            for line in lines[1:]:
+                if len("\n".join(shown + [line])) > 950:
+                    shown.append(f"... {len(lines) - len(shown)} more")
+                    break
+                shown.append(line)
+            embed.add_field(name="Language Scores", value=box("\n".join(shown)), inline=False)
+
+        embed.set_footer(text="© Codewars")
+        embed.timestamp = datetime.datetime.utcnow()
+        return embed
+
     @commands.group(name="codewars", autohelp=False, invoke_without_command=True, aliases=["cw"])
     async def _codewars(self, ctx, user=None):
         """
         Get information about your codewars profile
         """
         if not user:
-            username = await self.config.user(ctx.author).username()
-            if not username:
+            user = await self.config.user(ctx.author).username()
+            if not user:
                 return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
-            else:
-                async with ctx.typing():
-                    try:
-                        userInfo = await self.get_user(user=username)
-                        data = discord.Embed(colour=userInfo["overall_colour"])
-                        data.set_author(
-                            name=f"Codewars Stats of {userInfo['username']}",
-                            url=f"https://www.codewars.com/users/{userInfo['username']}",
-                            icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
-                        if userInfo["name"]:
-                            data.description = userInfo["name"]
-                        data.set_thumbnail(url=await self.get_user_avatar(user=username))
-                        data.add_field(name="Overall Rank", value=userInfo["overall_rank"], inline=True)
-                        data.add_field(name="Overall Score", value=userInfo["overall_score"], inline=True)
-                        data.add_field(name="Total Completed", value=userInfo["totalCompleted"], inline=True)
-                        data.add_field(name="Leaderboard Position", value=userInfo["leaderboardPosition"], inline=True)
-                        data.add_field(name="Honor", value=userInfo["honor"], inline=True)
-                        data.add_field(name="Clan", value=userInfo["clan"], inline=True)
-                        data.set_footer(text="© Codewars")
-                        data.timestamp = datetime.datetime.utcnow()
-                        return await ctx.send(embed=data)
-                    except Exception as Error:
-                        data = discord.Embed(colour=discord.Colour.red())
-                        data.add_field(name="Codewars Error", value=Error)
-                        return await ctx.send(embed=data)
-        else:
-            async with ctx.typing():
-                try:
-                    userInfo = await self.get_user(user=ctx.message.content.split(" ")[1])
-                    data = discord.Embed(colour=userInfo["overall_colour"])
-                    data.set_author(
-                        name=f"Codewars Stats of {userInfo['username']}",
-                        url=f"https://www.codewars.com/users/{userInfo['username']}",
-                        icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
-                    if userInfo["name"]:
-                        data.description = userInfo["name"]
-                    data.set_thumbnail(url=await self.get_user_avatar(user=ctx.message.content.split(" ")[1]))
-                    data.add_field(name="Overall Rank", value=userInfo["overall_rank"], inline=True)
-                    data.add_field(name="Overall Score", value=userInfo["overall_score"], inline=True)
-                    data.add_field(name="Total Completed", value=userInfo["totalCompleted"], inline=True)
-                    data.add_field(name="Leaderboard Position", value=userInfo["leaderboardPosition"], inline=True)
-                    data.add_field(name="Honor", value=userInfo["honor"], inline=True)
-                    data.add_field(name="Clan", value=userInfo["clan"], inline=True)
-                    data.set_footer(text="© Codewars")
-                    data.timestamp = datetime.datetime.utcnow()
-                    return await ctx.send(embed=data)
-                except Exception as Error:
-                    data = discord.Embed(colour=discord.Colour.red())
-                    data.add_field(name="Codewars Error", value=Error)
-                    return await ctx.send(embed=data)
+        async with ctx.typing():
+            try:
+                userInfo, refresh = await self.get_profile(user)
+                data = await self.render_profile(user, userInfo)
+                with self.metrics.span("discord.send"):
+                    message = await ctx.send(embed=data)
+                if refresh is not None:
+                    self.update_on_refresh(message, refresh, user, userInfo, self.render_profile, PROFILE_KEY_NUMBERS)
+                return message
+            except Exception as Error:
+                data = discord.Embed(colour=discord.Colour.red())
+                data.add_field(name="Codewars Error", value=Error)
+                return await ctx.send(embed=data)
 
     @_codewars.command(name="languages", aliases=["l", "lang"], autohelp=True)
     async def _languages(self, ctx, user=None):
@@ -248,99 +1187,49 @@ class Codewars(commands.Cog):
             - `[p]cw l` # If you have registered your username
         """
 
-        language_images = {"c": "https://i.imgur.com/IgMT4VW.png",
-                           "clojure": "https://i.imgur.com/SsEWBmW.png",
-                           "coffeescript": "https://i.imgur.com/rEWxYhv.png",
-                           "cpp": "https://i.imgur.com/O5BcX33.png",
-                           "csharp": "https://i.imgur.com/IdlAR1B.png",
-                           "go": "https://i.imgur.com/JCA1E0Q.png",
-                           "groovy": "https://i.imgur.com/BoWWCFx.png",
-                           "haskell": "https://i.imgur.com/MRXo1U0.png",
-                           "java": "https://i.imgur.com/HbzHc9Z.png",
-                           "javascript": "https://i.imgur.com/8DFw5s9.png",
-                           "kotlin": "https://i.imgur.com/Kbdj3tB.png",
-                           "lua": "https://i.imgur.com/1gvQNMh.png",
-                           "ocaml": "https://i.imgur.com/coYXRb6.png",
-                           "php": "https://i.imgur.com/PHxL185.png",
-                           "powershell": "https://i.imgur.com/fHIAYGk.png",
-                           "python": "https://i.imgur.com/DCBz8dd.png",
-                           "r": "https://i.imgur.com/FQS2tdC.png",
-                           "ruby": "https://i.imgur.com/W0bXkco.png",
-                           "rust": "https://i.imgur.com/BExi1sJ.png",
-                           "scala": "https://i.imgur.com/S9tRrcr.png",
-                           "swift": "https://i.imgur.com/3xCT5PY.png",
-                           "typescript": "https://i.imgur.com/dUsR3e4.png",
-                           }
+        if not user:
+            user = await self.config.user(ctx.author).username()
+            if not user:
+                embed = discord.Embed(colour=discord.Colour.red())
+                embed.add_field(
+                    name="Codewars Error",
+                    value="You have not set your username yet. Use `codewars set <username>` to set your username.")
+                return await ctx.send(embed=embed)
         async with ctx.typing():
-            if user:
-                userInfo = await self.get_user(user=user)
+            # A refresh started here only updates the cache, the menu keeps its pages
+            userInfo, _ = await self.get_profile(user)
+            userAvatar = None
+            with contextlib.suppress(AvatarNotFound, CodewarsUnavailable):
                 userAvatar = await self.get_user_avatar(user=user)
-                languages = []
-                try:
-                    if userInfo["languages"]:
-                        data = discord.Embed()
-                        for language, stats in userInfo["languages"].items():
-                            data.set_author(
-                                name=f"Codewars Stats of {userInfo['username']}",
-                                url=f"https://www.codewars.com/users/{userInfo['username']}",
-                                icon_url=userAvatar)
-                            if language in language_images:
-                                # TODO_2: Add language images as Discord attachments
-                                # Example: https://stackoverflow.com/a/67679689/11017223
-                                # language_image = discord.File(f"{str(bundled_data_path(self))}/{language}.png")
-                                # data.set_thumbnail(url=f"attachment://{language}.png")
-                                data.set_thumbnail(url=language_images.get(language))
-                            data.add_field(name="Language", value=language.capitalize(), inline=True)
-                            data.add_field(name="Rank", value=stats.get("name"), inline=True)
-                            data.add_field(name="Score", value=stats.get("score"), inline=True)
-                            data.set_footer(text="© Codewars",
-                                            icon_url="https://avatars.githubusercontent.com/u/5387632?s=50")
-                            data.timestamp = datetime.datetime.utcnow()
-                            data.colour = await self.format_color(stats.get("color"))
-                            languages.append(data)
-                            data = discord.Embed()
-                        #TODO_2: await menu(ctx, languages, DEFAULT_CONTROLS, file=language_image)
-                        await menu(ctx, languages, DEFAULT_CONTROLS)
-                except Exception as Error:
-                    data = discord.Embed(colour=discord.Colour.red())
-                    data.add_field(name="Codewars Error", value=Error)
-                    return await ctx.send(embed=data)
-            else:
-                username = await self.config.user(ctx.author).username()
-                if not username:
-                    embed = discord.Embed(colour=discord.Colour.red())
-                    embed.add_field(
-                        name="Codewars Error",
-                        value="You have not set your username yet. Use `codewars set <username>` to set your username.")
-                    return await ctx.send(embed=embed)
-                else:
-                    userInfo = await self.get_user(user=username)
-                    userAvatar = await self.get_user_avatar(user=username)
-                    languages = []
-                try:
-                    if userInfo["languages"]:
-                        data = discord.Embed()
-                        for language, stats in userInfo["languages"].items():
-                            data.set_author(
-                                name=f"Codewars Stats of {userInfo['username']}",
-                                url=f"https://www.codewars.com/users/{userInfo['username']}",
-                                icon_url=userAvatar)
-                            if language in language_images:
-                                data.set_thumbnail(url=language_images.get(language))
-                            data.add_field(name="Language", value=language.capitalize(), inline=True)
-                            data.add_field(name="Rank", value=stats.get("name"), inline=True)
-                            data.add_field(name="Score", value=stats.get("score"), inline=True)
-                            data.set_footer(text="© Codewars",
-                                            icon_url="https://avatars.githubusercontent.com/u/5387632?s=50")
-                            data.timestamp = datetime.datetime.utcnow()
-                            data.colour = await self.format_color(stats.get("color"))
-                            languages.append(data)
-                            data = discord.Embed()
-                        await menu(ctx, languages, DEFAULT_CONTROLS)
-                except Exception as Error:
-                    data = discord.Embed(colour=discord.Colour.red())
-                    data.add_field(name="Codewars Error", value=Error)
-                    return await ctx.send(embed=data)
+            assets = await self.get_language_assets()
+            languages = list(userInfo["languages"].items())
+
+            async def render_language(index: int) -> discord.Embed:
+                language, stats = languages[index]
+                data = discord.Embed()
+                data.set_author(
+                    name=f"Codewars Stats of {userInfo['username']}",
+                    url=f"https://www.codewars.com/users/{userInfo['username']}",
+                    icon_url=userAvatar)
+                language_image = assets.url(language)
+                if language_image:
+                    data.set_thumbnail(url=language_image)
+                data.add_field(name="Language", value=language.capitalize(), inline=True)
+                data.add_field(name="Rank", value=stats.get("name"), inline=True)
+                data.add_field(name="Score", value=stats.get("score"), inline=True)
+                data.set_footer(text="© Codewars",
+                                icon_url="https://avatars.githubusercontent.com/u/5387632?s=50")
+                data.timestamp = datetime.datetime.utcnow()
+                data.colour = await self.format_color(stats.get("color"))
+                return data
+
+            try:
+                if languages:
+                    await self.menu(ctx, PageSource(len(languages), render_language))
+            except Exception as Error:
+                data = discord.Embed(colour=discord.Colour.red())
+                data.add_field(name="Codewars Error", value=Error)
+                return await ctx.send(embed=data)
 
     @_codewars.command(name="skills", aliases=["sk", "skill"], autohelp=False)
     async def _skills(self, ctx, user=None):
@@ -354,175 +1243,223 @@ class Codewars(commands.Cog):
             - `[p]cw sk <username>`
             - `[p]cw sk` # If you have set your username
         """
+        if not user:
+            user = await self.config.user(ctx.author).username()
+            if not user:
+                return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
         async with ctx.typing():
+            userInfo, refresh = await self.get_profile(user)
+            data = await self.render_skills(user, userInfo)
+            with self.metrics.span("discord.send"):
+                message = await ctx.send(embed=data)
+            if refresh is not None:
+                self.update_on_refresh(message, refresh, user, userInfo, self.render_skills, ("skills",))
+
+    @_codewars.command(name="chart", aliases=["graph"], autohelp=False)
+    async def _chart(self, ctx, user=None):
+        """
+        Draw the score and rank of each language as a chart
+        \n
+        Needs the `matplotlib` package.
+        \n
+        **Examples:**
+            - `[p]codewars chart <username>`
+            - `[p]codewars chart` # If you have set your username
+        """
+        if not user:
+            user = await self.config.user(ctx.author).username()
             if not user:
-                username = await self.config.user(ctx.author).username()
-                if not username:
-                    return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
-                else:
-                    userInfo = await self.get_user(user=username)
-                    data = discord.Embed(colour=userInfo["overall_colour"])
-                    data.set_author(
-                        name=f"Codewars Skills of {userInfo['username']}",
-                        url=f"https://www.codewars.com/users/{userInfo['username']}",
-                        icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
-                    data.set_thumbnail(url=await self.get_user_avatar(user=username))
-                    data.add_field(name="Skills", value=userInfo["skills"])
-                    data.timestamp = datetime.datetime.utcnow()
-                    data.set_footer(text="© Codewars")
-                    await ctx.send(embed=data)
-            else:
-                userInfo = await self.get_user(user=user)
-                data = discord.Embed(colour=userInfo["overall_colour"])
-                data.set_author(
-                    name=f"Codewars Skills of {userInfo['username']}",
-                    url=f"https://www.codewars.com/users/{userInfo['username']}",
-                    icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
-                data.set_thumbnail(url=await self.get_user_avatar(user=ctx.message.content.split(" ")[1]))
-                data.add_field(name="Skills", value=userInfo["skills"])
-                data.timestamp = datetime.datetime.utcnow()
-                data.set_footer(text="© Codewars")
-                await ctx.send(embed=data)
+                return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
+        if not charts_available():
+            return await ctx.send("Charts need the `matplotlib` package, install it with `[p]pipinstall matplotlib`.")
+        async with ctx.typing():
+            userInfo, _ = await self.get_profile(user)
+            if not userInfo["languages"]:
+                return await ctx.send("This user hasn't trained in any language yet.")
+            png = await self.get_chart(userInfo["username"], userInfo["languages"])
+            data = discord.Embed(colour=userInfo["overall_colour"])
+            data.set_author(name=f"Codewars Stats of {userInfo['username']}",
+                            url=f"https://www.codewars.com/users/{userInfo['username']}")
+            data.set_image(url="attachment://chart.png")
+            data.set_footer(text=STALE_FOOTER if userInfo.get("stale") else "© Codewars")
+            with self.metrics.span("discord.send"):
+                await ctx.send(embed=data, file=discord.File(io.BytesIO(png), filename="chart.png"))
 
     @_codewars.command(name="completed", autohelp=False)
     async def _completed(self, ctx, user=None, limit: int = 10):
         """
         List last 5 to 20 completed katas as menu
         """
-        async with ctx.typing():
-            # If user is not provided, get username from config
+        # If user is not provided, get username from config
+        if not user:
+            user = await self.config.user(ctx.author).username()
             if not user:
-                try:
-                    username = await self.config.user(ctx.author).username()
-                    if not username:
-                        return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
-                    else:
-                        userInfo = await self.get_user(user=username)
-                        userAvatar = await self.get_user_avatar(user=username)
-                        completedKatas = await self.get_latest_completed(user=username, limit=limit)
-
-                        kataList = []
-                        kata_count = 0
-
-                        embed = discord.Embed()
-                        for kata in completedKatas:
-                            if kata_count == 5:
-                                embed = discord.Embed()
-                                kata_count = 0
-
-                            kataInfo = await self.get_kata(id=kata["id"])
-                            kataInfo = kataInfo.get("kata_info", {})
-
-                            embed.set_author(
-                                name=f"Last {limit} Completed Katas of {userInfo['username']}",
-                                url=f"https://www.codewars.com/users/{userInfo['username']}/completed",
-                                icon_url="https://avatars.githubusercontent.com/u/5387632?s=50")
-                            embed.set_thumbnail(url=userAvatar)
-                            embed.add_field(
-                                name=kataInfo.get("name", "Unknown").title(),
-                                value=f"""**Rank:** {kataInfo.get("rank_name", "N/A")}
-                                **Category:** {kataInfo.get("category", "N/A").capitalize()}
-                                **Completed/Attempts:** {kataInfo.get('total_completed', 'N/A')} / {kataInfo.get('total_attempts', 'N/A')}
-                                **Completed At:** <t:{await self.iso_to_unix(iso=kata.get('completedAt', 'N/A'))}:R>
-                                **Completed Languages:** {', '.join(kata.get('completedLanguages', 'N/A'))}
-                                [[Go To Kata]({kataInfo.get('url', 'https://www.codewars.com')})]""",
-                                inline=False)
-                            embed.timestamp = datetime.datetime.utcnow()
-                            embed.color = kataInfo.get("rank_color", 0x000000)
-
-                            kataList.append(embed)
-                            kata_count += 1
-
-                        await dict_menu(ctx, kataList, DICT_CONTROLS)
-
-                except Exception as Error:
-                    embed = discord.Embed(colour=discord.Colour.red())
-                    embed.add_field(name="Codewars Error", value=Error)
-                    return await ctx.send(embed=embed)
-            else:
-                try:
-                    userInfo = await self.get_user(user=user)
+                return await ctx.send(f"You haven't registered your username yet. Use `{ctx.prefix}codewars settings username set <username>` to register.")
+        async with ctx.typing():
+            try:
+                # A refresh started here only updates the cache
+                userInfo, _ = await self.get_profile(user)
+                userAvatar = None
+                with contextlib.suppress(AvatarNotFound, CodewarsUnavailable):
                     userAvatar = await self.get_user_avatar(user=user)
-                    completedKatas = await self.get_latest_completed(user=user, limit=limit)
-
-                    kataList = []
-                    kata_count = 0
+                completedKatas = await self.get_latest_completed(user=user, limit=limit)
+                kataInfos = await self.get_katas([kata["id"] for kata in completedKatas])
 
+                def page_template() -> discord.Embed:
                     embed = discord.Embed()
-                    for kata in completedKatas:
-                        if kata_count == 5:
-                            embed = discord.Embed()
-                            kata_count = 0
-
-                        kataInfo = await self.get_kata(id=kata["id"])
-                        kataInfo = kataInfo.get("kata_info", {})
-
-                        embed.set_author(
-                            name=f"Last {limit} Completed Katas of {userInfo['username']}",
-                            url=f"https://www.codewars.com/users/{userInfo['username']}/completed",
-                            icon_url="https://avatars.githubusercontent.com/u/5387632?s=10")
+                    embed.set_author(
+                        name=f"Last {limit} Completed Katas of {userInfo['username']}",
+                        url=f"https://www.codewars.com/users/{userInfo['username']}/completed",
+                        icon_url="https://avatars.githubusercontent.com/u/5387632?s=50")
+                    if userAvatar:
                         embed.set_thumbnail(url=userAvatar)
-                        embed.add_field(
-                            name=kataInfo.get("name", "Unknown").title(),
-                            value=f"""**Rank:** {kataInfo.get("rank_name", "N/A")}
-                            **Category:** {kataInfo.get("category", "N/A").capitalize()}
-                            **Completed/Attempts:** {kataInfo.get('total_completed', 'N/A')} / {kataInfo.get('total_attempts', 'N/A')}
-                            **Completed At:** <t:{await self.iso_to_unix(iso=kata.get('completedAt', 'N/A'))}:R>
-                            **Completed Languages:** {', '.join(kata.get('completedLanguages', 'N/A'))}
-                            [[Go To Kata]({kataInfo.get('url', 'https://www.codewars.com')})]""",
-                            inline=False)
+                    return embed
+
+                # Fields are measured and packed into as few pages as Discord's embed limits allow
+                fields = []
+                for kata in completedKatas:
+                    kataInfo = kataInfos[kata["id"]].get("kata_info", {})
+                    fields.append((
+                        kataInfo.get("name", "Unknown").title(),
+                        f"""**Rank:** {kataInfo.get("rank_name", "N/A")}
+                        **Category:** {kataInfo.get("category", "N/A").capitalize()}
+                        **Completed/Attempts:** {kataInfo.get('total_completed', 'N/A')} / {kataInfo.get('total_attempts', 'N/A')}
+                        **Completed At:** <t:{await self.iso_to_unix(iso=kata.get('completedAt', 'N/A'))}:R>
+                        **Completed Languages:** {', '.join(kata.get('completedLanguages', 'N/A'))}
+                        [[Go To Kata]({kataInfo.get('url', 'https://www.codewars.com')})]""",
+                        kataInfo.get("rank_color", 0x000000)))
+                pages = pack_fields(fields, reserved=len(page_template()))
+
+                async def render_page(index: int) -> discord.Embed:
+                    with self.metrics.span("render.completed_page"):
+                        embed = page_template()
+                        for name, value, colour in pages[index]:
+                            embed.add_field(name=name, value=value, inline=False)
+                            embed.color = colour
                         embed.timestamp = datetime.datetime.utcnow()
-                        embed.color = kataInfo.get("rank_color", 0x000000)
+                        return embed
 
-                        kataList.append(embed)
-                        kata_count += 1
-                    await dict_menu(ctx, kataList, DICT_CONTROLS)
+                await self.menu(ctx, PageSource(len(pages), render_page))
 
-                # TODO: Get avarage rank of all katas and display rank colour accordingly
+            # TODO: Get avarage rank of all katas and display rank colour accordingly
 
-                except Exception as Error:
-                    embed = discord.Embed(colour=discord.Colour.red())
-                    embed.add_field(name="Codewars Error", value=Error)
-                    return await ctx.send(embed=embed)
+            except Exception as Error:
+                embed = discord.Embed(colour=discord.Colour.red())
+                embed.add_field(name="Codewars Error", value=Error)
+                return await ctx.send(embed=embed)
 
     @_codewars.command(name="kata", autohelp=False)
-    async def _kata(self, ctx, id: str):
+    async def _kata(self, ctx, *ids: str):
         """
-        Get information about a kata.
+        Get information about a kata, or compare several katas.
+        \n
+        **Examples:**
+            - `[p]codewars kata <id>` - Shows a kata in detail
+            - `[p]codewars kata <id> <id> ...` - Compares katas side by side
         """
+        if not ids:
+            return await ctx.send_help()
+        if len(ids) == 1:
+            async with ctx.typing():
+                try:
+                    embed = await self.render_kata(id=ids[0])
+                    with self.metrics.span("discord.send"):
+                        await ctx.send(embed=embed)
+                except CodewarsError as error:
+                    await ctx.send(error)
+                except KeyError as ke:
+                    await ctx.send(ke)
+            return
+
         async with ctx.typing():
             try:
-                result = await self.get_kata(id=id)
-                kataInfo = result.get("kata_info", {})
-                embed = discord.Embed(colour=kataInfo.get("rank_color", 0xFFFFFF))
-                embed.set_author(
-                    name=kataInfo.get("name", "Unknown").title(),
-                    url=f"https://www.codewars.com/kata/{kataInfo.get('id', 'Unknown')}",
-                    icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
-                embed.description = await self.format_description(description=kataInfo.get("description", "Unknown"))
-                # Row 1
-                embed.add_field(name="Rank", value=kataInfo.get("rank_name", "Unknown"))
-                embed.add_field(name="Category", value=kataInfo.get("category", "Unknown").capitalize())
-                embed.add_field(
-                    name="Author",
-                    value=f"[{kataInfo.get('created_by_username', 'Unknown')}]({kataInfo.get('created_by_url', 'Unknown')})")
-                # Row 2
-                embed.add_field(name="Attempts", value=kataInfo.get("total_attempts", "Unknown"))
-                embed.add_field(name="Completed", value=kataInfo.get("total_completed", "Unknown"))
-                embed.add_field(name="Stars", value=kataInfo.get("total_stars", "Unknown"))
-                # Row 3
-                embed.add_field(name="Score", value=kataInfo.get("vote_score", "Unknown"))
-                embed.add_field(name="Published At", value=f"<t:{await self.iso_to_unix(iso=kataInfo.get('published_at', 'Unknown'))}:f>")
-                if kataInfo["approved_at"] != "Unknown":
-                    embed.add_field(name="Approved At", value=f"<t:{await self.iso_to_unix(iso=kataInfo.get('approved_at', 'Unknown'))}:f>")
-                else:
-                    embed.add_field(name="Approved", value="❌")
-                # Footer
-                embed.timestamp = datetime.datetime.utcnow()
-                embed.set_footer(text="© Codewars")
+                results = await self.get_katas(list(ids))
+            except CodewarsError as error:
+                return await ctx.send(error)
+        fields = [self.kata_comparison_field(id, result) for id, result in results.items()]
+        # Fields are measured and packed into as few pages as Discord's embed limits allow
+        empty = await self.render_kata_comparison([], len(fields))
+        pages = pack_fields(fields, reserved=len(empty))
+
+        async def render_page(index: int) -> discord.Embed:
+            return await self.render_kata_comparison(pages[index], len(fields))
+
+        await self.menu(ctx, PageSource(len(pages), render_page))
+
+    @_codewars.command(name="search", aliases=["find"], autohelp=False)
+    async def _search(self, ctx, *, query: str = ""):
+        """
+        Search the katas the bot has already seen, without asking Codewars
+        \n
+        **Examples:**
+            - `[p]codewars search <words>` - Searches kata names, tags, categories and languages
+            - `[p]codewars search <words> --rank 6 --lang python` - Only 6 kyu katas available in Python
+            - `[p]codewars search <words> --rank 1 dan` - Only 1 dan katas
+            *or you can use aliases*
+            - `[p]cw find <words>`
+        """
+        words, filters = [], {}
+        tokens = query.split()
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            index += 1
+            if token in ("--rank", "--lang"):
+                value = tokens[index] if index < len(tokens) else None
+                index += 1
+                # "--rank 6 kyu" is one rank, not a 6 and a search word
+                if token == "--rank" and index < len(tokens) and tokens[index].lower() in ("kyu", "dan"):
+                    value = f"{value} {tokens[index]}"
+                    index += 1
+                filters[token[2:]] = value
+            else:
+                words.append(token)
+        if not words and not filters:
+            return await ctx.send_help()
+
+        with self.metrics.span("search.katas"):
+            katas, total = self.kata_index.search(
+                " ".join(words), rank=filters.get("rank"), language=filters.get("lang"), limit=SEARCH_RESULTS)
+        if not katas:
+            return await ctx.send(f"No katas found among the {len(self.kata_index)} katas seen so far.")
+
+        embed = discord.Embed(colour=katas[0].get("rank_color", 0xFFFFFF))
+        embed.set_author(
+            name=f"Found {total} Katas",
+            icon_url="https://avatars.githubusercontent.com/u/5387632?s=200")
+        embed.description = "\n".join(
+            f"[{kataInfo['name'].title()}]({kataInfo['url']}) · **{kataInfo['rank_name']}** · "
+            f"{kataInfo['category'].capitalize()}"
+            for kataInfo in katas)
+        embed.set_footer(text=f"Searched {len(self.kata_index)} katas seen by the bot · © Codewars")
+        await ctx.send(embed=embed)
+
+    @_codewars.command(name="compare", aliases=["vs"], autohelp=False)
+    async def _compare(self, ctx, *users: str):
+        """
+        Compare Codewars users side by side, with per language score differences
+        \n
+        **Examples:**
+            - `[p]codewars compare <username> <username> ...`
+            - `[p]codewars compare <username>` # Compares with your registered username
+            *or you can use aliases*
+            - `[p]cw vs <username> <username>`
+        """
+        users = list(users)
+        if len(users) == 1:
+            username = await self.config.user(ctx.author).username()
+            if username:
+                users.insert(0, username)
+        if len(users) < 2:
+            return await ctx.send_help()
+        if len(users) > MAX_COMPARE_USERS:
+            return await ctx.send(f"You can compare at most {MAX_COMPARE_USERS} users at once.")
+        async with ctx.typing():
+            profiles = await self.get_profiles(users)
+            with self.metrics.span("render.compare"):
+                embed = await self.render_user_comparison(profiles)
+            with self.metrics.span("discord.send"):
                 await ctx.send(embed=embed)
-            except KeyError as ke:
-                await ctx.send(ke)
 
     @_codewars.command(name="avatar", aliases=["a", "av"], autohelp=False)
     async def _avatar(self, ctx, user: str):
@@ -534,20 +1471,102 @@ class Codewars(commands.Cog):
             *or you can use aliases*
             - `[p]cw a <username>`
         """
-        await ctx.send(await self.get_user_avatar(user=user))
+        try:
+            await ctx.send(await self.get_user_avatar(user=user))
+        except CodewarsNotFound as error:
+            await ctx.send(error)
 
-    @_codewars.command(name="test", autohelp=False)
-    async def _test(self, ctx, language: str):
+    @_codewars.group(name="metrics", autohelp=False, invoke_without_command=True)
+    @commands.is_owner()
+    async def _metrics(self, ctx):
         """
-        attach image to discord and display language image
+        Show timings of upstream calls, rendering and commands
+        \n
+        **Examples:**
+            - `[p]codewars metrics` - Shows spans in milliseconds and counters
+            - `[p]codewars metrics dump <prometheus/json/off>` - Writes metrics to the data path every minute
         """
-        
-        language_image = discord.File(f"{str(bundled_data_path(self))}/{language}.png")
-        
-        embed = discord.Embed()
-        embed.set_image(url=f"attachment://{language}.png")
-        
-        await ctx.send(embed=embed, file=language_image)
+        self.collect_metrics()
+        for page in pagify(self.metrics.format_table() or "No metrics yet."):
+            await ctx.send(box(page))
+
+    @_metrics.command(name="dump")
+    async def _metrics_dump(self, ctx, fmt: str):
+        """
+        Write metrics to the data path periodically in Prometheus text or JSON format
+        """
+        fmt = fmt.lower()
+        if fmt == "off":
+            await self.config.metrics_dump.clear()
+            return await ctx.send("Stopped writing metrics.")
+        if fmt not in ("prometheus", "json"):
+            return await ctx.send("Format must be `prometheus`, `json` or `off`.")
+        await self.config.metrics_dump.set(fmt)
+        path = self.write_metrics(fmt)
+        await ctx.send(f"Metrics are written to `{path}` every {METRICS_DUMP_INTERVAL} seconds.")
+
+    @_codewars.group(name="debug", autohelp=True)
+    @commands.is_owner()
+    async def _debug(self, ctx):
+        """
+        Debugging tools
+        \n
+        **Examples:**
+            - `[p]codewars debug watchdog on [threshold_ms]` - Reports event loop stalls longer than the threshold
+            - `[p]codewars debug watchdog off`
+            - `[p]codewars debug stalls` - Shows the latest stalls with the stack of the blocking code
+            - `[p]codewars debug breakers` - Shows the circuit breakers of Codewars' api and website
+        """
+        pass
+
+    @_debug.command(name="watchdog")
+    async def _debug_watchdog(self, ctx, state: bool, threshold_ms: int = 100):
+        """
+        Turn the event loop watchdog on or off
+        """
+        await self.config.watchdog.set(state)
+        if not state:
+            self.watchdog.stop()
+            return await ctx.send("Event loop watchdog is off.")
+        self.watchdog.threshold = threshold_ms / 1000
+        await self.config.watchdog_threshold.set(self.watchdog.threshold)
+        self.watchdog.start()
+        await ctx.send(f"Event loop watchdog is on, stalls over {threshold_ms} ms are reported.")
+
+    @_debug.command(name="stalls")
+    async def _debug_stalls(self, ctx):
+        """
+        Show the latest event loop stalls
+        """
+        if not self.watchdog.stalls:
+            return await ctx.send("No stalls recorded.")
+        for stall in list(self.watchdog.stalls)[:-6:-1]:
+            header = f"{stall['lag'] * 1000:.0f} ms in {', '.join(stall['commands'])} <t:{int(stall['at'])}:R>"
+            await ctx.send(header + box(stall["stack"][-1800:], lang="py"))
+
+    @_debug.command(name="breakers")
+    async def _debug_breakers(self, ctx):
+        """
+        Show the state of the circuit breakers
+        """
+        lines = []
+        for breaker in self.breakers.values():
+            summary = breaker.summary()
+            line = f"{breaker.name}: {summary['state']}, {summary['failures']} failures"
+            if summary["retry_after"]:
+                line += f", probing in {summary['retry_after']:.0f}s"
+            lines.append(line)
+        await ctx.send(box("\n".join(lines)))
+
+    @_debug.command(name="watcher")
+    async def _debug_watcher(self, ctx):
+        """
+        Show how often the completed katas of watched users are checked
+        """
+        intervals = Counter(self.watcher.intervals.values())
+        lines = [f"{len(self.watcher)} users watched"]
+        lines.extend(f"{count} checked every {interval / 60:.0f} min" for interval, count in sorted(intervals.items()))
+        await ctx.send(box("\n".join(lines)))
 
     @_codewars.group(name="settings", aliases=["s"], autohelp=True)
     async def _settings(self, ctx):
@@ -561,6 +1580,123 @@ class Codewars(commands.Cog):
         """
         pass
 
+    @_settings.command(name="assets")
+    @commands.is_owner()
+    async def _upload_assets(self, ctx, channel: discord.TextChannel):
+        """
+        Upload bundled language images to a channel and use their Discord urls.
+        \n
+        The urls are renewed from this channel before they expire, keep the uploaded messages there.
+        \n
+        **Examples:**
+            - `[p]codewars settings assets <#channel>`
+        """
+        assets = await self.get_language_assets()
+        if not assets.languages:
+            return await ctx.send("There are no bundled language images to upload.")
+        async with ctx.typing():
+            urls = await assets.upload(channel)
+            await self.config.asset_urls.set(urls)
+            await self.config.asset_channel.set(channel.id)
+            await self.config.asset_messages.set(assets.messages)
+        await ctx.send(f"Uploaded {len(assets.languages)} language images to {channel.mention}.")
+
+    @_settings.command(name="warmup")
+    @commands.is_owner()
+    async def _warmup(self, ctx, state: bool):
+        """
+        Warm up connections and caches in the background after the cog loads.
+        \n
+        **Examples:**
+            - `[p]codewars settings warmup <on/off>`
+        """
+        await self.config.warmup.set(state)
+        await ctx.send(f"Warm-up after loading is {'on' if state else 'off'}.")
+
+    @_settings.command(name="menu")
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def _menu_backend(self, ctx, backend: str):
+        """
+        Use buttons or reactions for menus in this server.
+        \n
+        Buttons need fewer requests to Discord per page turn. They need discord.py 2,
+        menus fall back to reactions otherwise.
+        \n
+        **Examples:**
+            - `[p]codewars settings menu <buttons/reactions>`
+        """
+        backend = backend.lower()
+        if backend not in ("buttons", "reactions"):
+            return await ctx.send("Menu backend must be `buttons` or `reactions`.")
+        await self.config.guild(ctx.guild).menu_backend.set(backend)
+        if backend == "buttons" and ui is None:
+            return await ctx.send("Menus will use buttons once the bot runs discord.py 2, until then they use reactions.")
+        await ctx.send(f"Menus in this server use {backend}.")
+
+    @_settings.command(name="cache")
+    @commands.is_owner()
+    async def _cache_backend(self, ctx, backend: str):
+        """
+        Share cached data, locks and rate limits between the bot's processes through Redis.
+        \n
+        Needs the `redis` package. Your message is deleted since the url may hold a password.
+        \n
+        **Examples:**
+            - `[p]codewars settings cache redis://localhost:6379/0`
+            - `[p]codewars settings cache memory` - Caches in this process only, the default
+        """
+        with contextlib.suppress(discord.HTTPException):
+            await ctx.message.delete()
+        url = None if backend.lower() == "memory" else backend
+        try:
+            await self.set_backend(url)
+        except ImportError:
+            return await ctx.send("The `redis` package is needed to share the cache, install it with `[p]pipinstall redis`.")
+        except Exception as error:
+            return await ctx.send(f"Could not connect to the cache backend: {type(error).__name__}")
+        await self.config.cache_backend.set(url)
+        await ctx.send("Caching in Redis." if url else "Caching in memory.")
+
+    @_codewars.group(name="announce", autohelp=True)
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def _announce(self, ctx):
+        """
+        Codewars Completion Announcements
+        \n
+        Members who set their Codewars username get the katas they complete posted to the channel.
+        \n
+        **Examples:**
+            - `[p]codewars announce channel <#channel>` - Posts completed katas to the channel
+            - `[p]codewars announce off` - Stops announcements
+        """
+        pass
+
+    @_announce.command(name="channel", aliases=["c"])
+    async def _announce_channel(self, ctx, channel: discord.TextChannel):
+        """
+        Set the channel that completed katas are posted to
+        """
+        await self.config.guild(ctx.guild).announce_channel.set(channel.id)
+        self.watch_changed.set()
+        data = discord.Embed(colour=ctx.author.colour)
+        data.add_field(name="Codewars Announcements",
+                       value=f"Katas completed by members will be posted to {channel.mention}")
+        await ctx.send(embed=data)
+
+    @_announce.command(name="off", aliases=["o"])
+    async def _announce_off(self, ctx):
+        """
+        Stop announcing completed katas
+        """
+        await self.config.guild(ctx.guild).announce_channel.clear()
+        self.watch_changed.set()
+        data = discord.Embed(colour=ctx.author.colour)
+        data.add_field(name="Codewars Announcements",
+                       value="Stopped announcing completed katas.")
+        await ctx.send(embed=data)
+
     @_settings.group(name="username", aliases=["u"], autohelp=True)
     async def _username(self, ctx):
         """
@@ -610,6 +1746,7 @@ class Codewars(commands.Cog):
             - `[p]cw s u s <username>``        
         """
         await self.config.user(ctx.author).username.set(new_value)
+        self.watch_changed.set()
         data = discord.Embed(colour=ctx.author.colour)
         data.add_field(name="Codewars Username Setting",
                        value=f"Your default Codewars username is set to **{new_value}**")
@@ -626,6 +1763,7 @@ class Codewars(commands.Cog):
             - `[p]cw s u d`
         """
         await self.config.user(ctx.author).username.clear()
+        self.watch_changed.set()
         data = discord.Embed(colour=ctx.author.colour)
         data.add_field(name="Codewars Username Setting",
                        value="Deleted default Codewars username from database.")
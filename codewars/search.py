@@ -0,0 +1,148 @@
+import re
+import bisect
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Weight of a query term matching each field of a kata
+FIELD_WEIGHTS = {"name": 3.0, "tag": 2.0, "category": 1.0, "language": 1.0}
+# Query terms at least this long also match longer terms starting with them, at half the weight
+PREFIX_MIN_LENGTH = 3
+
+_token = re.compile(r"[a-z0-9#+]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _token.findall(text.lower())
+
+
+def normalize_rank(rank: str) -> str:
+    """Normalizes a rank so "6 kyu", "6kyu", "6" and "-6" are the same
+
+    Args:
+        rank (str): Rank name or number, a bare number is a kyu rank and a negative one
+            the id Codewars gives kyu ranks
+
+    Returns:
+        str: Rank like "6kyu"
+    """
+    rank = rank.lower().replace(" ", "")
+    if rank.startswith("-") and rank[1:].isdigit():
+        rank = rank[1:]
+    return rank + "kyu" if rank.isdigit() else rank
+
+
+class KataIndex:
+    """Inverted index over the katas the cog has fetched, searched without calling the API.
+
+    Terms are the tokens of a kata's name, its tags, category and languages, each posting
+    remembers which field the term came from so name matches rank above tag matches.
+    The least recently added katas are dropped past `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 5000):
+        self.maxsize = maxsize
+        # kata id -> kata_info
+        self.katas: "OrderedDict[str, dict]" = OrderedDict()
+        # term -> {kata id: field}
+        self.postings: Dict[str, Dict[str, str]] = {}
+        self._terms: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.katas)
+
+    def _fields(self, kata_info: dict) -> Dict[str, str]:
+        terms = {}
+        for field, values in (("language", kata_info.get("languages", [])),
+                              ("category", [kata_info.get("category") or ""]),
+                              ("tag", kata_info.get("tags", [])),
+                              ("name", [kata_info.get("name") or ""])):
+            for value in values:
+                for term in tokenize(value):
+                    # Later fields weigh more and win when a term appears in several
+                    terms[term] = field
+        return terms
+
+    def add(self, kata_info: dict):
+        """Indexes a kata, replacing the previous version of it
+
+        Args:
+            kata_info (dict): Kata as returned by `get_kata`
+        """
+        id = kata_info["id"]
+        self.remove(id)
+        self.katas[id] = kata_info
+        for term, field in self._fields(kata_info).items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self._terms = None
+            self.postings[term][id] = field
+        while len(self.katas) > self.maxsize:
+            self.remove(next(iter(self.katas)))
+
+    def remove(self, id: str):
+        kata_info = self.katas.pop(id, None)
+        if kata_info is None:
+            return
+        for term in self._fields(kata_info):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(id, None)
+            if not posting:
+                del self.postings[term]
+                self._terms = None
+
+    def _matches(self, token: str):
+        """Yields the terms a query token matches and the weight of the match"""
+        if token in self.postings:
+            yield token, 1.0
+        if len(token) < PREFIX_MIN_LENGTH:
+            return
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        start = bisect.bisect_right(self._terms, token)
+        for term in self._terms[start:]:
+            if not term.startswith(token):
+                break
+            yield term, 0.5
+
+    def search(self, query: str, rank: Optional[str] = None, language: Optional[str] = None,
+               limit: int = 10) -> Tuple[List[dict], int]:
+        """Finds katas matching the query, best matches first
+
+        Args:
+            query (str): Words to look for, may be empty when filtering only
+            rank (Optional[str]): Only return katas of this rank, e.g. "6 kyu" or "6"
+            language (Optional[str]): Only return katas available in this language
+            limit (int): Number of katas to return
+
+        Returns:
+            Tuple[List[dict], int]: Best matching katas and the total number of matches
+        """
+        scores: Dict[str, float] = {}
+        tokens = tokenize(query)
+        if tokens:
+            candidates: Optional[Set[str]] = None
+            for token in tokens:
+                matched: Dict[str, float] = {}
+                for term, weight in self._matches(token):
+                    for id, field in self.postings[term].items():
+                        matched[id] = max(matched.get(id, 0.0), weight * FIELD_WEIGHTS[field])
+                # Every token has to match
+                candidates = set(matched) if candidates is None else candidates & set(matched)
+                for id in candidates:
+                    scores[id] = scores.get(id, 0.0) + matched[id]
+            scores = {id: scores[id] for id in candidates}
+        else:
+            scores = dict.fromkeys(self.katas, 0.0)
+
+        if rank:
+            rank = normalize_rank(rank)
+            scores = {id: score for id, score in scores.items()
+                      if normalize_rank(self.katas[id].get("rank_name") or "") == rank}
+        if language:
+            language = language.lower()
+            scores = {id: score for id, score in scores.items() if language in self.katas[id].get("languages", [])}
+
+        ranked = sorted(scores, key=lambda id: (-scores[id], -(self.katas[id].get("total_completed") or 0)))
+        return [self.katas[id] for id in ranked[:limit]], len(scores)
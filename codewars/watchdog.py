@@ -0,0 +1,108 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from .metrics import Metrics
+
+# Frames kept from the top of a sampled stack
+STACK_DEPTH = 12
+
+
+class LoopWatchdog:
+    """Measures event loop lag while the cog's commands run and samples the stack of stalls.
+
+    A heartbeat task sleeps for `interval` and records how late it wakes up. A daemon thread
+    watches the heartbeat; when it is older than `threshold` the loop is blocked, so the thread
+    captures the loop thread's current stack, which is the frame doing the blocking.
+    Stalls are attributed to the commands running at that moment.
+    """
+
+    def __init__(self, metrics: Metrics, log: logging.Logger, threshold: float = 0.1, interval: float = 0.05):
+        self.metrics = metrics
+        self.log = log
+        self.threshold = threshold
+        self.interval = interval
+        self.active: Dict[int, str] = {}
+        self.stalls: Deque[dict] = deque(maxlen=20)
+        self._beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enter(self, ctx):
+        self.active[id(ctx)] = ctx.command.qualified_name
+
+    def exit(self, ctx):
+        self.active.pop(id(ctx), None)
+
+    def start(self):
+        """Starts watching, must be called from the event loop thread"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        # A fresh event per run, a thread of the previous run may still be waiting on the old one
+        self._stop = threading.Event()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, args=(self._stop,),
+                                        name=f"{self.metrics.namespace}-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops watching, the thread exits within `threshold / 2` without being waited for"""
+        self._stop.set()
+        self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _culprits(self):
+        return sorted(set(self.active.values())) or ["<background>"]
+
+    async def _heartbeat(self):
+        while True:
+            slept_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            previous_beat, self._beat = self._beat, now
+            lag = max(0.0, now - slept_at - self.interval)
+            self.metrics.observe("loop.lag", lag)
+            if lag < self.threshold:
+                continue
+            culprits = self._culprits()
+            self.metrics.incr("loop.stall")
+            for command in culprits:
+                self.metrics.observe(f"loop.stall.{command}", lag)
+            # The watchdog thread sampled this stall while it was happening, complete it with the final lag
+            if self.stalls and self.stalls[-1]["beat"] == previous_beat:
+                self.stalls[-1]["lag"] = lag
+            self.log.warning("Event loop blocked for %.0f ms while running %s", lag * 1000, ", ".join(culprits))
+
+    def _watch(self, stop: threading.Event):
+        sampled_beat = None
+        while not stop.wait(self.threshold / 2):
+            beat = self._beat
+            if beat == sampled_beat or time.monotonic() - beat < self.threshold + self.interval:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            sampled_beat = beat
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+            self.stalls.append({
+                "beat": beat,
+                "at": time.time(),
+                "lag": time.monotonic() - beat,
+                "commands": self._culprits(),
+                "stack": "".join(traceback.format_list(stack)),
+            })
@@ -0,0 +1,120 @@
+import heapq
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def new_completions(completed: List[dict], mark: Optional[str]) -> List[dict]:
+    """Returns the completions newer than the last one seen, newest first
+
+    Args:
+        completed (List[dict]): Head of the completed katas of a user, newest first as Codewars sends them
+        mark (Optional[str]): `completedAt` of the last completion seen
+
+    Returns:
+        List[dict]: New completions
+    """
+    if mark is None:
+        return []
+    new = []
+    for kata in completed:
+        # ISO 8601 times in the same format sort as strings
+        if kata["completedAt"] <= mark:
+            break
+        new.append(kata)
+    return new
+
+
+class CompletionWatcher:
+    """Decides when the completed katas of each watched user are checked next.
+
+    A user starts checked every `min_interval` seconds. Each check without a new completion
+    doubles their interval up to `max_interval`, a new completion brings it back to
+    `min_interval`. Idle users cost a request per `max_interval`, so the number of requests
+    follows how many users are solving katas rather than how many are watched.
+
+    It also keeps the completion mark of every watched user, the `completedAt` of the last
+    completion seen, and forgets it along with the schedule once they are no longer watched.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, jitter: float = 0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        # username -> seconds between two checks
+        self.intervals: Dict[str, float] = {}
+        # username -> time of the next check
+        self.due: Dict[str, float] = {}
+        # (time of the check, username), entries that don't match `due` are outdated
+        self._heap: List[Tuple[float, str]] = []
+        # username -> completedAt of the last completion seen, "" if they had none
+        self.marks: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def _push(self, user: str, at: float):
+        self.due[user] = at
+        heapq.heappush(self._heap, (at, user))
+
+    def sync(self, users: Iterable[str], now: float):
+        """Starts watching new users and stops watching the users not given
+
+        New users are spread over the first interval so a restart doesn't check everyone at once.
+        """
+        users = set(users)
+        self.forget((set(self.due) | set(self.marks)) - users)
+        for user in users - set(self.due):
+            self.intervals[user] = self.min_interval
+            self._push(user, now + random.uniform(0, self.min_interval))
+        if len(self._heap) > 2 * len(self.due) + 16:
+            # Users being checked aren't in the heap until rescheduled
+            self._heap = [(at, user) for user, at in self.due.items() if at != float("inf")]
+            heapq.heapify(self._heap)
+
+    def forget(self, users: Iterable[str]):
+        """Stops watching users, dropping their schedule, their heap entries and their completion marks"""
+        users = set(users)
+        if not users:
+            return
+        for user in users:
+            self.due.pop(user, None)
+            self.intervals.pop(user, None)
+            self.marks.pop(user, None)
+        self._heap = [(at, user) for at, user in self._heap if user not in users]
+        heapq.heapify(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        """Returns the time of the next check, None when nobody is watched"""
+        while self._heap and self.due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int) -> List[str]:
+        """Returns up to `limit` users whose check is due, most overdue first
+
+        They aren't checked again until rescheduled by `schedule`.
+        """
+        users = []
+        while len(users) < limit:
+            at = self.next_due()
+            if at is None or at > now:
+                break
+            user = heapq.heappop(self._heap)[1]
+            self.due[user] = float("inf")
+            users.append(user)
+        return users
+
+    def schedule(self, user: str, active: bool, now: float):
+        """Schedules the next check of a user after one
+
+        Args:
+            user (str): Checked user
+            active (bool): Whether the check found a new completion
+            now (float): Time of the check
+        """
+        if user not in self.due:
+            # Stopped watching while checking
+            return
+        interval = self.min_interval if active else min(self.intervals[user] * 2, self.max_interval)
+        self.intervals[user] = interval
+        self._push(user, now + interval * random.uniform(1 - self.jitter, 1 + self.jitter))
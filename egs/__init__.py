@@ -1,3 +1,5 @@
+import inspect
+
 from .main import EGS
 
 
@@ -5,4 +7,9 @@ async def setup(bot):
     """
     Initialize the EGS cog.
     """
-    bot.add_cog(EGS(bot))
+    cog = EGS(bot)
+    # add_cog is a coroutine since discord.py 2
+    result = bot.add_cog(cog)
+    if inspect.isawaitable(result):
+        await result
+    await cog.initialize()
@@ -0,0 +1,121 @@
+import time
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from .metrics import Metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an upstream that is failing."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retrying in {retry_after:.0f} seconds")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops sending requests to an upstream after repeated failures.
+
+    After `threshold` failures in a row the circuit opens and requests fail right away with
+    `CircuitOpenError`. Once `reset_timeout` has passed, the circuit is half-open: a single
+    request is let through as a probe, closing the circuit if it succeeds and opening it again
+    otherwise. Time is read from `clock`, monotonic seconds by default.
+    """
+
+    def __init__(self, name: str, metrics: Metrics, log: logging.Logger, threshold: int = 5,
+                 reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.metrics = metrics
+        self.log = log
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are being refused right now"""
+        if self.state == OPEN:
+            return self.clock() - self.opened_at < self.reset_timeout
+        return self.state == HALF_OPEN and self._probing
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def check(self):
+        """Lets a request through or raises `CircuitOpenError`
+
+        Raises:
+            CircuitOpenError: The circuit is open, or half-open with a probe in flight
+        """
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            self.metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(self.name, self.retry_after)
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def release(self):
+        """Forgets a request let through by `check` whose outcome is unknown, e.g. a cancelled one"""
+        self._probing = False
+
+    def record(self, ok: bool):
+        """Records the outcome of a request let through by `check`"""
+        self._probing = False
+        if ok:
+            if self.state != CLOSED:
+                self.log.info("%s recovered, closing its circuit", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state == CLOSED:
+                self.log.warning("%s failed %d times in a row, opening its circuit", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = self.clock()
+            self.metrics.incr(f"breaker.{self.name}.opened")
+
+    async def call(self, request: Callable[[], Awaitable], failed: Optional[Callable[[Any], bool]] = None):
+        """Sends a request through the breaker
+
+        Args:
+            request (Callable[[], Awaitable]): Coroutine function sending the request
+            failed (Optional[Callable[[Any], bool]]): Tells if a result counts as a failure, e.g. a 5xx response
+
+        Raises:
+            CircuitOpenError: The circuit is open
+
+        Returns:
+            Result of the request
+        """
+        self.check()
+        try:
+            result = await request()
+        except Exception:
+            self.record(False)
+            raise
+        except BaseException:
+            # Cancelled, let another request probe
+            self.release()
+            raise
+        self.record(failed is None or not failed(result))
+        return result
+
+    def summary(self) -> dict:
+        state = self.state
+        if state == OPEN and not self.is_open:
+            # The next request will be the probe
+            state = HALF_OPEN
+        return {"state": state, "failures": self.failures,
+                "retry_after": self.retry_after if state == OPEN else 0.0}
@@ -0,0 +1,97 @@
+import contextlib
+from typing import List, Union
+
+import discord
+from redbot.core import commands
+
+try:
+    # Message components need discord.py 2
+    from discord import ui
+except ImportError:
+    ui = None
+
+_Page = Union[str, discord.Embed]
+
+
+def _page_kwargs(page: _Page) -> dict:
+    if isinstance(page, discord.Embed):
+        return {"embed": page, "content": None}
+    return {"content": page, "embed": None}
+
+
+if ui is not None:
+
+    class _ButtonMenu(ui.View):
+        """The buttons of a menu, every press is answered with a single interaction response."""
+
+        def __init__(self, ctx: commands.Context, pages: List[_Page], page_number: int, timeout: float):
+            super().__init__(timeout=timeout)
+            self.ctx = ctx
+            self.pages = pages
+            self.page_number = page_number
+            self.message = None
+
+        async def interaction_check(self, interaction: discord.Interaction) -> bool:
+            return interaction.user.id == self.ctx.author.id
+
+        async def _turn(self, interaction: discord.Interaction, step: int):
+            self.page_number = (self.page_number + step) % len(self.pages)
+            await interaction.response.edit_message(**_page_kwargs(self.pages[self.page_number]), view=self)
+
+        @ui.button(emoji="\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}", style=discord.ButtonStyle.secondary)
+        async def previous(self, interaction: discord.Interaction, button: ui.Button):
+            await self._turn(interaction, -1)
+
+        @ui.button(emoji="\N{CROSS MARK}", style=discord.ButtonStyle.secondary)
+        async def close(self, interaction: discord.Interaction, button: ui.Button):
+            self.stop()
+            await interaction.response.defer()
+            with contextlib.suppress(discord.NotFound):
+                await interaction.message.delete()
+
+        @ui.button(emoji="\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}", style=discord.ButtonStyle.secondary)
+        async def next(self, interaction: discord.Interaction, button: ui.Button):
+            await self._turn(interaction, 1)
+
+        async def on_timeout(self):
+            self.stop()
+            if self.message is not None:
+                with contextlib.suppress(discord.HTTPException):
+                    await self.message.edit(view=None)
+
+
+async def button_menu(
+    ctx: commands.Context,
+    pages: List[_Page],
+    page_number: int = 0,
+    timeout: float = 30.0,
+):
+    """
+    A button-based menu with previous, close and next buttons.
+
+    Unlike reactions, buttons need no calls to set up or clean up and every
+    page turn is answered with one interaction response that edits the message.
+
+    Parameters
+    ----------
+    ctx: commands.Context
+        The command context
+    pages: list
+        The pages of the menu, one item per page
+    page_number: int
+        The page shown first
+    timeout: float
+        The time (in seconds) the buttons stay after the last press
+
+    Raises
+    ------
+    RuntimeError
+        If message components are not available in this version of discord.py
+    """
+    if ui is None:
+        raise RuntimeError("Message components need discord.py 2")
+    if page_number >= len(pages):
+        page_number = 0
+    view = _ButtonMenu(ctx, pages, page_number, timeout)
+    view.message = await ctx.send(**_page_kwargs(pages[page_number]), view=view)
+    await view.wait()
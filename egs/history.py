@@ -0,0 +1,136 @@
+import re
+import json
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+_word = re.compile(r"\w+")
+
+
+def title_words(title: str) -> List[str]:
+    return _word.findall(title.lower())
+
+
+class HistoryArchive:
+    """Every free game the cog has seen, one JSON line per giveaway in an append-only file.
+
+    A giveaway is identified by offer id, locale and start date, seeing it again is a no-op.
+    The file is read once in the background, then indexes by title word and by start month
+    answer queries from memory. Giveaways seen before the file is read are kept and written after.
+    The file is only touched off the event loop, one read or append at a time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records: List[dict] = []
+        self.loaded = False
+        self._keys: Set[Tuple[str, str, str]] = set()
+        # title word -> indexes of records
+        self._titles: Dict[str, List[int]] = {}
+        # "YYYY-MM" -> indexes of records
+        self._months: Dict[str, List[int]] = {}
+        # offer id -> start dates of its giveaways
+        self._offers: Dict[str, Set[str]] = {}
+        self._pending: List[dict] = []
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def key(record: dict) -> Tuple[str, str, str]:
+        return record["id"], record["locale"], record["start"] or ""
+
+    def _read(self) -> List[dict]:
+        records = []
+        try:
+            with self.path.open(encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _append(self, records: List[dict]):
+        with self.path.open("a", encoding="utf-8") as file:
+            file.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+
+    async def _write(self, records: List[dict]):
+        # Appends of concurrent calls must not interleave their lines
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._append, records)
+
+    def _index(self, record: dict) -> bool:
+        key = self.key(record)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        index = len(self.records)
+        self.records.append(record)
+        for word in set(title_words(record["title"])):
+            self._titles.setdefault(word, []).append(index)
+        if record["start"]:
+            self._months.setdefault(record["start"][:7], []).append(index)
+        self._offers.setdefault(record["id"], set()).add(record["start"] or "")
+        return True
+
+    async def load(self):
+        """Reads the archive off the event loop and builds the indexes, only the first call touches the disk"""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            for record in await asyncio.get_running_loop().run_in_executor(None, self._read):
+                self._index(record)
+            self.loaded = True
+        pending, self._pending = self._pending, []
+        await self.add(pending)
+
+    def seen(self, record: dict) -> bool:
+        return self.key(record) in self._keys
+
+    async def add(self, records: List[dict]) -> int:
+        """Archives giveaways that weren't seen before. They are queryable right away,
+        the file is appended to in a worker thread
+
+        Args:
+            records (List[dict]): Giveaways with `id`, `title`, `locale`, `start`, `end`, `price` and `color`
+
+        Returns:
+            int: Number of new giveaways
+        """
+        if not self.loaded:
+            self._pending.extend(records)
+            return 0
+        new = [record for record in records if self._index(record)]
+        if new:
+            # Indexed records must reach the file even if the caller is cancelled, e.g. on unload
+            await asyncio.shield(self._write(new))
+        return len(new)
+
+    def by_title(self, query: str) -> List[dict]:
+        """Returns the giveaways of games whose title has every word of the query, oldest first"""
+        words = title_words(query)
+        if not words:
+            return []
+        indexes: Optional[Set[int]] = None
+        for word in words:
+            found = set(self._titles.get(word, ()))
+            indexes = found if indexes is None else indexes & found
+        return [self.records[index] for index in sorted(indexes)]
+
+    def by_month(self, month: str) -> List[dict]:
+        """Returns the giveaways that started in a month, e.g. "2024-05", oldest first"""
+        return [self.records[index] for index in self._months.get(month, ())]
+
+    def latest(self, count: int = 10) -> List[dict]:
+        return sorted(self.records, key=lambda record: record["start"] or "")[-count:]
+
+    def times_given(self, offer_id: str) -> int:
+        """Returns in how many distinct periods a game was given away, across locales"""
+        return len(self._offers.get(offer_id, ()))
@@ -1,156 +1,542 @@
 import io
-import httpx
+import re
+import time
+import asyncio
+import logging
+import contextlib
 import discord
 from datetime import datetime
+from collections import Counter
+from typing import TYPE_CHECKING
 from redbot.core import Config
 from redbot.core import commands
-from colorthief import ColorThief
-from urllib.request import urlopen
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.chat_formatting import box, pagify
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
+from .cache import (RenderCache, TTLCache, MemoryBackend, RedisBackend, data_version,
+                    single_flight, read_snapshot, restore_snapshot, save_snapshot)
+from .metrics import Metrics
+from .watchdog import LoopWatchdog
+from .breaker import CircuitBreaker
+from .buttons import button_menu, ui
+from .history import HistoryArchive
+
+# httpx and colorthief (which pulls in PIL) are imported on first use so loading the cog stays fast
+if TYPE_CHECKING:
+    import httpx
+
+log = logging.getLogger("red.egs")
+
+FEED_URL = "https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions?locale=en-US&country={country}&allowCountries={country}"
+# Two letter country codes, the only countries put into FEED_URL
+COUNTRY_CODE = re.compile(r"^[A-Z]{2}$")
+# Country used when none or an invalid one is stored
+DEFAULT_COUNTRY = "TR"
+# Seconds between two checks of the promotions feed for announcements
+ANNOUNCE_INTERVAL = 15 * 60
+# Seconds an announcement may be based on an already downloaded feed, lets the bot's processes share one download
+ANNOUNCE_MAX_AGE = 60
+# Seconds between two announcement messages, keeps us well under the global rate limit
+SEND_INTERVAL = 0.1
+# Seconds a fetched promotions feed is reused before it is downloaded again
+SNAPSHOT_TTL = 5 * 60
+# Seconds a feed is kept to be served, marked as stale, while Epic Games is unavailable
+SNAPSHOT_STALE_IF_ERROR = 24 * 60 * 60
+# Seconds the dominant color of a cover image is reused
+COLOR_TTL = 7 * 24 * 60 * 60
+# Countries that can be compared at once
+MAX_REGIONS = 10
+# Giveaways listed per page of the history
+HISTORY_PAGE_SIZE = 10
+# Number of game embeds prepared at the same time
+RENDER_CONCURRENCY = 4
+# Seconds between two writes of the metrics file
+METRICS_DUMP_INTERVAL = 60
+# Seconds to wait after the bot is ready before warming up
+WARMUP_DELAY = 5
+# Most used countries whose feeds are prefetched while warming up
+WARMUP_LOCALES = 5
 
 
 class EGS(commands.Cog):
     """
     **Fetches current and upcoming free games on Epic Games Store.**
 
-    ```Syntax: [p]egs [upcoming/singly]```
+    ```Syntax: [p]egs [upcoming/singly/regions]```
 
     **Examples:** 
         - `[p]egs` - List current free games as menu
         - `[p]egs upcoming` - List upcoming free games as menu
         - `[p]egs list` - Send each free game as seperate message
+        - `[p]egs regions TR US` - Compare free games between countries
+        - `[p]egs history control` - Search past free games
     """
 
     def __init__(self, bot):
         self.bot = bot
-        self.current_freegames = list()
-        self.upcoming_freegames = list()
 
         default_member = {
-            "locale": "en-US",
+            "locale": None,
             "country": "TR",
             "allowCountries": "TR",
         }
 
+        # announced: offer ids the announce channel received, None until the first announcement
         default_guild = {
-            "database": []
+            "database": [],
+            "announce_channel": None,
+            "announce_locale": "TR",
+            "announced": None,
+            "menu_backend": "reactions",
+        }
+
+        # announced: offer ids already announced per locale, from before they were kept per guild
+        # metrics_dump: None, "prometheus" or "json"
+        # watchdog_threshold: seconds of loop lag reported as a stall
+        # warmup: prefetch feeds and load heavy modules in the background after loading
+        # cache_backend: None for memory or the url of a Redis server shared by the bot's processes
+        default_global = {
+            "announced": {},
+            "metrics_dump": None,
+            "watchdog": False,
+            "watchdog_threshold": 0.1,
+            "warmup": True,
+            "cache_backend": None,
         }
 
         self.config = Config.get_conf(self, identifier="EGS")
+        self.config.register_global(**default_global)
         self.config.register_guild(**default_guild)
         self.config.register_member(**default_member)
 
-        self.url = "https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions?locale=en-US&country=TR&allowCountries=TR"
+        self._session = None
+        self.warmup_task = None
+        self.cache_task = None
+        # Entries and locks shared with the bot's other processes
+        self.backend = MemoryBackend()
+        self.metrics = Metrics("egs")
+        self.watchdog = LoopWatchdog(self.metrics, log)
+        self.breakers = {
+            "feed": CircuitBreaker("egs_feed", self.metrics, log),
+            "image": CircuitBreaker("egs_image", self.metrics, log),
+        }
+        # country -> (fetched_at, snapshot), fetched_at is wall clock time so it survives restarts
+        self.snapshots = TTLCache(ttl=SNAPSHOT_STALE_IF_ERROR)
+        # cover image url -> dominant color
+        self.colors = TTLCache(ttl=COLOR_TTL)
+        # Every free game seen in a feed, kept forever
+        self.history = HistoryArchive(cog_data_path(self) / "history.jsonl")
+        self.archive_tasks = set()
+        self.render_cache = RenderCache()
+        self.render_semaphore = asyncio.Semaphore(RENDER_CONCURRENCY)
+        self.announce_task = asyncio.create_task(self.announceLoop())
+        self.metrics_task = asyncio.create_task(self.dumpMetricsLoop())
+
+    @property
+    def session(self) -> "httpx.AsyncClient":
+        """
+        HTTP client shared by all requests, created on first use
+        _Tüm isteklerin kullandığı HTTP istemcisi, ilk kullanımda oluşturulur
+        """
+        if self._session is None:
+            import httpx
+            self._session = httpx.AsyncClient(timeout=30.0)
+        return self._session
 
-    async def get_url(self, author):
-        if await self.config.member(author).locale():
-            locale = await self.config.member(author).locale()
-            return f"https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions?locale=en-US&country={locale}&allowCountries={locale}"
-        else:
-            return self.url
+    @session.setter
+    def session(self, session):
+        self._session = session
 
-    async def getFreeGames(self, author):
+    @property
+    def persistentCaches(self):
+        """
+        Caches saved to the cog's data folder on unload and restored on load
+        _Cog kaldırılırken veri klasörüne kaydedilen ve yüklenirken geri getirilen önbellekler
         """
-        Adds current free games and upcoming free games to a list
-        _Şu anda ve ileride bedava olacak oyunları listeye ekler
+        return {"snapshot": self.snapshots, "color": self.colors}
 
-        author: discord.Member
-        returns: none
+    async def initialize(self):
+        self.cache_task = asyncio.create_task(self.loadCaches())
+        backend_url = await self.config.cache_backend()
+        if backend_url:
+            try:
+                await self.setBackend(backend_url)
+            except Exception:
+                log.exception("Could not connect to the cache backend, caching in memory")
+        if await self.config.watchdog():
+            self.watchdog.threshold = await self.config.watchdog_threshold()
+            self.watchdog.start()
+        if await self.config.warmup():
+            self.warmup_task = asyncio.create_task(self.warmUp())
+
+    async def activeLocales(self):
         """
-        self.current_freegames.clear()
-        URL = await self.get_url(author=author)
-        response = httpx.get(URL)
-        data = response.json()["data"]["Catalog"]["searchStore"]["elements"]
+        Returns the countries in use, most used first
+        _Kullanılan ülkeleri, en çok kullanılan önce olacak şekilde döndürür
+        returns: locales (list)
+        """
+        locales = Counter()
+        for guild_data in (await self.config.all_guilds()).values():
+            if guild_data["announce_channel"]:
+                locales[self.toCountry(guild_data["announce_locale"])] += 1
+        for members in (await self.config.all_members()).values():
+            for member_data in members.values():
+                if member_data.get("locale"):
+                    locales[self.toCountry(member_data["locale"])] += 1
+        return [locale for locale, _ in locales.most_common()] or [DEFAULT_COUNTRY]
+
+    async def warmUp(self):
+        """
+        Pays the cold costs of the first command in the background: loads colorthief off the event loop,
+        opens a pooled connection and prefetches and renders the feeds of the most used countries
+        _İlk komutun soğuk başlangıç maliyetini arka planda öder
+        """
+        await self.bot.wait_until_red_ready()
+        await asyncio.sleep(WARMUP_DELAY)
+        with self.metrics.span("warmup"):
+            await asyncio.get_running_loop().run_in_executor(None, __import__, "colorthief")
+            for country in (await self.activeLocales())[:WARMUP_LOCALES]:
+                try:
+                    snapshot = await self.getSnapshot(country)
+                    await asyncio.gather(*(self.renderGame(gameInfo, country, snapshot["version"])
+                                           for gameInfo in snapshot["current"].values()))
+                except Exception:
+                    log.debug("Could not warm up the feed of %s", country, exc_info=True)
+
+    async def loadCaches(self):
+        """
+        Restores the caches saved by the previous instance of the cog and reads the history archive, files are read off the event loop
+        _Önceki cog örneğinin kaydettiği önbellekleri geri yükler ve geçmiş arşivini okur, dosyalar olay döngüsü dışında okunur
+        """
+        with self.metrics.span("cache.load"):
+            snapshot = await asyncio.get_running_loop().run_in_executor(
+                None, read_snapshot, cog_data_path(self) / "cache.bin")
+            restored = restore_snapshot(snapshot, self.persistentCaches)
+        self.metrics.incr("cache.restored", restored)
+        with self.metrics.span("history.load"):
+            await self.history.load()
+
+    async def setBackend(self, url):
+        """
+        Switches the cache backend
+        _Önbellek arka ucunu değiştirir
+        url: str (Redis server url, None for memory)
+        """
+        backend = await RedisBackend.from_url(url, "red-cogs:egs") if url else MemoryBackend()
+        previous, self.backend = self.backend, backend
+        await previous.close()
 
-        for title in data:
-            # Check if game has promotions
-            if title["promotions"]:
-                # Promotions --> UpcomingPromotionalOffers
-                for upcoming in title["promotions"]["upcomingPromotionalOffers"]:
-                    for discount in upcoming["promotionalOffers"]:
-                        if discount["discountSetting"]["discountPercentage"] == 0:
-                            self.upcoming_freegames.append(title['title'])
-
-                # Promotions --> Promotional Offers
-                for promotion in title["promotions"]["promotionalOffers"]:
-                    for discount in promotion["promotionalOffers"]:
-                        if discount["discountSetting"]["discountPercentage"] == 0:
-                            self.current_freegames.append(title['title'])
-
-    async def getGameInfo(self, author, game_title, current_freegame=True):
-        """
-        Returns game info as dictionary
-        _Oyun bilgilerini sözlük olarak döndürür
+    def saveCaches(self):
+        """
+        Saves the caches to the cog's data folder
+        _Önbellekleri cog'un veri klasörüne kaydeder
+        """
+        # Saving before the snapshot is restored would throw the previous one away
+        if self.cache_task is None or not self.cache_task.done():
+            return
+        try:
+            with self.metrics.span("cache.save"):
+                save_snapshot(cog_data_path(self) / "cache.bin", self.persistentCaches)
+        except OSError:
+            log.exception("Could not save the caches")
+
+    def cog_unload(self):
+        self.saveCaches()
+        if self.cache_task is not None:
+            self.cache_task.cancel()
+        self.watchdog.stop()
+        self.announce_task.cancel()
+        self.metrics_task.cancel()
+        if self.warmup_task is not None:
+            self.warmup_task.cancel()
+        for task in self.archive_tasks:
+            task.cancel()
+        asyncio.create_task(self.backend.close())
+        if self._session is not None:
+            asyncio.create_task(self._session.aclose())
+
+    async def cog_before_invoke(self, ctx):
+        ctx.egs_invoked_at = time.perf_counter()
+        self.watchdog.enter(ctx)
+
+    async def cog_after_invoke(self, ctx):
+        self.watchdog.exit(ctx)
+        invoked_at = getattr(ctx, "egs_invoked_at", None)
+        if invoked_at is not None:
+            self.metrics.observe(f"command.{ctx.command.qualified_name}",
+                                 time.perf_counter() - invoked_at, error=ctx.command_failed)
+
+    def writeMetrics(self, fmt):
+        """
+        Writes the metrics to the cog's data path
+        _Metrikleri cog'un veri klasörüne yazar
+        fmt: str ("prometheus" or "json")
+        returns: path (Path)
+        """
+        if fmt == "prometheus":
+            path = cog_data_path(self) / "metrics.prom"
+            path.write_text(self.metrics.to_prometheus())
+        else:
+            path = cog_data_path(self) / "metrics.json"
+            path.write_text(self.metrics.to_json())
+        return path
+
+    async def dumpMetricsLoop(self):
+        while True:
+            await asyncio.sleep(METRICS_DUMP_INTERVAL)
+            fmt = await self.config.metrics_dump()
+            if not fmt:
+                continue
+            try:
+                self.writeMetrics(fmt)
+            except OSError:
+                log.exception("Failed to write the metrics, trying again in %d seconds", METRICS_DUMP_INTERVAL)
+
+    async def getCountry(self, author):
+        """
+        Returns the country whose promotions are shown to the member
+        _Üyeye gösterilecek promosyonların ülkesini döndürür
         author: discord.Member
-        game_title: str
-        current_freegames: boolean
-        returns: game_info (dict)
+        returns: country (str)
+        """
+        return self.toCountry(await self.config.member(author).locale())
+
+    @staticmethod
+    def toCountry(value):
         """
+        Returns a stored locale if it is a valid country code, the default country otherwise.
+        Locales saved before they were validated, like "en-US", never reach FEED_URL
+        _Kayıtlı bölge geçerli bir ülke koduysa onu, değilse varsayılan ülkeyi döndürür.
+        Doğrulama öncesi kaydedilmiş "en-US" gibi bölgeler FEED_URL'e ulaşmaz
+        value: str or None
+        returns: country (str)
+        """
+        if isinstance(value, str) and COUNTRY_CODE.fullmatch(value):
+            return value
+        return DEFAULT_COUNTRY
 
-        URL = await self.get_url(author=author)
-        data = httpx.get(URL).json()["data"]["Catalog"]["searchStore"]["elements"]
+    def parseGameInfo(self, game, current_freegame=True):
+        """
+        Returns info of a game element from the promotions feed as dictionary
+        _Promosyon akışındaki bir oyunun bilgilerini sözlük olarak döndürür
+        game: dict
+        current_freegame: boolean
+        returns: game_info (dict)
+        """
 
         game_info = {
-            "title": None,
+            "id": game["id"],
+            "title": game["title"],
             "publisher": None,
             "developer": None,
-            "description": None,
+            "description": game["description"],
             "offerType": None,
             "keyImages": None,
             "price": None,
+            "url": None,
             "promotionStartDate": None,
             "promotionEndData": None
         }
 
-        for game in data:
-            if game["title"] == game_title:
-                game_info["title"] = game["title"]
-                game_info["description"] = game["description"]
-
-                if game["offerType"] == "BASE_GAME":
-                    game_info["offerType"] = "Game"
-                elif game["offerType"] == "ADD_ON":
-                    game_info["offerType"] = "DLC"
-                elif game["offerType"] == "DLC":
-                    game_info["offerType"] = "DLC"
-
-                for image in game["keyImages"]:
-                    if image["type"] == "DieselStoreFrontWide":
-                        game_info["keyImages"] = image["url"]
-                    else:
-                        if image["type"] == "OfferImageWide":
-                            game_info["keyImages"] = image["url"]
-
-                if game["seller"]["name"]:
-                    game_info["publisher"] = game["seller"]["name"]
-                else:
-                    for attribute in game["customAttributes"]:
-                        if attribute["key"] == "publisherName":
-                            game_info["publisher"] = attribute["value"]
+        if game["offerType"] == "BASE_GAME":
+            game_info["offerType"] = "Game"
+        elif game["offerType"] == "ADD_ON":
+            game_info["offerType"] = "DLC"
+        elif game["offerType"] == "DLC":
+            game_info["offerType"] = "DLC"
 
-                for attribute in game["customAttributes"]:
-                    if attribute["key"] == "developerName":
-                        game_info["developer"] = attribute["value"]
+        for image in game["keyImages"]:
+            if image["type"] == "DieselStoreFrontWide":
+                game_info["keyImages"] = image["url"]
+            else:
+                if image["type"] == "OfferImageWide":
+                    game_info["keyImages"] = image["url"]
 
-                get_price = game["price"]["totalPrice"]["fmtPrice"]["originalPrice"]
-                game_info["price"] = get_price
+        if game["seller"]["name"]:
+            game_info["publisher"] = game["seller"]["name"]
+        else:
+            for attribute in game["customAttributes"]:
+                if attribute["key"] == "publisherName":
+                    game_info["publisher"] = attribute["value"]
 
-                for mapping in game["catalogNs"]["mappings"]:
-                    game_info["url"] = f"https://www.epicgames.com/store/en-US/p/{mapping['pageSlug']}"
+        for attribute in game["customAttributes"]:
+            if attribute["key"] == "developerName":
+                game_info["developer"] = attribute["value"]
 
-                if current_freegame:
-                    for promotion in game["promotions"]["promotionalOffers"]:
-                        for date in promotion["promotionalOffers"]:
-                            game_info["promotionStartDate"] = date["startDate"]
-                            game_info["promotionEndData"] = date["endDate"]
-                else:
-                    for promotion in game["promotions"]["upcomingPromotionalOffers"]:
-                        for date in promotion["promotionalOffers"]:
-                            game_info["promotionStartDate"] = date["startDate"]
-                            game_info["promotionEndData"] = date["endDate"]
+        get_price = game["price"]["totalPrice"]["fmtPrice"]["originalPrice"]
+        game_info["price"] = get_price
+
+        for mapping in game["catalogNs"]["mappings"]:
+            game_info["url"] = f"https://www.epicgames.com/store/en-US/p/{mapping['pageSlug']}"
+
+        if current_freegame:
+            offers = game["promotions"]["promotionalOffers"]
+        else:
+            offers = game["promotions"]["upcomingPromotionalOffers"]
+        for promotion in offers:
+            for date in promotion["promotionalOffers"]:
+                game_info["promotionStartDate"] = date["startDate"]
+                game_info["promotionEndData"] = date["endDate"]
 
         return game_info
 
+    async def getSnapshot(self, country, max_age=SNAPSHOT_TTL, archive=True):
+        """
+        Returns free games of a country keyed by offer id, the feed is downloaded at most once per max_age.
+        While the feed is unavailable the last snapshot is returned with "stale" set
+        _Bir ülkenin bedava oyunlarını teklif kimliğine göre döndürür, akış max_age içinde en fazla bir kez indirilir.
+        Akışa ulaşılamazken son liste "stale" işaretiyle döndürülür
+        country: str
+        max_age: int (seconds)
+        archive: bool (whether a downloaded snapshot is added to the history archive)
+        returns: snapshot (dict)
+        """
+
+        cached = self.snapshots.get(country)
+        fresh = bool(cached) and time.time() - cached[0] < max_age
+        self.metrics.cache("snapshot", fresh)
+        if fresh:
+            return cached[1]
+
+        try:
+            # Other bot processes sharing the cache backend may have downloaded it already
+            entry = await single_flight(self.backend, f"snapshot:{country}", SNAPSHOT_TTL,
+                                        lambda: self.downloadSnapshot(country),
+                                        accept=lambda entry: time.time() - entry["fetched_at"] < max_age)
+        except Exception:
+            if not cached:
+                raise
+            log.debug("Serving the cached feed of %s", country, exc_info=True)
+            self.metrics.incr("snapshot.served_stale")
+            return dict(cached[1], stale=True)
+        self.snapshots.set(country, (entry["fetched_at"], entry["snapshot"]))
+        if archive:
+            task = asyncio.create_task(self.archiveSnapshot(country, entry["snapshot"]))
+            self.archive_tasks.add(task)
+            task.add_done_callback(self.archive_tasks.discard)
+        return entry["snapshot"]
+
+    async def archiveSnapshot(self, country, snapshot):
+        """
+        Adds the free games of a snapshot that weren't seen before to the history archive, with the color of their cover
+        _Bir listedeki daha önce görülmemiş bedava oyunları kapak renkleriyle birlikte geçmiş arşivine ekler
+        country: str
+        snapshot: dict
+        """
+
+        await self.history.load()
+        records = list()
+        for gameInfo in [*snapshot["current"].values(), *snapshot["upcoming"].values()]:
+            record = {
+                "id": gameInfo["id"],
+                "title": gameInfo["title"],
+                "locale": country,
+                "start": gameInfo["promotionStartDate"],
+                "end": gameInfo["promotionEndData"],
+                "price": gameInfo["price"],
+                "color": None,
+            }
+            if self.history.seen(record):
+                continue
+            if gameInfo["keyImages"]:
+                # Only new giveaways get here, so this is usually one image a week
+                try:
+                    record["color"] = await self.getDominantColor(gameInfo["keyImages"])
+                except Exception:
+                    log.debug("Could not get the color of %s", gameInfo["title"], exc_info=True)
+            records.append(record)
+        added = await self.history.add(records)
+        self.metrics.incr("history.added", added)
+
+    async def getSnapshots(self, countries):
+        """
+        Returns the snapshots of several countries at once, each reused or downloaded concurrently.
+        These are ad-hoc lookups, so they aren't added to the history archive
+        _Birden fazla ülkenin listesini aynı anda döndürür, her biri yeniden kullanılır ya da eş zamanlı indirilir.
+        Bunlar anlık sorgular olduğundan geçmiş arşivine eklenmez
+        countries: list (str)
+        returns: {country: snapshot or the exception raised while getting it} (dict)
+        """
+
+        countries = list(dict.fromkeys(countries))
+        results = await asyncio.gather(*(self.getSnapshot(country, archive=False) for country in countries),
+                                       return_exceptions=True)
+        return dict(zip(countries, results))
+
+    def makeRegionsEmbed(self, snapshots):
+        """
+        Builds an embed comparing the current free games of several countries by offer id
+        _Birden fazla ülkenin güncel bedava oyunlarını teklif kimliğine göre karşılaştıran embed'i oluşturur
+        snapshots: dict (result of getSnapshots)
+        returns: discord.Embed
+        """
+
+        available = {country: snapshot for country, snapshot in snapshots.items()
+                     if not isinstance(snapshot, BaseException)}
+        games = dict()
+        regions = dict()
+        for country, snapshot in available.items():
+            for offer_id, gameInfo in snapshot["current"].items():
+                games.setdefault(offer_id, gameInfo)
+                regions.setdefault(offer_id, []).append(country)
+
+        e = discord.Embed(title=f"Free Games in {len(snapshots)} Regions")
+        everywhere = [offer_id for offer_id in games if len(regions[offer_id]) == len(available)]
+        if everywhere:
+            e.add_field(name="Free Everywhere",
+                        value="\n".join(f"[{games[offer_id]['title']}]({games[offer_id]['url']})"
+                                         for offer_id in everywhere)[:1024],
+                        inline=False)
+        # One field per game that differs between regions, within the field limit of an embed
+        for offer_id in [offer_id for offer_id in games if offer_id not in everywhere][:23]:
+            missing = [country for country in available if country not in regions[offer_id]]
+            e.add_field(name=games[offer_id]["title"][:256],
+                        value=f"Free in **{', '.join(regions[offer_id])}**\nNot in {', '.join(missing)}",
+                        inline=False)
+        if not games:
+            e.description = "No free games found."
+        failed = [country for country in snapshots if country not in available]
+        stale = [country for country, snapshot in available.items() if snapshot.get("stale")]
+        footer = []
+        if failed:
+            footer.append(f"Could not get {', '.join(failed)}.")
+        if stale:
+            footer.append(f"\N{WARNING SIGN} Cached, Epic Games is unavailable: {', '.join(stale)}.")
+        if footer:
+            e.set_footer(text="  ".join(footer))
+        return e
+
+    async def downloadSnapshot(self, country):
+        """
+        Downloads and parses the promotions feed of a country
+        _Bir ülkenin promosyon akışını indirir ve ayrıştırır
+        country: str
+        returns: {"fetched_at": float, "snapshot": dict}
+        """
+
+        with self.metrics.span("http.egs_feed"):
+            response = await self.breakers["feed"].call(
+                lambda: self.session.get(FEED_URL.format(country=country)),
+                failed=lambda response: response.status_code >= 500)
+        data = response.json()["data"]["Catalog"]["searchStore"]["elements"]
+
+        snapshot = {"current": {}, "upcoming": {}}
+        for game in data:
+            if not game["promotions"]:
+                continue
+            for promotion in game["promotions"]["promotionalOffers"]:
+                for discount in promotion["promotionalOffers"]:
+                    if discount["discountSetting"]["discountPercentage"] == 0:
+                        snapshot["current"][game["id"]] = self.parseGameInfo(game)
+            for upcoming in game["promotions"]["upcomingPromotionalOffers"]:
+                for discount in upcoming["promotionalOffers"]:
+                    if discount["discountSetting"]["discountPercentage"] == 0:
+                        snapshot["upcoming"][game["id"]] = self.parseGameInfo(game, current_freegame=False)
+
+        # Rendered embeds are only reused while the snapshot they were rendered from is unchanged
+        snapshot["version"] = data_version([snapshot["current"], snapshot["upcoming"]])
+        return {"fetched_at": time.time(), "snapshot": snapshot}
+
     async def getDominantColor(self, url, quality=10):
         """
         Finds dominant color in the image
@@ -160,7 +546,37 @@ class EGS(commands.Cog):
         returns: color (int)
         """
 
-        color_read = ColorThief(io.BytesIO(urlopen(url).read()))
+        color = self.colors.get(url)
+        self.metrics.cache("color", color is not None)
+        if color is not None:
+            return color
+
+        async def extract():
+            with self.metrics.span("http.egs_image"):
+                response = await self.breakers["image"].call(
+                    lambda: self.session.get(url), failed=lambda response: response.status_code >= 500)
+            # ColorThief is CPU bound, keep it off the event loop
+            with self.metrics.span("color.extract"):
+                return await asyncio.get_running_loop().run_in_executor(
+                    None, self.extractDominantColor, response.content, quality)
+
+        color = await single_flight(self.backend, f"color:{url}", COLOR_TTL, extract)
+        self.colors.set(url, color)
+        return color
+
+    @staticmethod
+    def extractDominantColor(image, quality=10):
+        """
+        Finds dominant color in the image bytes
+        _Fotoğraf baytlarındaki dominant rengi bulur
+        image: bytes
+        quality: int (default:10, yükseldikçe kalite düşer)
+        returns: color (int)
+        """
+
+        from colorthief import ColorThief
+
+        color_read = ColorThief(io.BytesIO(image))
         color_hex = "%02x%02x%02x" % color_read.get_color(quality=quality)
         color = int("0x" + color_hex, 16)
 
@@ -179,8 +595,196 @@ class EGS(commands.Cog):
             date[:-1], "%Y-%m-%dT%H:%M:%S.%f") - datetime.strptime(date_now, "%Y-%m-%dT%H:%M:%S.%f")
         return str(timedelta)[:-7]
 
-    def to_upper(arg):
-        return arg.upper()
+    def makeGameEmbed(self, gameInfo, color=None):
+        """
+        Builds the embed of a free game
+        _Bedava oyunun embed'ini oluşturur
+        gameInfo: dict
+        color: int
+        returns: discord.Embed
+        """
+
+        e = discord.Embed(color=color) if color is not None else discord.Embed()
+        e.description = gameInfo["description"]
+        e.set_author(name=gameInfo["title"], url=gameInfo["url"])
+        e.set_image(url=gameInfo["keyImages"])
+        e.add_field(name="Developer", value=gameInfo["developer"], inline=True)
+        e.add_field(name="Publisher", value=gameInfo["publisher"], inline=True)
+        e.add_field(name="Offer Type", value=gameInfo["offerType"], inline=True)
+        e.add_field(name="Original Price", value=gameInfo["price"], inline=True)
+        return self.setTimeLeft(e, gameInfo)
+
+    def setTimeLeft(self, embed, gameInfo, stale=False):
+        """
+        Sets the footer of a game embed to the time left of the promotion
+        _Oyun embed'inin altbilgisini promosyonun kalan süresine ayarlar
+        embed: discord.Embed
+        gameInfo: dict
+        stale: bool (the game comes from a feed kept while Epic Games is unavailable)
+        returns: discord.Embed
+        """
+
+        promo_date = datetime.fromisoformat(gameInfo["promotionStartDate"][:-5])
+        format_date = promo_date.strftime("%d/%m/%Y")
+        time_left = self.findTimeDifference(gameInfo["promotionEndData"])
+        footer = f"Valid until {format_date}.  {time_left} left."
+        if stale:
+            footer += "  \N{WARNING SIGN} Cached, Epic Games is unavailable."
+        embed.set_footer(text=footer)
+        return embed
+
+    async def renderGame(self, gameInfo, country, version, stale=False):
+        """
+        Returns the embed of a free game, rendered once per snapshot version and country
+        _Bedava oyunun embed'ini döndürür, her akış sürümü ve ülke için bir kez oluşturulur
+        gameInfo: dict
+        country: str
+        version: int
+        stale: bool
+        returns: discord.Embed
+        """
+
+        key = (gameInfo["id"], country)
+        embed = self.render_cache.get(key, version)
+        self.metrics.cache("render", embed is not None)
+        if embed is None:
+            async with self.render_semaphore:
+                try:
+                    color = await self.getDominantColor(gameInfo["keyImages"])
+                except Exception:
+                    log.debug("Could not get the color of %s", gameInfo["keyImages"], exc_info=True)
+                    color = None
+            embed = self.makeGameEmbed(gameInfo, color=color)
+            # Without its color the embed is rendered again next time
+            if color is not None:
+                self.render_cache.set(key, version, embed)
+        # Only the remaining time changes between two sends
+        return self.setTimeLeft(embed, gameInfo, stale)
+
+    async def announceLoop(self):
+        """
+        Checks the promotions feed periodically and announces new free games
+        _Promosyon akışını belirli aralıklarla kontrol eder ve yeni bedava oyunları duyurur
+        """
+
+        await self.bot.wait_until_red_ready()
+        while True:
+            try:
+                await self.announceFreeGames()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Failed to announce free games")
+            await asyncio.sleep(ANNOUNCE_INTERVAL)
+
+    async def announceFreeGames(self):
+        """
+        Diffs the current snapshot of every subscribed locale against the offer ids announced in each
+        subscribed channel and sends the new free games to the channels that didn't receive them
+        _Abone olunan her bölgenin güncel listesini her kanalda duyurulmuş tekliflerle karşılaştırır
+        ve yeni bedava oyunları onları almamış kanallara gönderir
+        """
+
+        subscriptions = dict()
+        for guild_id, guild_data in (await self.config.all_guilds()).items():
+            if not guild_data["announce_channel"]:
+                continue
+            channel = self.bot.get_channel(guild_data["announce_channel"])
+            if channel is None:
+                continue
+            subscriptions.setdefault(self.toCountry(guild_data["announce_locale"]), []).append(channel)
+
+        for locale, channels in subscriptions.items():
+            # A locale that fails doesn't hold back the others
+            try:
+                await self.announceLocale(locale, channels)
+            except Exception:
+                log.exception("Failed to announce free games of %s", locale)
+
+    async def announceLocale(self, locale, channels):
+        """
+        Sends the free games of a locale that weren't announced yet to each subscribed channel.
+        A game counts as announced in a channel only once the channel received it
+        _Bir bölgenin bedava oyunlarından abone olan her kanala henüz duyurulmamış olanları o kanala gönderir.
+        Bir oyun bir kanalda ancak kanala ulaştığında duyurulmuş sayılır
+        locale: str
+        channels: list (discord.TextChannel)
+        """
+
+        snapshot = await self.getSnapshot(locale, max_age=ANNOUNCE_MAX_AGE)
+        # Nothing new can be in a feed kept from before an outage
+        if snapshot.get("stale"):
+            return
+        legacy = (await self.config.announced()).get(locale, [])
+
+        for channel in channels:
+            guild_config = self.config.guild(channel.guild)
+            stored = await guild_config.announced()
+            seen = set(legacy if stored is None else stored)
+            # Offers no longer free are dropped, the list stays as long as the feed
+            announced = [offer_id for offer_id in snapshot["current"] if offer_id in seen]
+            for offer_id, gameInfo in snapshot["current"].items():
+                if offer_id in seen:
+                    continue
+                # One embed per locale, shared by every subscribed channel
+                embed = await self.renderGame(gameInfo, locale, snapshot["version"])
+                try:
+                    with self.metrics.span("discord.announce"):
+                        await channel.send(embed=embed)
+                except discord.HTTPException:
+                    # Sent again on the next run
+                    log.warning("Could not announce free game in channel %s", channel.id)
+                else:
+                    announced.append(offer_id)
+                await asyncio.sleep(SEND_INTERVAL)
+            if stored is None or set(stored) != set(announced):
+                await guild_config.announced.set(announced)
+
+    async def openMenu(self, ctx, pages):
+        """
+        Opens a menu with buttons if the guild chose them and discord.py supports them, with reactions otherwise
+        _Sunucu seçtiyse ve discord.py destekliyorsa butonlu, aksi halde tepkili bir menü açar
+        pages: list (discord.Embed)
+        """
+        if ui is not None and ctx.guild is not None and await self.config.guild(ctx.guild).menu_backend() == "buttons":
+            return await button_menu(ctx, pages)
+        await menu(ctx, pages, DEFAULT_CONTROLS)
+
+    def makeHistoryPages(self, title, records):
+        """
+        Builds the pages listing giveaways from the history archive, a giveaway seen in several countries is listed once
+        _Geçmiş arşivindeki bedava oyunları listeleyen sayfaları oluşturur, birden fazla ülkede görülen oyun bir kez listelenir
+        title: str
+        records: list (dict)
+        returns: pages (list of discord.Embed)
+        """
+
+        giveaways = dict()
+        for record in records:
+            giveaway = giveaways.setdefault((record["id"], record["start"]), dict(record, locales=[]))
+            giveaway["locales"].append(record["locale"])
+
+        lines = list()
+        for giveaway in sorted(giveaways.values(), key=lambda giveaway: giveaway["start"] or "", reverse=True):
+            dates = f"{(giveaway['start'] or '?')[:10]} → {(giveaway['end'] or '?')[:10]}"
+            line = f"**{giveaway['title']}** ({giveaway['price']})\n{dates} in {', '.join(giveaway['locales'])}"
+            times = self.history.times_given(giveaway["id"])
+            if times > 1:
+                line += f", free {times} times"
+            lines.append(line)
+
+        pages = list()
+        for index in range(0, len(lines), HISTORY_PAGE_SIZE):
+            e = discord.Embed(title=title, description="\n\n".join(lines[index:index + HISTORY_PAGE_SIZE]))
+            e.set_footer(text=f"Page {len(pages) + 1}/{-(-len(lines) // HISTORY_PAGE_SIZE)}")
+            pages.append(e)
+        return pages
+
+    def to_country(arg):
+        country = arg.upper()
+        if not COUNTRY_CODE.fullmatch(country):
+            raise commands.BadArgument(f"`{arg}` is not a two letter country code, e.g. TR or US.")
+        return country
 
     @commands.group(name="egs", autohelp=False, invoke_without_command=True)
     async def _egs(self, ctx):
@@ -191,32 +795,16 @@ class EGS(commands.Cog):
         author = ctx.author
 
         async with ctx.typing():
-            get_free_games = await self.getFreeGames(author=author)
-            free_games = self.current_freegames
-            if not free_games:
+            country = await self.getCountry(author)
+            snapshot = await self.getSnapshot(country)
+            if not snapshot["current"]:
                 return await ctx.send("No free games found.")
 
             games = list()
-            e = discord.Embed()
-            for game in free_games:
-                gameInfo = await self.getGameInfo(author=author, game_title=game)
-                color = await self.getDominantColor(gameInfo["keyImages"])
-                promo_date = datetime.fromisoformat(gameInfo["promotionStartDate"][:-5])
-                format_date = promo_date.strftime("%d/%m/%Y")
-                time_left = self.findTimeDifference(gameInfo["promotionEndData"])
-
-                e.description = gameInfo["description"]
-                e.set_footer(text=f"Valid until {format_date}.  {time_left} left.")
-                e.set_author(name=gameInfo["title"], url=gameInfo["url"])
-                e.set_image(url=gameInfo["keyImages"])
-                e.add_field(name="Developer", value=gameInfo["developer"], inline=True)
-                e.add_field(name="Publisher", value=gameInfo["publisher"], inline=True)
-                e.add_field(name="Offer Type", value=gameInfo["offerType"], inline=True)
-                e.add_field(name="Original Price", value=gameInfo["price"], inline=True)
-                games.append(e)
-                e = discord.Embed(color=color)
-
-        await menu(ctx, games, DEFAULT_CONTROLS)
+            for gameInfo in snapshot["current"].values():
+                games.append(await self.renderGame(gameInfo, country, snapshot["version"], snapshot.get("stale", False)))
+
+        await self.openMenu(ctx, games)
 
     @_egs.command(name="upcoming", aliases=["up", "egsu"])
     async def _upcoming(self, ctx):
@@ -227,32 +815,63 @@ class EGS(commands.Cog):
         author = ctx.author
 
         async with ctx.typing():
-            get_free_games = await self.getFreeGames(author=author)
-            free_games = self.upcoming_freegames
-            if not free_games:
+            country = await self.getCountry(author)
+            snapshot = await self.getSnapshot(country)
+            if not snapshot["upcoming"]:
                 return await ctx.send("No upcoming free games found.")
 
             games = list()
-            e = discord.Embed()
-            for game in free_games:
-                gameInfo = await self.getGameInfo(author=author, game_title=game, current_freegame=False)
-                color = await self.getDominantColor(gameInfo["keyImages"])
-                promo_date = datetime.fromisoformat(gameInfo["promotionStartDate"][:-5])
-                format_date = promo_date.strftime("%d/%m/%Y")
-                time_left = self.findTimeDifference(gameInfo["promotionEndData"])
-
-                e.description = gameInfo["description"]
-                e.set_footer(text=f"Valid until {format_date}.  {time_left} left.")
-                e.set_author(name=gameInfo["title"], url=gameInfo["url"])
-                e.set_image(url=gameInfo["keyImages"])
-                e.add_field(name="Developer", value=gameInfo["developer"], inline=True)
-                e.add_field(name="Publisher", value=gameInfo["publisher"], inline=True)
-                e.add_field(name="Offer Type", value=gameInfo["offerType"], inline=True)
-                e.add_field(name="Original Price", value=gameInfo["price"], inline=True)
-                games.append(e)
-                e = discord.Embed(color=color)
-
-        await menu(ctx, games, DEFAULT_CONTROLS)
+            for gameInfo in snapshot["upcoming"].values():
+                games.append(await self.renderGame(gameInfo, country, snapshot["version"], snapshot.get("stale", False)))
+
+        await self.openMenu(ctx, games)
+
+    @_egs.command(name="regions", aliases=["region", "compare"])
+    async def _regions(self, ctx, *countries: to_country):
+        """
+        Compare current free games between countries.
+        \n
+        **Examples:**
+            - `[p]egs regions TR US DE` - Shows which games are free in which of these countries
+        """
+
+        if len(countries) < 2:
+            return await ctx.send_help()
+        if len(countries) > MAX_REGIONS:
+            return await ctx.send(f"You can compare at most {MAX_REGIONS} countries at once.")
+
+        async with ctx.typing():
+            snapshots = await self.getSnapshots(countries)
+            embed = self.makeRegionsEmbed(snapshots)
+        with self.metrics.span("discord.send"):
+            await ctx.send(embed=embed)
+
+    @_egs.command(name="history", aliases=["past"])
+    async def _history(self, ctx, *, query: str = None):
+        """
+        Search free games seen before by title or month.
+        \n
+        **Examples:**
+            - `[p]egs history` - Lists the latest free games
+            - `[p]egs history control` - Lists when games with "control" in their title were free
+            - `[p]egs history 2024-05` - Lists the games that were free in May 2024
+        """
+
+        await self.history.load()
+        with self.metrics.span("history.query"):
+            if query is None:
+                records = self.history.latest(HISTORY_PAGE_SIZE)
+                title = "Latest Free Games"
+            elif re.fullmatch(r"\d{4}-\d{2}", query):
+                records = self.history.by_month(query)
+                title = f"Free Games of {query}"
+            else:
+                records = self.history.by_title(query)
+                title = f"Free Games Matching {query}"[:256]
+            pages = self.makeHistoryPages(title, records)
+        if not pages:
+            return await ctx.send("No free games found in the history.")
+        await self.openMenu(ctx, pages)
 
     @_egs.command(name="singly", aliases=["list", "single", "1by1"])
     async def _singly(self, ctx):
@@ -263,31 +882,104 @@ class EGS(commands.Cog):
         author = ctx.author
 
         async with ctx.typing():
-            get_free_games = await self.getFreeGames(author=author)
-            free_games = self.current_freegames
-            if not free_games:
+            country = await self.getCountry(author)
+            snapshot = await self.getSnapshot(country)
+            if not snapshot["current"]:
                 return await ctx.send("No free games found.")
 
-            games = list()
-            for game in free_games:
-                gameInfo = await self.getGameInfo(author=author, game_title=game)
-                color = await self.getDominantColor(gameInfo["keyImages"])
-                promo_date = datetime.fromisoformat(gameInfo["promotionStartDate"][:-5])
-                format_date = promo_date.strftime("%d/%m/%Y")
-                time_left = self.findTimeDifference(gameInfo["promotionEndData"])
-
-                e = discord.Embed(color=color)
-                e.description = gameInfo["description"]
-                e.set_footer(text=f"Valid until {format_date}.  {time_left} left.")
-                e.set_author(name=gameInfo["title"], url=gameInfo["url"])
-                e.set_image(url=gameInfo["keyImages"])
-                e.add_field(name="Developer", value=gameInfo["developer"], inline=True)
-                e.add_field(name="Publisher", value=gameInfo["publisher"], inline=True)
-                e.add_field(name="Offer Type", value=gameInfo["offerType"], inline=True)
-                e.add_field(name="Original Price", value=gameInfo["price"], inline=True)
-                games.append(e)
-
-                await ctx.send(embed=e)
+            # Prepare every embed concurrently but send them in feed order as soon as each is ready
+            stale = snapshot.get("stale", False)
+            renders = [asyncio.create_task(self.renderGame(gameInfo, country, snapshot["version"], stale))
+                       for gameInfo in snapshot["current"].values()]
+            try:
+                for render in renders:
+                    embed = await render
+                    with self.metrics.span("discord.send"):
+                        await ctx.send(embed=embed)
+            finally:
+                for render in renders:
+                    render.cancel()
+
+    @_egs.group(name="metrics", autohelp=False, invoke_without_command=True)
+    @commands.is_owner()
+    async def _metrics(self, ctx):
+        """
+        Show timings of upstream calls, rendering and commands
+        \n
+        **Examples:**
+            - `[p]egs metrics` - Shows spans in milliseconds and counters
+            - `[p]egs metrics dump <prometheus/json/off>` - Writes metrics to the data path every minute
+        """
+        for page in pagify(self.metrics.format_table() or "No metrics yet."):
+            await ctx.send(box(page))
+
+    @_metrics.command(name="dump")
+    async def _metrics_dump(self, ctx, fmt: str):
+        """
+        Write metrics to the data path periodically in Prometheus text or JSON format
+        """
+        fmt = fmt.lower()
+        if fmt == "off":
+            await self.config.metrics_dump.clear()
+            return await ctx.send("Stopped writing metrics.")
+        if fmt not in ("prometheus", "json"):
+            return await ctx.send("Format must be `prometheus`, `json` or `off`.")
+        await self.config.metrics_dump.set(fmt)
+        path = self.writeMetrics(fmt)
+        await ctx.send(f"Metrics are written to `{path}` every {METRICS_DUMP_INTERVAL} seconds.")
+
+    @_egs.group(name="debug", autohelp=True)
+    @commands.is_owner()
+    async def _debug(self, ctx):
+        """
+        Debugging tools
+        \n
+        **Examples:**
+            - `[p]egs debug watchdog on [threshold_ms]` - Reports event loop stalls longer than the threshold
+            - `[p]egs debug watchdog off`
+            - `[p]egs debug stalls` - Shows the latest stalls with the stack of the blocking code
+            - `[p]egs debug breakers` - Shows the circuit breakers of the feed and the image CDN
+        """
+        pass
+
+    @_debug.command(name="watchdog")
+    async def _debug_watchdog(self, ctx, state: bool, threshold_ms: int = 100):
+        """
+        Turn the event loop watchdog on or off
+        """
+        await self.config.watchdog.set(state)
+        if not state:
+            self.watchdog.stop()
+            return await ctx.send("Event loop watchdog is off.")
+        self.watchdog.threshold = threshold_ms / 1000
+        await self.config.watchdog_threshold.set(self.watchdog.threshold)
+        self.watchdog.start()
+        await ctx.send(f"Event loop watchdog is on, stalls over {threshold_ms} ms are reported.")
+
+    @_debug.command(name="stalls")
+    async def _debug_stalls(self, ctx):
+        """
+        Show the latest event loop stalls
+        """
+        if not self.watchdog.stalls:
+            return await ctx.send("No stalls recorded.")
+        for stall in list(self.watchdog.stalls)[:-6:-1]:
+            header = f"{stall['lag'] * 1000:.0f} ms in {', '.join(stall['commands'])} <t:{int(stall['at'])}:R>"
+            await ctx.send(header + box(stall["stack"][-1800:], lang="py"))
+
+    @_debug.command(name="breakers")
+    async def _debug_breakers(self, ctx):
+        """
+        Show the state of the circuit breakers
+        """
+        lines = []
+        for breaker in self.breakers.values():
+            summary = breaker.summary()
+            line = f"{breaker.name}: {summary['state']}, {summary['failures']} failures"
+            if summary["retry_after"]:
+                line += f", probing in {summary['retry_after']:.0f}s"
+            lines.append(line)
+        await ctx.send(box("\n".join(lines)))
 
     @_egs.group(name="settings", aliases=["s"], autohelp=True)
     async def _settings(self, ctx):
@@ -301,6 +993,49 @@ class EGS(commands.Cog):
         """
         pass
 
+    @_settings.command(name="warmup")
+    @commands.is_owner()
+    async def _warmup(self, ctx, state: bool):
+        """
+        Prefetch the feeds of the most used countries in the background after the cog loads
+        """
+        await self.config.warmup.set(state)
+        await ctx.send(f"Warm-up after loading is {'on' if state else 'off'}.")
+
+    @_settings.command(name="menu")
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def _menuBackend(self, ctx, backend: str):
+        """
+        Use buttons or reactions for menus in this server, buttons need discord.py 2
+        """
+        backend = backend.lower()
+        if backend not in ("buttons", "reactions"):
+            return await ctx.send("Menu backend must be `buttons` or `reactions`.")
+        await self.config.guild(ctx.guild).menu_backend.set(backend)
+        if backend == "buttons" and ui is None:
+            return await ctx.send("Menus will use buttons once the bot runs discord.py 2, until then they use reactions.")
+        await ctx.send(f"Menus in this server use {backend}.")
+
+    @_settings.command(name="cache")
+    @commands.is_owner()
+    async def _cacheBackend(self, ctx, backend: str):
+        """
+        Share feeds and colors between the bot's processes through Redis (`redis://...`) or keep them in `memory`.
+        Needs the `redis` package. Your message is deleted since the url may hold a password.
+        """
+        with contextlib.suppress(discord.HTTPException):
+            await ctx.message.delete()
+        url = None if backend.lower() == "memory" else backend
+        try:
+            await self.setBackend(url)
+        except ImportError:
+            return await ctx.send("The `redis` package is needed to share the cache, install it with `[p]pipinstall redis`.")
+        except Exception as error:
+            return await ctx.send(f"Could not connect to the cache backend: {type(error).__name__}")
+        await self.config.cache_backend.set(url)
+        await ctx.send("Caching in Redis." if url else "Caching in memory.")
+
     @_settings.group(name="locale", aliases=["l"], autohelp=True)
     async def _locale(self, ctx):
         """
@@ -327,11 +1062,11 @@ class EGS(commands.Cog):
             await self.config.guild(guild).database.set(database)
         data = discord.Embed(colour=author.colour)
         data.add_field(name="EGS Locale Setting",
-                       value=f"Locale is **{await self.config.member(author).locale()}**")
+                       value=f"Locale is **{await self.getCountry(author)}**")
         await ctx.send(embed=data)
 
     @_locale.command(name="set", aliases=["s"])
-    async def _set_locale(self, ctx, new_value: to_upper):
+    async def _set_locale(self, ctx, new_value: to_country):
         """
         Set current locale setting
         """
@@ -359,3 +1094,55 @@ class EGS(commands.Cog):
         data.add_field(name="EGS Locale Setting",
                        value="Deleted locale setting.")
         await ctx.send(embed=data)
+
+    @_egs.group(name="announce", aliases=["a"], autohelp=True)
+    @commands.guild_only()
+    @commands.admin_or_permissions(manage_guild=True)
+    async def _announce(self, ctx):
+        """
+        EGS Free Game Announcements
+        \n
+        **Examples:**
+            - `[p]egs announce channel <#channel>` - Posts new free games to the channel
+            - `[p]egs announce locale <COUNTRY_CODE>` - Sets the country of announced games
+            - `[p]egs announce off` - Stops announcements
+        """
+        pass
+
+    @_announce.command(name="channel", aliases=["c"])
+    async def _announce_channel(self, ctx, channel: discord.TextChannel):
+        """
+        Set the channel that new free games are posted to
+        """
+        guild_config = self.config.guild(ctx.guild)
+        if await guild_config.announce_channel() != channel.id:
+            # A new channel gets the games that are free right now
+            await guild_config.announced.set([])
+        await guild_config.announce_channel.set(channel.id)
+        locale = self.toCountry(await guild_config.announce_locale())
+        data = discord.Embed(colour=ctx.author.colour)
+        data.add_field(name="EGS Announcements",
+                       value=f"New free games of **{locale}** will be posted to {channel.mention}")
+        await ctx.send(embed=data)
+
+    @_announce.command(name="locale", aliases=["l"])
+    async def _announce_locale(self, ctx, new_value: to_country):
+        """
+        Set the country of announced free games
+        """
+        await self.config.guild(ctx.guild).announce_locale.set(new_value)
+        data = discord.Embed(colour=ctx.author.colour)
+        data.add_field(name="EGS Announcements",
+                       value=f"Announcement locale is set to **{new_value}**")
+        await ctx.send(embed=data)
+
+    @_announce.command(name="off", aliases=["o"])
+    async def _announce_off(self, ctx):
+        """
+        Stop announcing new free games
+        """
+        await self.config.guild(ctx.guild).announce_channel.clear()
+        data = discord.Embed(colour=ctx.author.colour)
+        data.add_field(name="EGS Announcements",
+                       value="Stopped announcing new free games.")
+        await ctx.send(embed=data)
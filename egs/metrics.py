@@ -0,0 +1,148 @@
+import json
+import time
+import contextlib
+from collections import deque
+from typing import Deque, Dict, List
+
+
+def quantile(samples: List[float], q: float) -> float:
+    """Returns the q-quantile of sorted samples using the nearest rank
+
+    Args:
+        samples (List[float]): Sorted samples
+        q (float): Quantile between 0 and 1
+
+    Returns:
+        float: Sample at the quantile, 0 if there are no samples
+    """
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Span:
+    """Timings of one kind of operation: totals since load and a rolling window of recent samples."""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        if error:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum": self.total,
+            "p50": quantile(samples, 0.5),
+            "p90": quantile(samples, 0.9),
+            "p99": quantile(samples, 0.99),
+            "max": samples[-1] if samples else 0.0,
+        }
+
+
+class Metrics:
+    """Timed spans and counters of a cog.
+
+    Spans are named after what they wrap, e.g. `http.codewars_api`, `render.profile` or `command.codewars`,
+    counters after the event they count, e.g. `cache.render.hit`.
+    """
+
+    def __init__(self, namespace: str, window: int = 1024):
+        self.namespace = namespace
+        self.window = window
+        self.spans: Dict[str, Span] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(self.window)
+        span.observe(seconds, error)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Times the wrapped block, an exception escaping it is counted as an error of the span.
+        Cancelled blocks are not recorded.
+
+        Args:
+            name (str): Span name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(name, time.perf_counter() - start, error=True)
+            raise
+        else:
+            self.observe(name, time.perf_counter() - start)
+
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def cache(self, name: str, hit: bool):
+        """Counts a lookup of a cache
+
+        Args:
+            name (str): Cache name
+            hit (bool): Whether the lookup was a hit
+        """
+        self.incr(f"cache.{name}.{'hit' if hit else 'miss'}")
+
+    def summary(self) -> dict:
+        return {
+            "spans": {name: span.summary() for name, span in sorted(self.spans.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format
+
+        Returns:
+            str: Spans as a summary in seconds and counters as a counter
+        """
+        spans = self.summary()["spans"]
+        name = f"{self.namespace}_span_seconds"
+        lines = [f"# TYPE {name} summary"]
+        for span, data in spans.items():
+            for q, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                lines.append(f'{name}{{span="{span}",quantile="{q}"}} {data[key]}')
+            lines.append(f'{name}_sum{{span="{span}"}} {data["sum"]}')
+            lines.append(f'{name}_count{{span="{span}"}} {data["count"]}')
+        errors = f"{self.namespace}_span_errors_total"
+        lines.append(f"# TYPE {errors} counter")
+        for span, data in spans.items():
+            lines.append(f'{errors}{{span="{span}"}} {data["errors"]}')
+        events = f"{self.namespace}_events_total"
+        lines.append(f"# TYPE {events} counter")
+        for event, value in sorted(self.counters.items()):
+            lines.append(f'{events}{{event="{event}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def format_table(self) -> str:
+        """Renders the spans and counters as a plain text table for Discord
+
+        Returns:
+            str: Table, times in milliseconds
+        """
+        rows = [("span", "count", "err", "p50", "p90", "p99", "max")]
+        for span, data in self.summary()["spans"].items():
+            rows.append((span, str(data["count"]), str(data["errors"]),
+                         *(f"{data[key] * 1000:.0f}" for key in ("p50", "p90", "p99", "max"))))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+        if self.counters:
+            lines.append("")
+            lines.extend(f"{event}: {value}" for event, value in sorted(self.counters.items()))
+        return "\n".join(lines)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+
+import pytest
+
+from codewars.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from codewars.metrics import Metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("upstream", Metrics("test"), logging.getLogger("test.breaker"), threshold=3,
+                          reset_timeout=30.0, clock=clock)
+
+
+def fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        breaker.check()
+        breaker.record(False)
+
+
+def test_opens_at_threshold(breaker):
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    assert not breaker.is_open
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.is_open
+    assert breaker.metrics.counters["breaker.upstream.opened"] == 1
+
+
+def test_success_resets_failures(breaker):
+    fail(breaker, 2)
+    breaker.check()
+    breaker.record(True)
+    assert breaker.failures == 0
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+
+def test_open_rejects_until_cool_down(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(10)
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check()
+    assert raised.value.retry_after == pytest.approx(20)
+    assert breaker.metrics.counters["breaker.upstream.rejected"] == 1
+    clock.advance(19.9)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.advance(0.1)
+    assert not breaker.is_open
+    assert breaker.summary()["state"] == HALF_OPEN
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert not breaker.is_open
+    breaker.check()
+
+
+def test_failed_probe_opens_again(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    # The cool-down starts over from the failed probe
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.advance(1)
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+
+
+def test_released_probe_lets_another_through(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    breaker.check()
+    breaker.release()
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+
+
+def test_call(breaker, clock):
+    async def request(result):
+        return result
+
+    async def failing():
+        raise ConnectionError("down")
+
+    async def scenario():
+        assert await breaker.call(lambda: request(200)) == 200
+        # A result can count as a failure too
+        for _ in range(2):
+            await breaker.call(lambda: request(503), failed=lambda status: status >= 500)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(lambda: request(200))
+        clock.advance(30)
+        assert await breaker.call(lambda: request(200)) == 200
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_call_releases_probe(breaker, clock):
+    async def scenario():
+        fail(breaker, 3)
+        clock.advance(30)
+        probe = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert breaker.state == HALF_OPEN
+        assert not breaker.is_open
+
+    asyncio.run(scenario())
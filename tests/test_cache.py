@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from codewars.cache import MemoryBackend, RedisBackend, single_flight, wait_for_token
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def redis_backends(count: int = 1):
+    """Backends of as many processes sharing one Redis server"""
+    server = fakeredis.FakeServer()
+    return [RedisBackend(fakeredis.FakeAsyncRedis(server=server), "test") for _ in range(count)]
+
+
+class FailingBackend:
+    """A backend whose server is down"""
+
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("down")
+
+    def lock(self, key, timeout=10.0):
+        return MemoryBackend().lock(key, timeout)
+
+    async def take_token(self, bucket, limit, per=1.0):
+        raise ConnectionError("down")
+
+
+@pytest.mark.parametrize("make", [lambda: MemoryBackend(), lambda: redis_backends()[0]], ids=["memory", "redis"])
+def test_get_set_expires(make):
+    async def scenario():
+        backend = make()
+        await backend.set("key", {"a": [1, 2]}, ttl=0.05)
+        assert await backend.get("key") == {"a": [1, 2]}
+        await asyncio.sleep(0.1)
+        assert await backend.get("key") is None
+        assert await backend.get("missing") is None
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("make", [lambda: MemoryBackend(), lambda: redis_backends()[0]], ids=["memory", "redis"])
+def test_take_token_limits_each_window(make):
+    async def scenario():
+        backend = make()
+        waits = [await backend.take_token("bucket", 3, per=60) for _ in range(5)]
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert all(0 < wait <= 60 for wait in waits[3:])
+        # Buckets are independent
+        assert await backend.take_token("other", 3, per=60) == 0.0
+
+    run(scenario())
+
+
+def test_redis_tokens_are_shared_between_processes():
+    async def scenario():
+        first, second = redis_backends(2)
+        assert await first.take_token("bucket", 2, per=60) == 0.0
+        assert await second.take_token("bucket", 2, per=60) == 0.0
+        assert await first.take_token("bucket", 2, per=60) > 0
+
+    run(scenario())
+
+
+def test_redis_token_windows_expire():
+    async def scenario():
+        backend = redis_backends()[0]
+        for _ in range(3):
+            await backend.take_token("bucket", 2, per=60)
+        keys = await backend.client.keys("test:rate:bucket:*")
+        assert len(keys) == 1
+        assert 0 < await backend.client.pttl(keys[0]) <= 120000
+
+    run(scenario())
+
+
+def test_redis_lock_is_exclusive_and_released():
+    async def scenario():
+        first, second = redis_backends(2)
+        holders = []
+
+        async def hold(backend, name):
+            async with backend.lock("key", timeout=5):
+                holders.append(name)
+                assert len(holders) == 1
+                await asyncio.sleep(0.05)
+                holders.remove(name)
+
+        await asyncio.gather(hold(first, "first"), hold(second, "second"))
+        # Both released, so it can be taken right away
+        async with first.lock("key", timeout=0.01):
+            assert await first.client.get("test:lock:key") is not None
+        assert await first.client.get("test:lock:key") is None
+
+    run(scenario())
+
+
+def test_redis_lock_times_out_without_the_lock():
+    async def scenario():
+        first, second = redis_backends(2)
+        async with first.lock("key", timeout=5):
+            async with second.lock("key", timeout=0.1):
+                pass
+            # The waiter didn't release a lock it didn't hold
+            assert await first.client.get("test:lock:key") is not None
+
+    run(scenario())
+
+
+def test_single_flight_produces_once_across_processes():
+    async def scenario():
+        backends = redis_backends(3)
+        produced = 0
+
+        async def produce():
+            nonlocal produced
+            produced += 1
+            await asyncio.sleep(0.05)
+            return {"value": produced}
+
+        results = await asyncio.gather(*(single_flight(backend, "key", 60, produce) for backend in backends))
+        assert produced == 1
+        assert results == [{"value": 1}] * 3
+
+    run(scenario())
+
+
+def test_single_flight_reproduces_unaccepted_entries():
+    async def scenario():
+        backend = MemoryBackend()
+        await backend.set("key", {"age": 100}, 60)
+
+        async def produce():
+            return {"age": 0}
+
+        assert await single_flight(backend, "key", 60, produce, accept=lambda entry: entry["age"] < 10) == {"age": 0}
+        assert await backend.get("key") == {"age": 0}
+
+    run(scenario())
+
+
+def test_single_flight_does_not_store_none():
+    async def scenario():
+        backend = MemoryBackend()
+
+        async def produce():
+            return None
+
+        assert await single_flight(backend, "key", 60, produce) is None
+        assert await backend.get("key") is None
+
+    run(scenario())
+
+
+def test_single_flight_produces_while_backend_fails():
+    async def scenario():
+        async def produce():
+            return {"value": 1}
+
+        assert await single_flight(FailingBackend(), "key", 60, produce) == {"value": 1}
+
+    run(scenario())
+
+
+def test_wait_for_token_falls_back_to_local_limiter():
+    async def scenario():
+        fallback = MemoryBackend()
+        # Tokens still come, and still limited, while the backend is down
+        assert await wait_for_token(FailingBackend(), fallback, "bucket", 2, per=0.2) == 0
+        assert await wait_for_token(FailingBackend(), fallback, "bucket", 2, per=0.2) == 0
+        assert await wait_for_token(FailingBackend(), fallback, "bucket", 2, per=0.2) == 1
+
+    run(scenario())
+
+
+def test_wait_for_token_waits_for_the_next_window():
+    async def scenario():
+        backend = redis_backends()[0]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        waits = [await wait_for_token(backend, MemoryBackend(), "bucket", 1, per=0.2) for _ in range(2)]
+        assert waits == [0, 1]
+        assert loop.time() - start < 0.5
+
+    run(scenario())
@@ -0,0 +1,161 @@
+import asyncio
+
+import discord
+import pytest
+
+from codewars.dict_menu import EMBED_MAX_CHARS, EMBED_MAX_FIELDS, PageSource, _ButtonMenu, pack_fields
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def field_size(field) -> int:
+    return len(str(field[0])) + len(str(field[1]))
+
+
+def test_pack_fields_field_count():
+    fields = [(f"name{i}", "value", True) for i in range(60)]
+    pages = pack_fields(fields)
+    assert [len(page) for page in pages] == [25, 25, 10]
+    assert [field for page in pages for field in page] == fields
+
+
+def test_pack_fields_character_budget():
+    fields = [("n" * 56, "v" * 1000) for _ in range(12)]
+    reserved = 200
+    pages = pack_fields(fields, reserved=reserved)
+    # 5 fields of 1056 characters fit beside the reserved 200, a 6th would go over 6000
+    assert [len(page) for page in pages] == [5, 5, 2]
+    for page in pages:
+        assert reserved + sum(map(field_size, page)) <= EMBED_MAX_CHARS
+
+
+def test_pack_fields_exact_boundaries():
+    # Exactly at the limits still fits on one page
+    assert len(pack_fields([("a", "b")] * EMBED_MAX_FIELDS)) == 1
+    assert len(pack_fields([("a", "b")] * (EMBED_MAX_FIELDS + 1))) == 2
+    fields = [("n", "v" * 2999), ("n", "v" * 2999)]
+    assert len(pack_fields(fields)) == 1
+    assert len(pack_fields(fields, reserved=1)) == 2
+
+
+def test_pack_fields_oversized_field_gets_own_page():
+    fields = [("a", "b"), ("n", "v" * 7000), ("c", "d")]
+    assert pack_fields(fields) == [[fields[0]], [fields[1]], [fields[2]]]
+
+
+def test_pack_fields_fit_real_embeds():
+    fields = [(f"Kata {i}", "x" * (i * 37 % 900), False) for i in range(80)]
+    embed = discord.Embed(title="Completed katas")
+    embed.set_footer(text="Page 1 of 9")
+    for page in pack_fields(fields, reserved=len(embed)):
+        page_embed = embed.copy()
+        for name, value, inline in page:
+            page_embed.add_field(name=name, value=value, inline=inline)
+        assert len(page_embed.fields) <= EMBED_MAX_FIELDS
+        assert len(page_embed) <= EMBED_MAX_CHARS
+
+
+def test_pack_fields_empty():
+    assert pack_fields([]) == []
+
+
+def test_page_source_renders_on_demand_and_prefetches():
+    rendered = []
+
+    async def render(index):
+        rendered.append(index)
+        return f"page {index}"
+
+    async def scenario():
+        source = PageSource(4, render, prefetch=1)
+        assert len(source) == 4
+        assert await source.get_page(0) == "page 0"
+        await asyncio.sleep(0)
+        assert rendered == [0, 1]
+        # Rendered pages are kept
+        assert await source.get_page(1) == "page 1"
+        assert await source.get_page(0) == "page 0"
+        # No prefetch past the last page
+        assert await source.get_page(3) == "page 3"
+        await asyncio.sleep(0)
+        source.close()
+
+    run(scenario())
+    assert rendered == [0, 1, 2, 3]
+
+
+def test_page_source_retries_failed_page():
+    attempts = []
+
+    async def render(index):
+        attempts.append(index)
+        if len(attempts) == 1:
+            raise ValueError("render failed")
+        return f"page {index}"
+
+    async def scenario():
+        source = PageSource(1, render)
+        with pytest.raises(ValueError):
+            await source.get_page(0)
+        assert await source.get_page(0) == "page 0"
+
+    run(scenario())
+    assert attempts == [0, 0]
+
+
+def test_page_source_close_cancels_renders():
+    async def render(index):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        source = PageSource(3, render, prefetch=2)
+        waiting = asyncio.ensure_future(source.get_page(0))
+        await asyncio.sleep(0)
+        source.close()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert all(task.cancelled() for task in source._pages.values())
+
+    run(scenario())
+
+
+class FakeResponse:
+    def __init__(self):
+        self.calls = []
+
+    async def edit_message(self, **kwargs):
+        self.calls.append(("edit_message", kwargs))
+
+    async def send_message(self, content, ephemeral=False):
+        self.calls.append(("send_message", {"content": content, "ephemeral": ephemeral}))
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.response = FakeResponse()
+
+
+def test_button_turn_answers_when_page_fails():
+    async def render(index):
+        if index == 1:
+            raise ValueError("render failed")
+        return f"page {index}"
+
+    async def scenario():
+        source = PageSource(3, render, prefetch=0)
+        view = _ButtonMenu(None, source, 0, timeout=None)
+        failed = FakeInteraction()
+        await view._turn(failed, 1)
+        turned = FakeInteraction()
+        await view._turn(turned, -1)
+        view._close()
+        return view, failed, turned
+
+    view, failed, turned = run(scenario())
+    # The failed turn is answered and leaves the menu on the page it was showing
+    assert [(name, kwargs["ephemeral"]) for name, kwargs in failed.response.calls] == [("send_message", True)]
+    assert turned.response.calls[0][0] == "edit_message"
+    assert turned.response.calls[0][1]["content"] == "page 2"
+    assert view.page_number == 2
@@ -0,0 +1,90 @@
+import asyncio
+
+from egs.history import HistoryArchive, title_words
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def giveaway(id: str, title: str, start: str, locale: str = "TR") -> dict:
+    return {"id": id, "title": title, "locale": locale, "start": start, "end": None, "price": "$19.99",
+            "color": 0}
+
+
+RECORDS = [
+    giveaway("a", "Control: Ultimate Edition", "2024-05-02T15:00:00.000Z"),
+    giveaway("b", "Death Stranding", "2024-05-16T15:00:00.000Z"),
+    giveaway("a", "Control: Ultimate Edition", "2024-06-20T15:00:00.000Z"),
+    giveaway("c", "Mutant Year Zero: Road to Eden", "2024-06-27T15:00:00.000Z"),
+]
+
+
+def test_title_words():
+    assert title_words("Control: Ultimate Edition") == ["control", "ultimate", "edition"]
+
+
+def test_add_then_reload(tmp_path):
+    path = tmp_path / "history.jsonl"
+
+    async def scenario():
+        archive = HistoryArchive(path)
+        await archive.load()
+        assert await archive.add(RECORDS) == 4
+        # Seeing a giveaway again is a no-op, another locale is another giveaway
+        assert await archive.add(RECORDS[:2] + [giveaway("b", "Death Stranding", RECORDS[1]["start"], "US")]) == 1
+
+        reloaded = HistoryArchive(path)
+        await reloaded.load()
+        return archive, reloaded
+
+    archive, reloaded = run(scenario())
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 5
+    assert reloaded.records == archive.records
+    assert len(reloaded) == 5
+    assert reloaded.seen(RECORDS[0])
+    assert not reloaded.seen(giveaway("a", "Control: Ultimate Edition", "2024-07-01T15:00:00.000Z"))
+
+    assert reloaded.by_title("control") == [RECORDS[0], RECORDS[2]]
+    assert reloaded.by_title("ULTIMATE control") == [RECORDS[0], RECORDS[2]]
+    assert reloaded.by_title("control stranding") == []
+    assert reloaded.by_title("...") == []
+    assert [record["id"] for record in reloaded.by_month("2024-05")] == ["a", "b", "b"]
+    assert [record["id"] for record in reloaded.by_month("2024-06")] == ["a", "c"]
+    assert reloaded.by_month("2024-07") == []
+    assert reloaded.times_given("a") == 2
+    assert reloaded.times_given("b") == 1
+    assert [record["id"] for record in reloaded.latest(2)] == ["a", "c"]
+
+
+def test_added_before_load_are_written_after(tmp_path):
+    path = tmp_path / "history.jsonl"
+
+    async def scenario():
+        archive = HistoryArchive(path)
+        assert await archive.add(RECORDS[:2]) == 0
+        assert len(archive) == 0
+        await archive.load()
+        return archive
+
+    archive = run(scenario())
+    assert len(archive) == 2
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_skips_truncated_line(tmp_path):
+    path = tmp_path / "history.jsonl"
+
+    async def scenario():
+        archive = HistoryArchive(path)
+        await archive.load()
+        await archive.add(RECORDS[:2])
+        with path.open("a", encoding="utf-8") as file:
+            file.write('{"id": "c", "tit')
+        reloaded = HistoryArchive(path)
+        await reloaded.load()
+        return reloaded
+
+    reloaded = run(scenario())
+    assert len(reloaded) == 2
+    assert reloaded.by_title("mutant") == []
@@ -0,0 +1,101 @@
+import pytest
+
+from codewars.search import KataIndex, normalize_rank, tokenize
+
+
+def kata(id: str, name: str, rank: str = "6 kyu", tags=(), category: str = "reference",
+         languages=("python",), completed: int = 0) -> dict:
+    return {"id": id, "name": name, "rank_name": rank, "tags": list(tags), "category": category,
+            "languages": list(languages), "total_completed": completed}
+
+
+@pytest.fixture
+def index():
+    index = KataIndex()
+    index.add(kata("a", "Multiply", rank="8 kyu", tags=["Fundamentals"], completed=900))
+    index.add(kata("b", "Sum of two numbers", rank="8 kyu", tags=["Fundamentals", "Mathematics"], completed=500))
+    index.add(kata("c", "Sudoku solver", rank="4 kyu", tags=["Algorithms", "Puzzles"], category="algorithms",
+                   languages=["python", "c++"], completed=50))
+    index.add(kata("d", "Number puzzle", rank="4 kyu", tags=["Puzzles"], languages=["javascript"], completed=80))
+    index.add(kata("e", "Bits battle", rank="1 dan", tags=["Mathematics"], completed=5))
+    return index
+
+
+def ids(result):
+    katas, total = result
+    return [kata["id"] for kata in katas]
+
+
+def test_tokenize():
+    assert tokenize("Sum of Two-Numbers!") == ["sum", "of", "two", "numbers"]
+    # Language names keep their symbols
+    assert tokenize("C++ and C#") == ["c++", "and", "c#"]
+    assert tokenize("  ") == []
+
+
+@pytest.mark.parametrize("rank", ["4kyu", "4 kyu", "4 KYU", "4", "-4"])
+def test_normalize_rank(rank):
+    assert normalize_rank(rank) == "4kyu"
+
+
+def test_normalize_rank_dan():
+    assert normalize_rank("1 dan") == "1dan"
+    assert normalize_rank("") == ""
+
+
+def test_search_every_term_has_to_match(index):
+    assert ids(index.search("puzzle")) == ["d", "c"]
+    assert ids(index.search("sudoku puzzles")) == ["c"]
+    assert ids(index.search("sudoku mathematics")) == []
+
+
+def test_search_prefix(index):
+    # "sud" is long enough to match "sudoku", "su" only matches whole terms
+    assert ids(index.search("sud")) == ["c"]
+    assert ids(index.search("su")) == []
+
+
+def test_search_name_before_tag(index):
+    # "puzzle" is in the name of d, "puzzles" only in the tags of c
+    assert ids(index.search("puzzle")) == ["d", "c"]
+    # Both have "mathematics" in their tags, the most completed comes first
+    assert ids(index.search("mathematics")) == ["b", "e"]
+
+
+def test_search_ties_by_completions(index):
+    assert ids(index.search("fundamentals")) == ["a", "b"]
+    assert ids(index.search("", limit=3)) == ["a", "b", "d"]
+
+
+@pytest.mark.parametrize("rank", ["4kyu", "4 kyu", "4", "-4"])
+def test_search_rank_filter(index, rank):
+    assert ids(index.search("", rank=rank)) == ["d", "c"]
+    assert ids(index.search("puzzle", rank=rank)) == ["d", "c"]
+
+
+def test_search_rank_dan(index):
+    assert ids(index.search("", rank="1 dan")) == ["e"]
+
+
+def test_search_language_filter(index):
+    assert ids(index.search("puzzle", language="Python")) == ["c"]
+    assert ids(index.search("", language="c++")) == ["c"]
+
+
+def test_search_total_counts_past_limit(index):
+    katas, total = index.search("", limit=2)
+    assert len(katas) == 2
+    assert total == 5
+
+
+def test_add_replaces_and_evicts():
+    index = KataIndex(maxsize=2)
+    index.add(kata("a", "Old name"))
+    index.add(kata("a", "New name"))
+    assert ids(index.search("old")) == []
+    assert ids(index.search("new")) == ["a"]
+    index.add(kata("b", "Second"))
+    index.add(kata("c", "Third"))
+    assert len(index) == 2
+    assert ids(index.search("new")) == []
+    assert "old" not in index.postings
@@ -0,0 +1,106 @@
+from codewars.watcher import CompletionWatcher, new_completions
+
+
+def completion(at: str) -> dict:
+    return {"id": at, "completedAt": at}
+
+
+def test_new_completions_stop_at_mark():
+    completed = [completion("2024-03-03T00:00:00Z"), completion("2024-03-02T00:00:00Z"),
+                 completion("2024-03-01T00:00:00Z")]
+    assert new_completions(completed, "2024-03-02T00:00:00Z") == completed[:1]
+    assert new_completions(completed, "2024-03-03T00:00:00Z") == []
+    # A user without completions yet has an empty mark
+    assert new_completions(completed, "") == completed
+
+
+def test_new_completions_without_mark():
+    # Nothing is announced before the first check set the mark
+    assert new_completions([completion("2024-03-03T00:00:00Z")], None) == []
+
+
+def watching(*users: str) -> CompletionWatcher:
+    watcher = CompletionWatcher(min_interval=10, max_interval=80, jitter=0)
+    watcher.sync(users, now=0)
+    return watcher
+
+
+def test_sync_spreads_new_users_over_first_interval():
+    watcher = watching(*[f"user{i}" for i in range(50)])
+    assert len(watcher) == 50
+    assert all(0 <= at <= 10 for at in watcher.due.values())
+    assert len(watcher.pop_due(now=10, limit=100)) == 50
+
+
+def test_pop_due_most_overdue_first():
+    watcher = watching("a", "b", "c")
+    watcher.due.clear()
+    watcher._heap.clear()
+    for user, at in (("a", 3), ("b", 1), ("c", 2)):
+        watcher._push(user, at)
+    assert watcher.next_due() == 1
+    assert watcher.pop_due(now=2.5, limit=10) == ["b", "c"]
+    assert watcher.next_due() == 3
+    assert watcher.pop_due(now=5, limit=10) == ["a"]
+    # Users being checked are not due again until rescheduled
+    assert watcher.next_due() is None
+    assert watcher.pop_due(now=100, limit=10) == []
+
+
+def test_pop_due_limit():
+    watcher = watching("a", "b", "c")
+    assert len(watcher.pop_due(now=10, limit=2)) == 2
+    assert len(watcher.pop_due(now=10, limit=2)) == 1
+
+
+def test_interval_doubles_up_to_max():
+    watcher = watching("a")
+    now = 0
+    intervals = []
+    for _ in range(5):
+        now = watcher.next_due()
+        assert watcher.pop_due(now, limit=1) == ["a"]
+        watcher.schedule("a", active=False, now=now)
+        intervals.append(watcher.intervals["a"])
+        assert watcher.next_due() == now + intervals[-1]
+    assert intervals == [20, 40, 80, 80, 80]
+
+
+def test_interval_resets_on_activity():
+    watcher = watching("a")
+    for active in (False, False, True):
+        now = watcher.next_due()
+        watcher.pop_due(now, limit=1)
+        watcher.schedule("a", active=active, now=now)
+    assert watcher.intervals["a"] == 10
+    assert watcher.next_due() == now + 10
+
+
+def test_schedule_ignores_forgotten_user():
+    watcher = watching("a")
+    watcher.pop_due(now=10, limit=1)
+    watcher.forget(["a"])
+    watcher.schedule("a", active=True, now=10)
+    assert len(watcher) == 0
+    assert watcher.next_due() is None
+
+
+def test_forget_drops_heap_entry_and_marks():
+    watcher = watching("a", "b")
+    watcher.marks.update({"a": "2024-03-01T00:00:00Z", "b": ""})
+    watcher.forget(["a"])
+    assert "a" not in watcher.due
+    assert "a" not in watcher.intervals
+    assert watcher.marks == {"b": ""}
+    assert all(user != "a" for _, user in watcher._heap)
+    assert watcher.pop_due(now=10, limit=10) == ["b"]
+
+
+def test_sync_forgets_unwatched_users():
+    watcher = watching("a", "b")
+    # A mark loaded from the config for a user not watched anymore
+    watcher.marks.update({"a": "", "b": "", "c": ""})
+    watcher.sync(["b"], now=0)
+    assert set(watcher.due) == {"b"}
+    assert watcher.marks == {"b": ""}
+    assert all(user == "b" for _, user in watcher._heap)